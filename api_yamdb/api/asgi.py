@@ -0,0 +1,157 @@
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+from django.urls import Resolver404, resolve
+
+# Адреса каталога, которые читаются в отдельном пуле потоков.
+CATALOG_VIEWS = {
+    'title-list', 'title-detail', 'category-list', 'genre-list',
+    'reviews-list', 'comments-list',
+}
+READ_METHODS = ('GET', 'HEAD')
+BODY_BUFFER_SIZE = 65536
+
+
+def build_environ(scope, body):
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'].encode().decode('latin1'),
+        'QUERY_STRING': scope['query_string'].decode('latin1'),
+        'SERVER_PROTOCOL': f'HTTP/{scope["http_version"]}',
+        'SERVER_NAME': scope.get('server', ('localhost', 80))[0],
+        'SERVER_PORT': str(scope.get('server', ('localhost', 80))[1]),
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin1').upper().replace('-', '_')
+        if name not in ('CONTENT_LENGTH', 'CONTENT_TYPE'):
+            name = f'HTTP_{name}'
+        value = value.decode('latin1')
+        if name in environ:
+            # Несколько заголовков Cookie (HTTP/2) склеиваются через
+            # '; ', как в одном заголовке, остальные - через запятую.
+            separator = '; ' if name == 'HTTP_COOKIE' else ','
+            value = f'{environ[name]}{separator}{value}'
+        environ[name] = value
+    return environ
+
+
+def is_catalog_read(scope):
+    if scope['method'] not in READ_METHODS:
+        return False
+    try:
+        return resolve(scope['path']).view_name in CATALOG_VIEWS
+    except Resolver404:
+        return False
+
+
+class ASGIHandler:
+    # Django 2.2 не умеет асинхронные представления, поэтому сеть
+    # обслуживает цикл событий, а представления выполняются в
+    # ограниченных пулах потоков: медленный клиент, пока передаёт запрос
+    # или принимает ответ, поток и соединение с базой не занимает.
+    # Чтения каталога идут в свой пул, и запись или выгрузка их не
+    # вытесняют. Число потоков ограничивает и число соединений с базой.
+
+    def __init__(self):
+        self.wsgi = get_wsgi_application()
+        self.catalog_pool = ThreadPoolExecutor(
+            settings.ASGI_CATALOG_THREADS, thread_name_prefix='asgi-catalog')
+        self.pool = ThreadPoolExecutor(
+            settings.ASGI_THREADS, thread_name_prefix='asgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(
+                f'Неподдерживаемый тип соединения {scope["type"]}')
+        with SpooledTemporaryFile(max_size=BODY_BUFFER_SIZE) as body:
+            if not await self.read_body(receive, body):
+                return
+            environ = build_environ(scope, body)
+            # Тело запроса с Transfer-Encoding: chunked приходит без
+            # Content-Length, а Django без него тело не читает.
+            environ.setdefault('CONTENT_LENGTH', str(body.tell()))
+            body.seek(0)
+            pool = (self.catalog_pool if is_catalog_read(scope)
+                    else self.pool)
+            loop = asyncio.get_event_loop()
+            response = await loop.run_in_executor(
+                pool, self.run, environ, send, loop)
+        if response is None:
+            return
+        start, content = response
+        await send(start)
+        await send({'type': 'http.response.body', 'body': content})
+
+    async def lifespan(self, receive, send):
+        # Настройка выполнена в конструкторе, поэтому при запуске
+        # достаточно подтвердить готовность, а при остановке - дождаться
+        # потоков с начатыми запросами.
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await asyncio.get_event_loop().run_in_executor(
+                    None, self.close)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    @staticmethod
+    async def read_body(receive, body):
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return False
+            body.write(message.get('body', b''))
+            if not message.get('more_body'):
+                return True
+
+    def run(self, environ, send, loop):
+        # Ответ собирается и закрывается в одном потоке: соединения с
+        # базой привязаны к потоку и закрываются сигналом request_finished.
+        # Потоковый ответ (выгрузка) отправляется из этого же потока.
+        start = {'type': 'http.response.start'}
+
+        def start_response(status, headers, exc_info=None):
+            start['status'] = int(status.split(' ', 1)[0])
+            start['headers'] = [
+                (name.lower().encode('latin1'), value.encode('latin1'))
+                for name, value in headers
+            ]
+
+        response = self.wsgi(environ, start_response)
+        try:
+            if not getattr(response, 'streaming', False):
+                return start, b''.join(response)
+
+            def send_from_thread(message):
+                asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+            send_from_thread(start)
+            for chunk in response:
+                send_from_thread({'type': 'http.response.body',
+                                  'body': chunk, 'more_body': True})
+            send_from_thread({'type': 'http.response.body', 'body': b''})
+            return None
+        finally:
+            response.close()
+
+    def close(self):
+        self.catalog_pool.shutdown()
+        self.pool.shutdown()
@@ -0,0 +1,84 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+from . import metrics
+from .cache import bump_versions, get_versions
+
+_users = OrderedDict()
+_lock = threading.Lock()
+
+
+def user_resource(user_id):
+    return f'user:{user_id}'
+
+
+def invalidate_user(user_id):
+    # Локальная копия удаляется сразу. Копии в других процессах
+    # сбрасывает смена версии, только если кэш каталога общий.
+    bump_versions(user_resource(user_id))
+    with _lock:
+        _users.pop(str(user_id), None)
+
+
+def clear_user_cache():
+    with _lock:
+        _users.clear()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    # Пользователь из токена хранится в памяти процесса не дольше
+    # USER_CACHE_TIMEOUT секунд, всего не больше USER_CACHE_MAX_SIZE
+    # записей. Копия годна, пока не изменилась версия пользователя в
+    # кэше каталога: её меняет сохранение или удаление пользователя.
+    # С локальным кэшем каталога другие процессы узнают об изменении
+    # только по истечении USER_CACHE_TIMEOUT, поэтому запросы на запись
+    # всегда читают пользователя из базы и сразу видят новую роль
+    # или удаление пользователя.
+    fresh = False
+
+    def authenticate(self, request):
+        self.fresh = request.method not in SAFE_METHODS
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+        key = str(user_id)
+        version, = get_versions([user_resource(user_id)])
+        now = time.monotonic()
+        with _lock:
+            entry = _users.get(key)
+            if entry is not None:
+                _users.move_to_end(key)
+        if entry is not None and not self.fresh:
+            cached_version, expires, db, fields, values = entry
+            if cached_version == version and expires > now:
+                metrics.inc('yamdb_cache_requests_total', cache='user',
+                            result='hit')
+                return self.user_model.from_db(db, fields, values)
+        metrics.inc('yamdb_cache_requests_total', cache='user',
+                    result='miss')
+        user = super().get_user(validated_token)
+        self.remember(key, version, now, user)
+        return user
+
+    @staticmethod
+    def remember(key, version, now, user):
+        # Хранятся значения полей, а не сам объект: каждый запрос
+        # получает свой экземпляр пользователя.
+        fields = [field.attname for field in user._meta.concrete_fields]
+        values = [getattr(user, field) for field in fields]
+        entry = (version, now + settings.USER_CACHE_TIMEOUT,
+                 user._state.db, fields, values)
+        with _lock:
+            _users[key] = entry
+            _users.move_to_end(key)
+            while len(_users) > settings.USER_CACHE_MAX_SIZE:
+                _users.popitem(last=False)
@@ -0,0 +1,302 @@
+import asyncio
+import json
+import math
+import random
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import RefreshToken
+from reviews.models import ADMIN, Category, Genre, Review, Title, User
+
+BENCH_PASSWORD = 'benchmark-password'
+
+
+def percentile(values, percent):
+    # Ближайший ранг по отсортированным значениям.
+    if not values:
+        return None
+    rank = math.ceil(percent / 100 * len(values))
+    return values[max(rank, 1) - 1]
+
+
+def summarize(durations, queries, errors, elapsed):
+    durations = sorted(durations)
+    count = len(durations)
+    return OrderedDict([
+        ('requests', count),
+        ('errors', errors),
+        ('rps', round(count / elapsed, 1) if elapsed else None),
+        ('mean_ms', round(sum(durations) / count * 1000, 2)
+         if count else None),
+        ('p50_ms', round(percentile(durations, 50) * 1000, 2)
+         if count else None),
+        ('p95_ms', round(percentile(durations, 95) * 1000, 2)
+         if count else None),
+        ('p99_ms', round(percentile(durations, 99) * 1000, 2)
+         if count else None),
+        ('queries_mean', round(sum(queries) / count, 2) if count else None),
+        ('queries_max', max(queries) if queries else None),
+    ])
+
+
+class ApiBenchmark:
+    # Прогоняет сценарии через тестовый клиент Django в текущем процессе:
+    # измеряется работа приложения и базы без сети и веб-сервера.
+    # Каждый сценарий возвращает (метод, url, данные, клиент).
+
+    def __init__(self, using, seed=0):
+        self.using = using
+        self.rng = random.Random(seed)
+        self.writer = self.bench_user('benchmark_writer')
+        self.admin = self.bench_user('benchmark_admin', role=ADMIN)
+        self.anonymous = Client()
+        self.client = self.client_for(self.writer)
+        self.admin_client = self.client_for(self.admin)
+        self.title_ids = list(Title.objects.using(using).values_list(
+            'pk', flat=True))
+        if not self.title_ids:
+            raise ValueError('Нет произведений для нагрузки')
+        # Номер страницы не больше первых двадцати существующих.
+        page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+        self.pages = min(math.ceil(len(self.title_ids) / page_size), 20)
+        self.years = sorted(set(Title.objects.using(using).values_list(
+            'year', flat=True).distinct()[:100]))
+        self.reviews = list(Review.objects.using(using).filter(
+            title_id__in=self.rng.sample(
+                self.title_ids, min(len(self.title_ids), 200))
+        ).values_list('title_id', 'pk')[:200])
+        self.unreviewed = iter(self.rng.sample(self.title_ids,
+                                               len(self.title_ids)))
+        self.genres = list(Genre.objects.using(using).values_list(
+            'slug', flat=True)[:3])
+        self.category = Category.objects.using(using).values_list(
+            'slug', flat=True).first()
+        self.counter = 0
+
+    def bench_user(self, username, role='user'):
+        user = User.objects.using(self.using).filter(
+            username=username).first()
+        return user or User.objects.db_manager(self.using).create_user(
+            email=f'{username}@yamdb.fake', username=username,
+            password=BENCH_PASSWORD, role=role)
+
+    @staticmethod
+    def client_for(user):
+        return Client(HTTP_AUTHORIZATION=(
+            f'Bearer {RefreshToken.for_user(user).access_token}'))
+
+    def scenarios(self):
+        return OrderedDict([
+            ('titles_list', self.titles_list),
+            ('titles_list_anonymous', self.titles_list_anonymous),
+            ('titles_filter', self.titles_filter),
+            ('titles_search', self.titles_search),
+            ('title_detail', self.title_detail),
+            ('reviews_list', self.reviews_list),
+            ('reviews_cursor', self.reviews_cursor),
+            ('comments_list', self.comments_list),
+            ('token', self.token),
+            ('signup', self.signup),
+            ('title_create', self.title_create),
+            ('review_create', self.review_create),
+            ('comment_create', self.comment_create),
+        ])
+
+    def title(self):
+        return self.rng.choice(self.title_ids)
+
+    def review(self):
+        if not self.reviews:
+            raise ValueError('Нет отзывов для нагрузки')
+        return self.rng.choice(self.reviews)
+
+    def titles_list(self):
+        page = self.rng.randint(1, self.pages)
+        return 'get', f'/api/v1/titles/?page={page}', None, self.client
+
+    def titles_list_anonymous(self):
+        page = self.rng.randint(1, self.pages)
+        return 'get', f'/api/v1/titles/?page={page}', None, self.anonymous
+
+    def titles_filter(self):
+        year = self.rng.choice(self.years)
+        return 'get', f'/api/v1/titles/?year={year}', None, self.client
+
+    def titles_search(self):
+        from reviews.synthetic import WORDS
+
+        word = self.rng.choice(WORDS)
+        return 'get', f'/api/v1/titles/?search={word}', None, self.client
+
+    def title_detail(self):
+        return 'get', f'/api/v1/titles/{self.title()}/', None, self.client
+
+    def reviews_list(self):
+        return ('get', f'/api/v1/titles/{self.title()}/reviews/', None,
+                self.client)
+
+    def reviews_cursor(self):
+        return ('get', f'/api/v1/titles/{self.title()}/reviews/?cursor=',
+                None, self.client)
+
+    def comments_list(self):
+        title_id, review_id = self.review()
+        return ('get', f'/api/v1/titles/{title_id}/reviews/{review_id}/'
+                       f'comments/', None, self.client)
+
+    def token(self):
+        return ('post', '/api/v1/token/',
+                {'username': self.writer.username,
+                 'password': BENCH_PASSWORD}, self.anonymous)
+
+    def signup(self):
+        self.counter += 1
+        username = f'benchmark_signup_{time.time_ns()}_{self.counter}'
+        return ('post', '/api/v1/auth/signup/',
+                {'username': username, 'email': f'{username}@yamdb.fake'},
+                self.anonymous)
+
+    def title_create(self):
+        return ('post', '/api/v1/titles/',
+                {'name': 'Нагрузка', 'year': 2000, 'genre': self.genres,
+                 'category': self.category}, self.admin_client)
+
+    def review_create(self):
+        # Автор пишет не больше одного отзыва к произведению.
+        title_id = next(self.unreviewed, None) or self.title()
+        return ('post', f'/api/v1/titles/{title_id}/reviews/',
+                {'text': 'Нагрузка', 'score': 7}, self.client)
+
+    def comment_create(self):
+        title_id, review_id = self.review()
+        return ('post', f'/api/v1/titles/{title_id}/reviews/{review_id}/'
+                        f'comments/', {'text': 'Нагрузка'}, self.client)
+
+    def request(self, scenario):
+        method, url, data, client = scenario()
+        connection = connections[self.using]
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            try:
+                if data is None:
+                    response = getattr(client, method)(url)
+                else:
+                    response = getattr(client, method)(
+                        url, json.dumps(data),
+                        content_type='application/json')
+                failed = response.status_code >= 400
+            except Exception:
+                # Исключение из представления - такая же ошибка, как 500.
+                failed = True
+            duration = time.perf_counter() - started
+        return duration, len(context.captured_queries), failed
+
+    def run(self, name, requests, warmup=0):
+        scenario = self.scenarios()[name]
+        for _ in range(warmup):
+            self.request(scenario)
+        durations, queries, errors = [], [], 0
+        started = time.perf_counter()
+        for _ in range(requests):
+            duration, count, failed = self.request(scenario)
+            durations.append(duration)
+            queries.append(count)
+            errors += failed
+        return summarize(durations, queries, errors,
+                         time.perf_counter() - started)
+
+
+class ServerBenchmark:
+    # Замер работающего сервера по сети: slow_clients соединений
+    # передают заголовки запроса по строке раз в slow_interval секунд и
+    # не заканчивают их, а concurrency клиентов в это время делают
+    # requests запросов. Так видно, сколько медленные клиенты отнимают
+    # у сервера: синхронный воркер занят ими целиком.
+
+    def __init__(self, url, slow_clients=100, slow_interval=1.0,
+                 concurrency=10, timeout=10.0):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.slow_clients = slow_clients
+        self.slow_interval = slow_interval
+        self.concurrency = concurrency
+        self.timeout = timeout
+
+    def request_head(self, path):
+        return f'GET {path} HTTP/1.1\r\nHost: {self.host}\r\n'.encode()
+
+    async def get(self, path):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            writer.write(
+                self.request_head(path) + b'Connection: close\r\n\r\n')
+            await writer.drain()
+            status_line = await reader.readline()
+            await reader.read()
+        finally:
+            writer.close()
+        return int(status_line.split()[1])
+
+    async def slow_client(self, path, stop):
+        try:
+            reader, writer = await asyncio.open_connection(
+                self.host, self.port)
+        except OSError:
+            return
+        try:
+            writer.write(self.request_head(path))
+            while not stop.is_set():
+                await writer.drain()
+                try:
+                    await asyncio.wait_for(stop.wait(), self.slow_interval)
+                except asyncio.TimeoutError:
+                    writer.write(b'X-Slow-Client: 1\r\n')
+        except OSError:
+            pass
+        finally:
+            writer.close()
+
+    async def probe(self, path, pending, durations):
+        errors = 0
+        while pending:
+            pending.pop()
+            started = time.perf_counter()
+            try:
+                status = await asyncio.wait_for(self.get(path), self.timeout)
+            except (OSError, asyncio.TimeoutError, IndexError, ValueError):
+                errors += 1
+                continue
+            durations.append(time.perf_counter() - started)
+            errors += status >= 400
+        return errors
+
+    async def measure(self, path, requests):
+        stop = asyncio.Event()
+        slow = [asyncio.ensure_future(self.slow_client(path, stop))
+                for _ in range(self.slow_clients)]
+        if slow:
+            # Медленные клиенты успевают подключиться до замера.
+            await asyncio.sleep(self.slow_interval)
+        pending = list(range(requests))
+        durations = []
+        started = time.perf_counter()
+        errors = await asyncio.gather(*(
+            self.probe(path, pending, durations)
+            for _ in range(self.concurrency)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await asyncio.gather(*slow)
+        result = summarize(durations, [], sum(errors), elapsed)
+        result['slow_clients'] = self.slow_clients
+        for key in ('queries_mean', 'queries_max'):
+            del result[key]
+        return result
+
+    def run(self, path, requests):
+        return asyncio.run(self.measure(path, requests))
@@ -0,0 +1,81 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+
+from . import metrics
+
+TITLE = 'title'
+GENRE = 'genre'
+CATEGORY = 'category'
+REVIEW = 'review'
+
+HITS_KEY = 'catalog:stats:hits'
+MISSES_KEY = 'catalog:stats:misses'
+
+
+def catalog_cache():
+    return caches[settings.CATALOG_CACHE_ALIAS]
+
+
+def _version_key(resource):
+    return f'catalog:version:{resource}'
+
+
+def _fresh_version():
+    # Версия, вытесненная из кэша, заводится заново от текущего времени,
+    # чтобы не совпасть с версией уже закэшированных ответов.
+    return int(time.time() * 1000000)
+
+
+def get_versions(resources):
+    cache = catalog_cache()
+    keys = [_version_key(resource) for resource in resources]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _fresh_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_versions(*resources):
+    cache = catalog_cache()
+    for resource in resources:
+        key = _version_key(resource)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _fresh_version(), timeout=None)
+
+
+def response_cache_key(request, resources):
+    query = urlencode(sorted(
+        (name, value)
+        for name, values in request.query_params.lists()
+        for value in values if value != ''
+    ))
+    versions = '.'.join(str(version) for version in get_versions(resources))
+    digest = hashlib.md5(
+        f'{request.path}?{query}'.encode()).hexdigest()
+    return f'catalog:response:{versions}:{digest}'
+
+
+def record_lookup(hit):
+    metrics.inc('yamdb_cache_requests_total', cache='catalog',
+                result='hit' if hit else 'miss')
+    cache = catalog_cache()
+    key = HITS_KEY if hit else MISSES_KEY
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+
+
+def get_stats():
+    stats = catalog_cache().get_many((HITS_KEY, MISSES_KEY))
+    return {'hits': stats.get(HITS_KEY, 0),
+            'misses': stats.get(MISSES_KEY, 0)}
@@ -0,0 +1,49 @@
+import hashlib
+import json
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.db import connections
+
+from .cache import catalog_cache, get_versions
+
+
+def planner_estimate(queryset):
+    # Число строк по оценке планировщика PostgreSQL (EXPLAIN без
+    # выполнения запроса); для остальных баз None.
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def count_rows(queryset, filtered):
+    # Возвращает (количество, оценка ли это). Большой список без
+    # фильтров не пересчитывается: берётся оценка планировщика.
+    if not filtered:
+        estimate = planner_estimate(queryset)
+        if (estimate is not None
+                and estimate >= settings.COUNT_ESTIMATE_THRESHOLD):
+            return estimate, True
+    return queryset.order_by().count(), False
+
+
+def cached_count(queryset, filters, resources):
+    # Количество хранится COUNT_CACHE_TIMEOUT секунд по нормализованным
+    # фильтрам и версиям ресурсов каталога; ETag от него не зависит.
+    versions = '.'.join(str(version) for version in get_versions(resources))
+    digest = hashlib.md5(
+        urlencode(sorted(filters.items())).encode()).hexdigest()
+    key = f'catalog:count:{versions}:{digest}'
+    cache = catalog_cache()
+    result = cache.get(key)
+    if result is None:
+        result = count_rows(queryset, bool(filters))
+        cache.set(key, result, timeout=settings.COUNT_CACHE_TIMEOUT)
+    return result
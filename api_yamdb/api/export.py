@@ -0,0 +1,158 @@
+import csv
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Exists, OuterRef, Prefetch, Q
+from reviews.models import Comment, Review, Title
+
+NDJSON = 'ndjson'
+CSV = 'csv'
+CONTENT_TYPES = {
+    NDJSON: 'application/x-ndjson; charset=utf-8',
+    CSV: 'text/csv; charset=utf-8',
+}
+
+TITLE_FIELDS = ('id', 'name', 'year', 'description', 'category', 'genre',
+                'rating', 'reviews_count', 'update_date')
+REVIEW_FIELDS = ('id', 'title', 'author', 'text', 'score', 'pub_date',
+                 'update_date')
+COMMENT_FIELDS = ('id', 'review', 'author', 'text', 'pub_date',
+                  'update_date')
+
+
+class Echo:
+    # csv.writer пишет строку в буфер и сразу отдаёт её генератору.
+    def write(self, value):
+        return value
+
+
+def iter_chunks(queryset, chunk_size=None):
+    # Постраничный обход по первичному ключу: в памяти не больше одной
+    # пачки, а prefetch_related, который iterator() игнорирует,
+    # выполняется для каждой пачки отдельно.
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    queryset = queryset.order_by('pk')
+    last_pk = None
+    while True:
+        chunk = queryset
+        if last_pk is not None:
+            chunk = chunk.filter(pk__gt=last_pk)
+        chunk = list(chunk[:chunk_size])
+        yield from chunk
+        if len(chunk) < chunk_size:
+            return
+        last_pk = chunk[-1].pk
+
+
+def comment_record(comment):
+    return {
+        'id': comment.id,
+        'review': comment.review_id,
+        'author': comment.author.username,
+        'text': comment.text,
+        'pub_date': comment.pub_date,
+        'update_date': comment.update_date,
+    }
+
+
+def review_record(review, comments=False):
+    record = {
+        'id': review.id,
+        'title': review.title_id,
+        'author': review.author.username,
+        'text': review.text,
+        'score': review.score,
+        'pub_date': review.pub_date,
+        'update_date': review.update_date,
+    }
+    if comments:
+        record['comments'] = [comment_record(comment)
+                              for comment in review.comments.all()]
+    return record
+
+
+def title_record(title, reviews=False):
+    # Категория и жанры выгружаются слагами, как их принимает API
+    # при создании произведения.
+    record = {
+        'id': title.id,
+        'name': title.name,
+        'year': title.year,
+        'description': title.description,
+        'category': title.category.slug if title.category else None,
+        'genre': [genre.slug for genre in title.genre.all()],
+        'rating': title.rating,
+        'reviews_count': title.reviews_count,
+        'update_date': title.update_date,
+    }
+    if reviews:
+        record['reviews'] = [review_record(review, comments=True)
+                             for review in title.reviews.all()]
+    return record
+
+
+def export_titles(since=None, reviews=False):
+    titles = Title.objects.select_related('category').prefetch_related(
+        'genre')
+    if reviews:
+        titles = titles.prefetch_related(Prefetch(
+            'reviews',
+            queryset=Review.objects.select_related('author').order_by(
+                'pk').prefetch_related(Prefetch(
+                    'comments',
+                    queryset=Comment.objects.select_related(
+                        'author').order_by('pk')))))
+    if since is not None:
+        changed = Q(update_date__gte=since)
+        if reviews:
+            # Произведение попадает в выгрузку и при изменении его
+            # отзывов или комментариев к ним.
+            titles = titles.annotate(
+                changed_reviews=Exists(Review.objects.filter(
+                    title=OuterRef('pk'), update_date__gte=since)),
+                changed_comments=Exists(Comment.objects.filter(
+                    review__title=OuterRef('pk'), update_date__gte=since)))
+            changed |= Q(changed_reviews=True) | Q(changed_comments=True)
+        titles = titles.filter(changed)
+    for title in iter_chunks(titles):
+        yield title_record(title, reviews=reviews)
+
+
+def export_reviews(since=None):
+    reviews = Review.objects.select_related('author').order_by('pk')
+    if since is not None:
+        reviews = reviews.filter(update_date__gte=since)
+    for review in reviews.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE):
+        yield review_record(review)
+
+
+def export_comments(since=None):
+    comments = Comment.objects.select_related('author').order_by('pk')
+    if since is not None:
+        comments = comments.filter(update_date__gte=since)
+    for comment in comments.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE):
+        yield comment_record(comment)
+
+
+def render_ndjson(records):
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False,
+                         cls=DjangoJSONEncoder) + '\n'
+
+
+def render_csv(records, fields):
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    encoder = DjangoJSONEncoder()
+    for record in records:
+        row = []
+        for field in fields:
+            value = record[field]
+            if isinstance(value, list):
+                value = ','.join(value)
+            elif value is not None and not isinstance(value, (str, int,
+                                                              float)):
+                value = encoder.default(value)
+            row.append(value)
+        yield writer.writerow(row)
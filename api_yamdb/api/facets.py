@@ -0,0 +1,80 @@
+from django.conf import settings
+from django.db.models import Count, F
+from django.db.models.functions import Floor
+from reviews.models import Title
+
+from .cache import catalog_cache, get_versions
+
+GENRE = 'genre'
+CATEGORY = 'category'
+YEAR = 'year'
+RATING = 'rating'
+FACETS = (GENRE, CATEGORY, YEAR, RATING)
+
+
+def parse_facets(value):
+    # Возвращает запрошенные фасеты в порядке FACETS и неизвестные имена.
+    names = {name.strip() for name in value.split(',') if name.strip()}
+    return [name for name in FACETS if name in names], sorted(
+        names - set(FACETS))
+
+
+def genre_facet(titles):
+    rows = Title.genre.through.objects.filter(title__in=titles).values(
+        'genre__slug', 'genre__name').annotate(
+            count=Count('title_id')).order_by('genre__slug')
+    return [{'slug': row['genre__slug'], 'name': row['genre__name'],
+             'count': row['count']} for row in rows]
+
+
+def category_facet(titles):
+    rows = Title.objects.filter(
+        pk__in=titles, category__isnull=False).values(
+            'category__slug', 'category__name').annotate(
+                count=Count('pk')).order_by('category__slug')
+    return [{'slug': row['category__slug'], 'name': row['category__name'],
+             'count': row['count']} for row in rows]
+
+
+def year_facet(titles):
+    return list(Title.objects.filter(pk__in=titles).values(
+        'year').annotate(count=Count('pk')).order_by('year'))
+
+
+def rating_facet(titles):
+    # Полосы по целой части рейтинга: 7 - рейтинг от 7 до 8,
+    # null - произведения без отзывов.
+    rows = Title.objects.filter(pk__in=titles).annotate(
+        band=Floor('rating')).values('band').annotate(
+            count=Count('pk')).order_by(F('band').asc(nulls_last=True))
+    return [{'rating': None if row['band'] is None else int(row['band']),
+             'count': row['count']} for row in rows]
+
+
+FACET_QUERIES = {
+    GENRE: genre_facet,
+    CATEGORY: category_facet,
+    YEAR: year_facet,
+    RATING: rating_facet,
+}
+
+
+def compute_facets(queryset, names):
+    # Один группирующий запрос на фасет; отфильтрованные произведения
+    # подставляются подзапросом, поэтому JOIN с жанрами из фильтра не
+    # размножает строки.
+    titles = queryset.order_by().values('pk')
+    return {name: FACET_QUERIES[name](titles) for name in names}
+
+
+def cached_facets(queryset, names, resources):
+    # Фасеты без фильтров одинаковы для всех клиентов и хранятся
+    # FACETS_CACHE_TIMEOUT секунд по версиям ресурсов каталога.
+    versions = '.'.join(str(version) for version in get_versions(resources))
+    key = f'catalog:facets:{versions}:{",".join(names)}'
+    cache = catalog_cache()
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_facets(queryset, names)
+        cache.set(key, facets, timeout=settings.FACETS_CACHE_TIMEOUT)
+    return facets
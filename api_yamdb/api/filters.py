@@ -1,5 +1,8 @@
 from django_filters import rest_framework
+from rest_framework import filters
+from rest_framework.settings import api_settings
 from reviews.models import Title
+from reviews.search import search_titles
 
 
 class TitleFilter(rest_framework.FilterSet):
@@ -8,14 +11,27 @@ class TitleFilter(rest_framework.FilterSet):
         lookup_expr='contains'
     )
     category = rest_framework.CharFilter(
-        field_name='category__slug',
-        lookup_expr='contains'
+        field_name='category__slug'
     )
     genre = rest_framework.CharFilter(
-        field_name='genre__slug',
-        lookup_expr='contains'
+        field_name='genre__slug'
     )
 
     class Meta:
         model = Title
         fields = ['name', 'genre', 'category', 'year']
+
+
+class TitleSearchFilter(filters.SearchFilter):
+    # Полнотекстовый поиск по названию и описанию. Без явного
+    # параметра ordering результаты упорядочены по релевантности,
+    # поэтому фильтр стоит после OrderingFilter.
+
+    def filter_queryset(self, request, queryset, view):
+        term = ' '.join(self.get_search_terms(request))
+        if not term:
+            return queryset
+        queryset = search_titles(queryset, term)
+        if request.query_params.get(api_settings.ORDERING_PARAM):
+            return queryset
+        return queryset.order_by('-rank', 'pk')
@@ -0,0 +1,151 @@
+import json
+import subprocess
+from collections import OrderedDict
+
+from api.benchmark import ApiBenchmark
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import setup_test_environment
+from django.utils import timezone
+from reviews.loading import DEFAULT_BATCH_SIZE, load_tables
+from reviews.synthetic import SyntheticData, next_ids
+
+SIZES = ('users', 'categories', 'genres', 'titles', 'reviews', 'comments')
+COMPARED = ('p50_ms', 'p95_ms', 'p99_ms', 'rps', 'queries_mean')
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ('Замеряет задержки и количество запросов к базе для основных '
+            'адресов API. Сценарии записи меняют данные, поэтому команду '
+            'запускают на отдельной базе.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed-data',
+            action='store_true',
+            help='Перед замером дописать в базу синтетические данные.'
+        )
+        for name, default in zip(SIZES, (1000, 10, 20, 1000, 10000, 10000)):
+            parser.add_argument(
+                f'--{name}',
+                type=int,
+                default=default,
+                help=f'Сколько записей {name} создать с --seed-data.'
+            )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Зерно генератора данных и выбора адресов.'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Сколько замеряемых запросов в каждом сценарии.'
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=10,
+            help='Сколько запросов сделать до замера.'
+        )
+        parser.add_argument(
+            '--scenario',
+            action='append',
+            help='Запустить только этот сценарий, можно повторять.'
+        )
+        parser.add_argument(
+            '--output',
+            help='Сохранить результаты в JSON-файл.'
+        )
+        parser.add_argument(
+            '--compare',
+            help='JSON-файл прошлого замера для сравнения.'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            # Разрешает хост testserver и подменяет отправку почты.
+            setup_test_environment()
+        except RuntimeError:
+            pass
+        if options['seed_data']:
+            self.seed_data(options)
+        try:
+            benchmark = ApiBenchmark(DEFAULT_DB_ALIAS, seed=options['seed'])
+        except ValueError as error:
+            raise CommandError(f'{error}, запустите команду с --seed-data')
+        names = options['scenario'] or list(benchmark.scenarios())
+        unknown = set(names) - set(benchmark.scenarios())
+        if unknown:
+            raise CommandError(
+                f'Неизвестные сценарии: {", ".join(sorted(unknown))}')
+        results = OrderedDict()
+        for name in names:
+            results[name] = benchmark.run(name, options['requests'],
+                                          options['warmup'])
+            self.stdout.write(self.format_result(name, results[name]))
+        report = {'meta': self.meta(options), 'results': results}
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+        if options['compare']:
+            self.compare(options['compare'], results)
+
+    def seed_data(self, options):
+        data = SyntheticData(
+            *(options[name] for name in SIZES), seed=options['seed'],
+            first_ids=next_ids(DEFAULT_DB_ALIAS))
+        load_tables(data.sources(), DEFAULT_DB_ALIAS,
+                    batch_size=DEFAULT_BATCH_SIZE, report=self.report)
+
+    def report(self, table, loaded, elapsed):
+        self.stdout.write(f'{table}: создано {loaded} за {elapsed:.2f} с')
+
+    def meta(self, options):
+        return {
+            'commit': git_commit(),
+            'database': connections[DEFAULT_DB_ALIAS].vendor,
+            'created': timezone.now().isoformat(),
+            'requests': options['requests'],
+            'warmup': options['warmup'],
+            'seed': options['seed'],
+            'sizes': {name: options[name] for name in SIZES}
+            if options['seed_data'] else None,
+        }
+
+    @staticmethod
+    def format_result(name, result):
+        return (f'{name}: p50 {result["p50_ms"]} мс, '
+                f'p95 {result["p95_ms"]} мс, p99 {result["p99_ms"]} мс, '
+                f'{result["rps"]} запр/с, запросов к базе '
+                f'{result["queries_mean"]} (макс. {result["queries_max"]}), '
+                f'ошибок {result["errors"]}')
+
+    def compare(self, path, results):
+        try:
+            with open(path, encoding='utf-8') as file:
+                baseline = json.load(file)['results']
+        except (OSError, ValueError, KeyError) as error:
+            raise CommandError(f'Не удалось прочитать {path}: {error}')
+        self.stdout.write(f'Сравнение с {path}:')
+        for name, result in results.items():
+            if name not in baseline:
+                continue
+            changes = []
+            for key in COMPARED:
+                old, new = baseline[name].get(key), result[key]
+                if old and new is not None:
+                    changes.append(f'{key} {(new - old) / old:+.1%}')
+            self.stdout.write(f'{name}: {", ".join(changes)}')
@@ -0,0 +1,90 @@
+import json
+from collections import OrderedDict
+
+from api.benchmark import ServerBenchmark
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает запущенные серверы (например, WSGI и ASGI) по '
+            'задержкам и пропускной способности, пока к ним подключены '
+            'медленные клиенты.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target',
+            action='append',
+            required=True,
+            help='Сервер в виде имя=адрес, например '
+                 'asgi=http://127.0.0.1:8001, можно повторять.'
+        )
+        parser.add_argument(
+            '--path',
+            default='/api/v1/titles/',
+            help='Адрес, к которому идут замеряемые запросы.'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Сколько замеряемых запросов к каждому серверу.'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=10,
+            help='Сколько замеряемых запросов идёт одновременно.'
+        )
+        parser.add_argument(
+            '--slow-clients',
+            type=int,
+            default=100,
+            help='Сколько медленных клиентов держат соединения.'
+        )
+        parser.add_argument(
+            '--slow-interval',
+            type=float,
+            default=1.0,
+            help='Пауза в секундах между строками заголовков '
+                 'медленного клиента.'
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=10.0,
+            help='Время ожидания ответа в секундах, потом запрос - ошибка.'
+        )
+        parser.add_argument(
+            '--output',
+            help='Сохранить результаты в JSON-файл.'
+        )
+
+    def handle(self, *args, **options):
+        targets = OrderedDict()
+        for target in options['target']:
+            name, separator, url = target.partition('=')
+            if not separator or not url.startswith('http://'):
+                raise CommandError(
+                    f'Укажите сервер в виде имя=http://хост:порт: {target}')
+            targets[name] = url
+        results = OrderedDict()
+        for name, url in targets.items():
+            benchmark = ServerBenchmark(
+                url, slow_clients=options['slow_clients'],
+                slow_interval=options['slow_interval'],
+                concurrency=options['concurrency'],
+                timeout=options['timeout'])
+            results[name] = benchmark.run(options['path'],
+                                          options['requests'])
+            self.stdout.write(self.format_result(name, results[name]))
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump({'path': options['path'], 'results': results},
+                          file, ensure_ascii=False, indent=2)
+
+    @staticmethod
+    def format_result(name, result):
+        return (f'{name}: p50 {result["p50_ms"]} мс, '
+                f'p95 {result["p95_ms"]} мс, p99 {result["p99_ms"]} мс, '
+                f'{result["rps"]} запр/с, ошибок {result["errors"]} '
+                f'при {result["slow_clients"]} медленных клиентах')
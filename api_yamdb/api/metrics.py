@@ -0,0 +1,238 @@
+import atexit
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+
+COUNTER = 'counter'
+GAUGE = 'gauge'
+HISTOGRAM = 'histogram'
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+# Имя: (тип, описание, границы корзин гистограммы).
+METRICS = {
+    'yamdb_http_request_duration_seconds': (
+        HISTOGRAM, 'Время обработки запроса.', DURATION_BUCKETS),
+    'yamdb_http_request_queries': (
+        HISTOGRAM, 'SQL-запросов на один запрос к API.', QUERY_BUCKETS),
+    'yamdb_db_duration_seconds_total': (
+        COUNTER, 'Суммарное время SQL-запросов.', None),
+    'yamdb_cache_requests_total': (
+        COUNTER, 'Обращения к кэшам по результату.', None),
+    'yamdb_email_outbox_pending': (
+        GAUGE, 'Письма в очереди на отправку.', None),
+    'yamdb_email_outbox_failed': (
+        GAUGE, 'Письма, которые больше не будут отправляться.', None),
+}
+
+_counters = defaultdict(float)
+# Ключ -> [счётчики корзин..., +Inf], сумма.
+_histograms = {}
+_lock = threading.Lock()
+_flushed = 0
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def inc(name, value=1, **labels):
+    with _lock:
+        _counters[_key(name, labels)] += value
+
+
+def observe(name, value, **labels):
+    buckets = METRICS[name][2]
+    key = _key(name, labels)
+    with _lock:
+        counts, total = _histograms.get(key) or ([0] * (len(buckets) + 1), 0)
+        counts[bisect_left(buckets, value)] += 1
+        _histograms[key] = counts, total + value
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def _as_snapshot(counters, histograms):
+    return {
+        'counters': [[name, labels, value]
+                     for (name, labels), value in counters.items()],
+        'histograms': [[name, labels, list(counts), total]
+                       for (name, labels), (counts, total)
+                       in histograms.items()],
+    }
+
+
+def snapshot():
+    with _lock:
+        return _as_snapshot(_counters, _histograms)
+
+
+def _path(pid=None):
+    return os.path.join(settings.METRICS_DIR,
+                        f'metrics_{pid or os.getpid()}.json')
+
+
+def _archive_path():
+    return os.path.join(settings.METRICS_DIR, 'metrics_archive.json')
+
+
+def _write(path, data):
+    # Файл заменяется атомарно, поэтому читатель не увидит его
+    # недописанным.
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=settings.METRICS_DIR,
+                                             suffix='.tmp')
+    with os.fdopen(descriptor, 'w') as file:
+        json.dump(data, file)
+    os.replace(temporary, path)
+
+
+def _read(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def flush(force=False):
+    # Каждый процесс пишет свои значения в отдельный файл METRICS_DIR.
+    # Без force запись не чаще METRICS_FLUSH_INTERVAL.
+    global _flushed
+    if not settings.METRICS_DIR:
+        return
+    now = time.monotonic()
+    if not force and now - _flushed < settings.METRICS_FLUSH_INTERVAL:
+        return
+    _flushed = now
+    data = snapshot()
+    # Мастер gunicorn загружает модуль ради child_exit, но ничего не
+    # измеряет: пустой файл после него никто бы не удалил.
+    if data['counters'] or data['histograms']:
+        _write(_path(), data)
+
+
+atexit.register(flush, force=True)
+
+
+def _merge(snapshots):
+    counters = defaultdict(float)
+    histograms = {}
+    for data in snapshots:
+        for name, labels, value in data['counters']:
+            counters[_key(name, dict(labels))] += value
+        for name, labels, counts, total in data['histograms']:
+            key = _key(name, dict(labels))
+            merged, merged_total = histograms.get(key) or (
+                [0] * len(counts), 0)
+            histograms[key] = ([a + b for a, b in zip(merged, counts)],
+                               merged_total + total)
+    return counters, histograms
+
+
+def written_pids():
+    if not settings.METRICS_DIR:
+        return []
+    return [int(os.path.basename(path)[len('metrics_'):-len('.json')])
+            for path in glob.glob(_path('[0-9]*'))]
+
+
+def mark_process_dead(pid):
+    # Значения завершившегося воркера переносятся в общий архив, а его
+    # файл удаляется: счётчики не уменьшаются при перезапуске воркеров,
+    # а файлы не копятся. Вызывается из мастера gunicorn (child_exit),
+    # поэтому архив пишет один процесс. Архив помнит перенесённые pid,
+    # чтобы до удаления файла читатели не учли его дважды.
+    if not settings.METRICS_DIR:
+        return
+    path = _path(pid)
+    data = _read(path)
+    if data is None:
+        return
+    archive = _read(_archive_path()) or {
+        'counters': [], 'histograms': [], 'merged': []}
+    merged = [old for old in archive['merged']
+              if os.path.exists(_path(old))]
+    data = _as_snapshot(*_merge([archive, data]))
+    data['merged'] = merged + [pid]
+    _write(_archive_path(), data)
+    os.remove(path)
+
+
+def collect():
+    # Сумма значений всех процессов: архив завершившихся воркеров,
+    # файлы остальных воркеров и живые значения текущего.
+    snapshots = []
+    if settings.METRICS_DIR:
+        archive = _read(_archive_path())
+        merged = set()
+        if archive is not None:
+            snapshots.append(archive)
+            merged = set(archive['merged'])
+        for pid in written_pids():
+            if pid == os.getpid() or pid in merged:
+                continue
+            data = _read(_path(pid))
+            if data is not None:
+                snapshots.append(data)
+    snapshots.append(snapshot())
+    return _merge(snapshots)
+
+
+def _escape(value):
+    return (str(value).replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\n', '\\n'))
+
+
+def _labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"'
+                          for name, value in pairs) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _histogram_lines(name, buckets, histograms):
+    for (metric, labels), (counts, total) in sorted(histograms.items()):
+        if metric != name:
+            continue
+        cumulative = 0
+        for bound, count in zip(list(buckets) + ['+Inf'], counts):
+            cumulative += count
+            yield f'{name}_bucket{_labels(labels, le=bound)} {cumulative}'
+        yield f'{name}_sum{_labels(labels)} {_number(total)}'
+        yield f'{name}_count{_labels(labels)} {cumulative}'
+
+
+def render(gauges=None):
+    # Текстовый формат Prometheus. gauges: имя -> значение, считаются
+    # при каждом запросе метрик.
+    counters, histograms = collect()
+    lines = []
+    for name, (kind, description, buckets) in METRICS.items():
+        lines += [f'# HELP {name} {description}', f'# TYPE {name} {kind}']
+        if kind == HISTOGRAM:
+            lines += _histogram_lines(name, buckets, histograms)
+        elif kind == COUNTER:
+            lines += [f'{name}{_labels(labels)} {_number(value)}'
+                      for (metric, labels), value in sorted(counters.items())
+                      if metric == name]
+        elif gauges and name in gauges:
+            lines.append(f'{name} {_number(gauges[name])}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,133 @@
+import logging
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import InterfaceError, OperationalError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+from . import metrics, replicas
+from .timing import start_timer, stop_timer
+
+logger = logging.getLogger(__name__)
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else request.path
+
+
+def view_labels(request):
+    # Класс представления и действие, а не путь запроса: число рядов
+    # метрик не зависит от id в адресах.
+    match = getattr(request, 'resolver_match', None)
+    method = request.method.lower()
+    if match is None:
+        return 'unknown', method
+    view = getattr(match.func, 'cls', match.func)
+    return (view.__name__,
+            getattr(match.func, 'actions', {}).get(method, method))
+
+
+class ServerTimingMiddleware:
+    # Считает SQL-запросы через execute_wrapper, поэтому работает и без
+    # DEBUG, и отдаёт в заголовке Server-Timing время базы, сериализации,
+    # остального кода представления и всего запроса. Медленные запросы
+    # и повторы одного SQL (признак N+1) пишутся в журнал, а время
+    # и число SQL-запросов попадают в метрики.
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not (settings.SERVER_TIMING or settings.METRICS_ENABLED):
+            return self.get_response(request)
+        timer = start_timer()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timer))
+                response = self.get_response(request)
+        finally:
+            stop_timer()
+        total = timer.elapsed()
+        if settings.METRICS_ENABLED:
+            self.record_metrics(request, response, timer, total)
+        if not settings.SERVER_TIMING:
+            return response
+        serializer = timer.sections['serializer']
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={timer.db_time * 1000:.1f};'
+            f'desc="{timer.queries} queries"',
+            f'serializer;dur={serializer * 1000:.1f}',
+            f'view;dur='
+            f'{max(total - timer.db_time - serializer, 0) * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ))
+        self.report(request, response, timer, total)
+        return response
+
+    @staticmethod
+    def record_metrics(request, response, timer, total):
+        view, action = view_labels(request)
+        labels = {'view': view, 'action': action,
+                  'status': response.status_code}
+        metrics.observe('yamdb_http_request_duration_seconds', total,
+                        **labels)
+        metrics.observe('yamdb_http_request_queries', timer.queries,
+                        **labels)
+        metrics.inc('yamdb_db_duration_seconds_total', timer.db_time,
+                    view=view)
+        metrics.flush()
+
+    @staticmethod
+    def report(request, response, timer, total):
+        name = view_name(request)
+        if total * 1000 >= settings.SLOW_REQUEST_MS:
+            duration, sql = timer.slowest
+            logger.warning(
+                'Медленный запрос %s %s (%s, %s): %.0f мс, SQL-запросов %s '
+                'за %.0f мс, самый долгий %.0f мс: %s',
+                request.method, request.get_full_path(), name,
+                response.status_code, total * 1000, timer.queries,
+                timer.db_time * 1000, duration * 1000, sql)
+        for sql, count in timer.repeated(settings.REPEATED_QUERY_THRESHOLD):
+            logger.warning('Повторяющийся SQL в %s (%s раз): %s',
+                           name, count, sql)
+
+
+class ReplicaMiddleware:
+    # Безопасные запросы к наборам представлений API читают с реплики.
+    # Если реплика отказала посреди запроса, он выполняется заново на
+    # основной базе. После запроса на запись клиент REPLICA_PIN_SECONDS
+    # секунд читает с основной базы и сразу видит свои изменения.
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.REPLICA_DATABASES:
+            return self.get_response(request)
+        try:
+            return self.get_response(request)
+        finally:
+            replicas.use_primary()
+            if request.method not in SAFE_METHODS:
+                replicas.pin_to_primary(request)
+
+    @staticmethod
+    def process_view(request, view_func, view_args, view_kwargs):
+        if not (settings.REPLICA_DATABASES
+                and request.method in SAFE_METHODS
+                and getattr(view_func, 'actions', None) is not None):
+            return None
+        alias = replicas.choose_replica(request)
+        if alias is None:
+            return None
+        replicas.use_replica(alias)
+        try:
+            return view_func(request, *view_args, **view_kwargs)
+        except (InterfaceError, OperationalError) as error:
+            # Django вызовет представление ещё раз, уже с основной базой.
+            replicas.mark_down(alias, error)
+            replicas.use_primary()
+            return None
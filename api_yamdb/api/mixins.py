@@ -1,4 +1,24 @@
-from rest_framework import mixins, viewsets
+import hashlib
+from calendar import timegm
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import Count, Max
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .cache import (catalog_cache, get_versions, record_lookup,
+                    response_cache_key)
+
+BULK_NOT_LIST = 'Ожидается непустой список объектов'
+BULK_TOO_LARGE = 'Не более {} объектов за запрос'
+BULK_CONFLICT = 'Объекты изменились во время записи, повторите запрос'
 
 
 class CreateListDeleteViewSet(mixins.CreateModelMixin,
@@ -6,3 +26,202 @@ class CreateListDeleteViewSet(mixins.CreateModelMixin,
                               mixins.DestroyModelMixin,
                               viewsets.GenericViewSet):
     pass
+
+
+class NestedParentMixin:
+    # Список фильтруется по идентификатору родителя из URL, а сам
+    # родитель выбирается не более раза за запрос: для 404 на пустой
+    # странице и при создании объекта. Родитель - объект parent_model,
+    # поля которого совпадают с аргументами URL из parent_lookups.
+    parent_model = None
+    parent_lookups = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.parent_model is None or not cls.parent_lookups:
+            raise ImproperlyConfigured(
+                f'{cls.__name__}: задайте parent_model и parent_lookups')
+
+    def get_parent_queryset(self):
+        return self.parent_model.objects.filter(**{
+            field: self.kwargs.get(kwarg)
+            for field, kwarg in self.parent_lookups.items()
+        })
+
+    def get_parent(self):
+        if not hasattr(self, '_parent'):
+            self._parent = get_object_or_404(self.get_parent_queryset())
+        return self._parent
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if not page:
+            self.get_parent()
+        return page
+
+
+class CatalogCacheMixin:
+    # Ответы анонимным пользователям кэшируются по нормализованным
+    # параметрам запроса и версиям ресурсов из cache_resources; запись
+    # в любой из них меняет версию и делает старые ключи недостижимыми.
+    cache_resources = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.cached(super().list, request, *args, **kwargs)
+
+    def cached(self, handler, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return handler(request, *args, **kwargs)
+        cache = catalog_cache()
+        key = response_cache_key(request, self.cache_resources)
+        entry = cache.get(key)
+        record_lookup(hit=entry is not None)
+        if entry is not None:
+            data, headers = entry
+            response = Response(data, headers={**headers, 'X-Cache': 'HIT'})
+            return get_conditional_response(
+                request,
+                etag=headers.get('ETag'),
+                last_modified=parse_http_date_safe(
+                    headers.get('Last-Modified')),
+                response=response
+            )
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            headers = {name: response[name]
+                       for name in ('ETag', 'Last-Modified')
+                       if response.has_header(name)}
+            cache.set(key, (response.data, headers))
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+class ConditionalGetMixin:
+    # ETag и Last-Modified считаются одним агрегирующим запросом по
+    # количеству объектов и их последней дате изменения, поэтому 304
+    # отдаётся до выборки страницы и сериализации. У представлений с
+    # cache_resources количество заменяют версии ресурсов каталога:
+    # они меняются при любой записи, в том числе при удалении, и COUNT
+    # в валидаторе не нужен.
+    update_date_field = 'update_date'
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        validator, last_modified = self.get_list_validator(queryset)
+        if last_modified is None:
+            return super().list(request, *args, **kwargs)
+        return self.conditional(super().list, validator, last_modified,
+                                request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        last_modified = self.get_queryset().filter(
+            **{self.lookup_field: kwargs[lookup_url_kwarg]}
+        ).values_list(self.update_date_field, flat=True).first()
+        if last_modified is None:
+            return super().retrieve(request, *args, **kwargs)
+        return self.conditional(super().retrieve, last_modified,
+                                last_modified, request, *args, **kwargs)
+
+    def get_list_validator(self, queryset):
+        resources = getattr(self, 'cache_resources', ())
+        if resources:
+            last_modified = queryset.order_by().aggregate(
+                last_modified=Max(self.update_date_field))['last_modified']
+            return (last_modified, *get_versions(resources)), last_modified
+        totals = queryset.order_by().aggregate(
+            count=Count('pk'), last_modified=Max(self.update_date_field))
+        return ((totals['count'], totals['last_modified']),
+                totals['last_modified'])
+
+    def conditional(self, handler, validator, last_modified, request,
+                    *args, **kwargs):
+        digest = hashlib.md5(
+            f'{request.get_full_path()}|{request.accepted_media_type}|'
+            f'{validator}'.encode()).hexdigest()
+        etag = f'W/"{digest}"'
+        timestamp = timegm(last_modified.utctimetuple())
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=timestamp)
+        if not_modified is not None:
+            return not_modified
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(timestamp)
+        return response
+
+
+class BulkCreateMixin:
+    # POST .../bulk/ принимает список объектов. Все они проверяются
+    # вместе, связанные объекты выбираются одним запросом на таблицу,
+    # а запись идёт через bulk_create в одной транзакции. Если хотя бы
+    # один объект не прошёл проверку, ничего не сохраняется, а в ответе
+    # ошибки по каждому объекту в порядке запроса. Подкласс задаёт
+    # bulk_serializer_class и perform_bulk_create(serializers, using),
+    # который сохраняет проверенные объекты и возвращает данные ответа.
+    bulk_serializer_class = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if (cls.bulk_serializer_class is None
+                or not hasattr(cls, 'perform_bulk_create')):
+            raise ImproperlyConfigured(
+                f'{cls.__name__}: задайте bulk_serializer_class и '
+                'perform_bulk_create')
+
+    def get_bulk_context(self, items):
+        return self.get_serializer_context()
+
+    def validate_bulk(self, serializers, errors):
+        pass
+
+    @action(methods=['post'], detail=False, url_path='bulk')
+    def bulk(self, request, *args, **kwargs):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError(BULK_NOT_LIST)
+        if len(items) > settings.BULK_MAX_ITEMS:
+            raise ValidationError(
+                BULK_TOO_LARGE.format(settings.BULK_MAX_ITEMS))
+        context = self.get_bulk_context(items)
+        serializers = [self.bulk_serializer_class(data=item, context=context)
+                       for item in items]
+        errors = [{} if serializer.is_valid() else dict(serializer.errors)
+                  for serializer in serializers]
+        self.validate_bulk(serializers, errors)
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        using = router.db_for_write(self.bulk_serializer_class.Meta.model)
+        try:
+            with transaction.atomic(using=using):
+                data = self.perform_bulk_create(serializers, using)
+        except IntegrityError:
+            raise ValidationError(BULK_CONFLICT)
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    @staticmethod
+    def bulk_values(items, key):
+        # Значения поля key из ещё не проверенных объектов запроса:
+        # по ним связанные объекты выбираются до проверки.
+        values = set()
+        for item in items:
+            value = item.get(key) if isinstance(item, dict) else None
+            for value in value if isinstance(value, list) else [value]:
+                if isinstance(value, (str, int)) and not isinstance(
+                        value, bool):
+                    values.add(value)
+        return values
+
+    @staticmethod
+    def bulk_insert(objs, using):
+        # Первичные ключи из bulk_create Django 2.2 получает только
+        # в PostgreSQL; в остальных базах объекты сохраняются по одному.
+        # Возвращает True, если post_save не отправлялся и его работу
+        # нужно выполнить вручную.
+        if connections[using].features.can_return_ids_from_bulk_insert:
+            type(objs[0]).objects.using(using).bulk_create(objs)
+            return True
+        for obj in objs:
+            obj.save(force_insert=True, using=using)
+        return False
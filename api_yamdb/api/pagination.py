@@ -0,0 +1,227 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as Base64Error
+from collections import OrderedDict
+from functools import partial
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (LimitOffsetPagination,
+                                       PageNumberPagination)
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from . import counts
+
+INVALID_CURSOR = 'Неверный курсор'
+
+
+class KeysetPagination(LimitOffsetPagination):
+    # Параметр cursor (в том числе пустой) включает постраничный вывод
+    # по ключу ordering без COUNT и OFFSET; без него работают прежние
+    # limit/offset.
+    cursor_query_param = 'cursor'
+    ordering = ('-pub_date', '-id')
+
+    def keyset_requested(self, request):
+        return self.cursor_query_param in request.query_params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.use_keyset = self.keyset_requested(request)
+        if not self.use_keyset:
+            return super().paginate_queryset(queryset, request, view)
+        self.request = request
+        self.limit = self.get_limit(request)
+        reverse, position = self.decode_cursor(
+            request.query_params.get(self.cursor_query_param, ''),
+            queryset.model)
+        ordering = self.ordering
+        if reverse:
+            ordering = [self._invert(field) for field in ordering]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._after(ordering, position))
+        page = list(queryset[:self.limit + 1])
+        has_more = len(page) > self.limit
+        page = page[:self.limit]
+        if reverse:
+            page.reverse()
+        self.next_position = self.previous_position = None
+        if page and (has_more or reverse):
+            self.next_position = self._position(page[-1])
+        if page and (has_more if reverse else position is not None):
+            self.previous_position = self._position(page[0])
+        return page
+
+    def get_paginated_response(self, data):
+        if not self.use_keyset:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_next_link(self):
+        if not self.use_keyset:
+            return super().get_next_link()
+        if self.next_position is None:
+            return None
+        return self._link(False, self.next_position)
+
+    def get_previous_link(self):
+        if not self.use_keyset:
+            return super().get_previous_link()
+        if self.previous_position is None:
+            return None
+        return self._link(True, self.previous_position)
+
+    def encode_cursor(self, reverse, position):
+        payload = json.dumps([int(reverse)] + [
+            value.isoformat() if hasattr(value, 'isoformat') else value
+            for value in position
+        ])
+        return urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, cursor, model):
+        if not cursor:
+            return False, None
+        try:
+            reverse, *position = json.loads(
+                urlsafe_b64decode(cursor.encode()).decode())
+            if len(position) != len(self.ordering):
+                raise ValueError
+            position = [
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, position)
+            ]
+        except (Base64Error, TypeError, UnicodeDecodeError, ValueError,
+                ValidationError):
+            raise NotFound(INVALID_CURSOR)
+        if None in position:
+            raise NotFound(INVALID_CURSOR)
+        return bool(reverse), position
+
+    def _link(self, reverse, position):
+        url = remove_query_param(self.request.build_absolute_uri(),
+                                 self.offset_query_param)
+        return replace_query_param(url, self.cursor_query_param,
+                                   self.encode_cursor(reverse, position))
+
+    def _position(self, instance):
+        # Страница может состоять из строк .values().
+        if isinstance(instance, dict):
+            return [instance[field.lstrip('-')] for field in self.ordering]
+        return [getattr(instance, field.lstrip('-'))
+                for field in self.ordering]
+
+    @staticmethod
+    def _invert(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    @staticmethod
+    def _after(ordering, position):
+        # Строки строго после позиции в порядке ordering:
+        # (a < x) OR (a = x AND b < y) OR ...
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+
+class RankPagination(KeysetPagination):
+    # Место в рейтинге уникально, поэтому оно одно служит ключом,
+    # а постраничный вывод всегда идёт по курсору.
+    ordering = ('rank',)
+
+    def keyset_requested(self, request):
+        return True
+
+
+class CountedPaginator(Paginator):
+    # Количество известно заранее, и COUNT не выполняется.
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.known_count = count
+
+    @property
+    def count(self):
+        return self.known_count
+
+
+class CachedCountPagination(PageNumberPagination):
+    # Количество берётся из кэша по нормализованным фильтрам или из
+    # оценки планировщика (api.counts). Параметр count=false убирает
+    # count из ответа, и количество не считается вовсе. Без точного
+    # количества следующая страница определяется по лишней строке.
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.count = None
+        estimated = False
+        if request.query_params.get(
+                self.count_query_param, '').lower() not in ('false', '0'):
+            self.count, estimated = counts.cached_count(
+                queryset, view.get_filter_params(), view.cache_resources)
+        if self.count is None or estimated:
+            return self.paginate_open(queryset, request)
+        self.django_paginator_class = partial(CountedPaginator,
+                                              count=self.count)
+        return super().paginate_queryset(queryset, request, view)
+
+    def paginate_open(self, queryset, request):
+        self.page = None
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        page_number = request.query_params.get(self.page_query_param, 1)
+        try:
+            self.number = int(page_number)
+            if self.number < 1:
+                raise ValueError
+        except ValueError:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message=''))
+        offset = (self.number - 1) * page_size
+        rows = list(queryset[offset:offset + page_size + 1])
+        if not rows and self.number > 1:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message=''))
+        self.has_next = len(rows) > page_size
+        return rows[:page_size]
+
+    def get_paginated_response(self, data):
+        count = [] if self.count is None else [('count', self.count)]
+        return Response(OrderedDict([
+            *count,
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_next_link(self):
+        if self.page is not None:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(),
+                                   self.page_query_param, self.number + 1)
+
+    def get_previous_link(self):
+        if self.page is not None:
+            return super().get_previous_link()
+        if self.number == 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param,
+                                   self.number - 1)
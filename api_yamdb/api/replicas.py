@@ -0,0 +1,84 @@
+import hashlib
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+# Реплика -> время (monotonic), до которого она считается недоступной.
+_down_until = {}
+
+
+def use_replica(alias):
+    _local.alias = alias
+
+
+def use_primary():
+    _local.alias = None
+
+
+def current_alias():
+    return getattr(_local, 'alias', None)
+
+
+def available_replicas():
+    # Реплика, на которой запрос упал с ошибкой базы, пропускается
+    # REPLICA_RETRY_SECONDS секунд, и чтения идут в основную базу.
+    now = time.monotonic()
+    return [alias for alias in settings.REPLICA_DATABASES
+            if _down_until.get(alias, 0) <= now]
+
+
+def mark_down(alias, error):
+    _down_until[alias] = time.monotonic() + settings.REPLICA_RETRY_SECONDS
+    logger.warning('Реплика %s недоступна: %s', alias, error)
+
+
+def reset_health():
+    _down_until.clear()
+
+
+def _pin_key(request):
+    # Клиент определяется по заголовку Authorization, а без него - по
+    # адресу, поэтому закрепление работает и без сессий.
+    client = request.META.get('HTTP_AUTHORIZATION') or (
+        'ip:' + request.META.get('REMOTE_ADDR', ''))
+    return 'replica:pin:' + hashlib.md5(client.encode()).hexdigest()
+
+
+def pin_to_primary(request):
+    cache.set(_pin_key(request), True, timeout=settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(request):
+    return cache.get(_pin_key(request)) is not None
+
+
+def choose_replica(request):
+    if is_pinned(request):
+        return None
+    replicas = available_replicas()
+    return random.choice(replicas) if replicas else None
+
+
+class ReplicaRouter:
+    # Чтения идут в реплику, только если её выбрал ReplicaMiddleware
+    # для текущего запроса; запись и всё вне запросов - в основную базу.
+
+    def db_for_read(self, model, **hints):
+        return current_alias()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db not in settings.REPLICA_DATABASES
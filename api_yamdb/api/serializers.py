@@ -2,12 +2,13 @@ from django.core.validators import MaxValueValidator
 from django.utils import timezone
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
-from rest_framework.generics import get_object_or_404
 from rest_framework.validators import UniqueValidator
 from reviews import models
 
+from .timing import TimedSerializerMixin
 
-class CommentSerializer(serializers.ModelSerializer):
+
+class CommentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     author = serializers.SlugRelatedField(slug_field='username',
                                           read_only=True)
 
@@ -17,12 +18,19 @@ class CommentSerializer(serializers.ModelSerializer):
         read_only_fields = ('review', 'author')
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+ALREADY_REVIEWED = ('Пользователь может добавить не более одного отзыва '
+                    'для каждого произведения!')
+TITLE_NOT_FOUND = 'Произведение не найдено'
+SLUG_NOT_FOUND = 'Объект со slug {} не найден'
+
+
+class ReviewSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     author = serializers.SlugRelatedField(slug_field='username',
                                           read_only=True)
 
     class Meta:
-        fields = ('id', 'text', 'author', 'score', 'pub_date')
+        fields = ('id', 'text', 'author', 'score', 'pub_date',
+                  'comments_count')
         read_only_fields = ('author', 'title')
         model = models.Review
 
@@ -30,41 +38,65 @@ class ReviewSerializer(serializers.ModelSerializer):
         request = self.context['request']
         if request.method != 'POST':
             return data
-        title_id = self.context['view'].kwargs.get('title_id')
-        title = get_object_or_404(models.Title, pk=title_id)
-        if models.Review.objects.filter(title=title,
-                                        author=request.user).exists():
-            raise ValidationError('Пользователь может добавить не '
-                                  'более одного отзыва для каждого '
-                                  'произведения!')
+        if self.context['view'].get_parent().already_reviewed:
+            raise ValidationError(ALREADY_REVIEWED)
         return data
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class ReviewBulkSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    # Произведения всей пачки выбираются заранее одним запросом
+    # и передаются в context['titles'].
+    title = serializers.IntegerField(source='title_id')
+    author = serializers.SlugRelatedField(slug_field='username',
+                                          read_only=True)
+
+    class Meta:
+        fields = ('id', 'title', 'text', 'author', 'score', 'pub_date')
+        model = models.Review
+
+    def validate_title(self, value):
+        title = self.context['titles'].get(value)
+        if title is None:
+            raise ValidationError(TITLE_NOT_FOUND)
+        if title.already_reviewed:
+            raise ValidationError(ALREADY_REVIEWED)
+        return value
+
+
+class CategorySerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = models.Category
         exclude = ['id']
 
 
-class GenreSerializer(serializers.ModelSerializer):
+class GenreSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = models.Genre
         exclude = ['id']
 
 
-class TitleSerializer(serializers.ModelSerializer):
+class TitleSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     genre = GenreSerializer(many=True)
     category = CategorySerializer()
-    rating = serializers.IntegerField(required=False)
+    rating = serializers.IntegerField(read_only=True)
 
     class Meta:
         read_only_fields = ('__all__',)
         model = models.Title
-        fields = ('id', 'name', 'year', 'rating', 'description', 'genre',
-                  'category')
+        fields = ('id', 'name', 'year', 'rating', 'reviews_count',
+                  'description', 'genre', 'category')
+
 
+class LeaderboardEntrySerializer(TimedSerializerMixin,
+                                 serializers.ModelSerializer):
+    title = TitleSerializer(read_only=True)
 
-class TitlePostSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = models.LeaderboardEntry
+        fields = ('rank', 'score', 'title')
+
+
+class TitlePostSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     genre = serializers.SlugRelatedField(many=True, slug_field='slug',
                                          queryset=models.Genre.objects.all())
     category = serializers.SlugRelatedField(
@@ -80,7 +112,33 @@ class TitlePostSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'year', 'description', 'genre', 'category')
 
 
-class SignupSerializer(serializers.Serializer):
+class GenreBulkSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    # Уникальность slug проверяется одним запросом для всей пачки.
+    class Meta:
+        model = models.Genre
+        fields = ('name', 'slug')
+        extra_kwargs = {'slug': {'validators': []}}
+
+
+class TitleBulkSerializer(TitlePostSerializer):
+    # Жанры и категории всей пачки выбираются заранее и передаются
+    # в context['genres'] и context['categories'] по slug.
+    genre = serializers.ListField(child=serializers.SlugField())
+    category = serializers.SlugField()
+
+    def validate_genre(self, value):
+        return [self.resolve('genres', slug) for slug in dict.fromkeys(value)]
+
+    def validate_category(self, value):
+        return self.resolve('categories', value)
+
+    def resolve(self, name, slug):
+        if slug not in self.context[name]:
+            raise ValidationError(SLUG_NOT_FOUND.format(slug))
+        return self.context[name][slug]
+
+
+class SignupSerializer(TimedSerializerMixin, serializers.Serializer):
     username = serializers.CharField()
     email = serializers.EmailField()
 
@@ -91,12 +149,12 @@ class SignupSerializer(serializers.Serializer):
         return value
 
 
-class ConfirmationSerializer(serializers.Serializer):
+class ConfirmationSerializer(TimedSerializerMixin, serializers.Serializer):
     username = serializers.CharField()
     confirmation_code = serializers.CharField()
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     email = serializers.EmailField(
         validators=[UniqueValidator(
             queryset=models.User.objects.all())]
@@ -0,0 +1,48 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from reviews.models import Category, Genre, Review, Title, User
+from reviews.signals import aggregates_rebuilt
+
+from .authentication import invalidate_user
+from .cache import CATEGORY, GENRE, REVIEW, TITLE, bump_versions
+
+RESOURCES = {
+    Title: TITLE,
+    Genre: GENRE,
+    Category: CATEGORY,
+    Review: REVIEW,
+    Title.genre.through: TITLE,
+}
+
+
+def bump_on_write(resource, using):
+    # Версия меняется сразу и ещё раз после коммита: ответ, закэшированный
+    # между ними по незакоммиченным ещё данным, не переживёт второй смены.
+    bump_versions(resource)
+    transaction.on_commit(lambda: bump_versions(resource), using=using)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def bump_catalog_version(sender, using, **kwargs):
+    if sender in RESOURCES and not kwargs.get('raw'):
+        bump_on_write(RESOURCES[sender], using)
+
+
+@receiver(aggregates_rebuilt)
+def bump_rebuilt_version(sender, using, **kwargs):
+    bump_on_write(RESOURCES[sender], using)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def bump_title_genres_version(sender, action, using, **kwargs):
+    if action.startswith('post_'):
+        bump_on_write(TITLE, using)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, using, **kwargs):
+    invalidate_user(instance.pk)
+    transaction.on_commit(lambda: invalidate_user(instance.pk), using=using)
@@ -0,0 +1,79 @@
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+_local = threading.local()
+
+
+class RequestTimer:
+    # Счётчики одного запроса: SQL-запросы с их суммарным временем,
+    # самый медленный запрос, повторы одинакового SQL и время
+    # именованных участков (например, сериализации).
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0
+        self.slowest = (0, None)
+        self.statements = Counter()
+        self.sections = Counter()
+        self.active = set()
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def __call__(self, execute, sql, params, many, context):
+        # Обёртка connection.execute_wrapper: SQL без параметров, поэтому
+        # одинаковые запросы с разными id считаются повтором.
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.queries += 1
+            self.db_time += duration
+            self.statements[sql] += 1
+            if duration > self.slowest[0]:
+                self.slowest = (duration, sql)
+
+    def repeated(self, threshold):
+        return [(sql, count) for sql, count in self.statements.most_common()
+                if count >= threshold]
+
+
+def start_timer():
+    _local.timer = RequestTimer()
+    return _local.timer
+
+
+def stop_timer():
+    _local.timer = None
+
+
+def current_timer():
+    return getattr(_local, 'timer', None)
+
+
+@contextmanager
+def timed(name):
+    # Вложенные участки с тем же именем не считаются повторно.
+    timer = current_timer()
+    if timer is None or name in timer.active:
+        yield
+        return
+    timer.active.add(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.sections[name] += time.perf_counter() - started
+        timer.active.discard(name)
+
+
+class TimedSerializerMixin:
+    # Время to_representation попадает в Server-Timing как serializer.
+
+    def to_representation(self, instance):
+        with timed('serializer'):
+            return super().to_representation(instance)
@@ -3,8 +3,9 @@ from rest_framework.routers import SimpleRouter
 from rest_framework_simplejwt import views as jwt_views
 
 from .views import (CategoryViewSet, CommentsViewSet, CreateUserViewSet,
-                    GenreViewSet, ReviewsViewSet, TitlesViewSet,
-                    UserValidationViewSet, UserViewSet)
+                    ExportViewSet, GenreViewSet, LeaderboardViewSet,
+                    MetricsView, ReviewsBulkViewSet, ReviewsViewSet,
+                    TitlesViewSet, UserValidationViewSet, UserViewSet)
 
 router_v1 = SimpleRouter()
 
@@ -19,6 +20,10 @@ router_v1.register('users', UserViewSet, basename='users')
 router_v1.register(r'titles/(?P<title_id>\d+)/reviews/'
                    r'(?P<review_id>\d+)/comments',
                    CommentsViewSet, basename='comments')
+router_v1.register('export', ExportViewSet, basename='export')
+router_v1.register('reviews', ReviewsBulkViewSet, basename='reviews-bulk')
+router_v1.register('leaderboards', LeaderboardViewSet,
+                   basename='leaderboards')
 
 
 urlpatterns = [
@@ -26,5 +31,6 @@ urlpatterns = [
         'v1/token/',
         jwt_views.TokenObtainPairView.as_view(),
         name='token_obtain_pair'),
+    path('v1/metrics/', MetricsView.as_view(), name='metrics'),
     path('v1/', include(router_v1.urls)),
 ]
@@ -1,28 +1,53 @@
-from django.core.mail import EmailMessage
-from django.db.models import Avg
+from datetime import datetime, time
+
+from django.db.models import Exists, OuterRef, Subquery
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters, permissions, status, viewsets
+from rest_framework import filters, permissions, renderers, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.pagination import (LimitOffsetPagination,
-                                       PageNumberPagination)
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework_simplejwt.settings import api_settings
-from reviews.models import ADMIN, Category, Genre, Review, Title, User
-
-from .filters import TitleFilter
-from .mixins import CreateListDeleteViewSet
+from reviews import leaderboards
+from reviews.models import (ADMIN, SCORE_COUNT_FIELDS, SCORES, Category,
+                            Comment, Genre, LeaderboardEntry, OutgoingEmail,
+                            Review, Title, User)
+from reviews.outbox import MAX_ATTEMPTS, enqueue_email
+from reviews.signals import shift_title_rating
+
+from . import export, facets, metrics
+from .cache import CATEGORY, GENRE, REVIEW, TITLE
+from .fast_read import FastList, FastListMixin, title_genres
+from .filters import TitleFilter, TitleSearchFilter
+from .mixins import (BulkCreateMixin, CatalogCacheMixin, ConditionalGetMixin,
+                     CreateListDeleteViewSet, NestedParentMixin)
+from .pagination import CachedCountPagination, KeysetPagination, RankPagination
 from .permissions import IsAdmin, IsAdminOrReadOnly, IsAuthorOrModerOrReadOnly
-from .serializers import (CategorySerializer, CommentSerializer,
-                          ConfirmationSerializer, GenreSerializer,
+from .serializers import (ALREADY_REVIEWED, CategorySerializer,
+                          CommentSerializer, ConfirmationSerializer,
+                          GenreBulkSerializer, GenreSerializer,
+                          LeaderboardEntrySerializer, ReviewBulkSerializer,
                           ReviewSerializer, SignupSerializer,
-                          TitlePostSerializer, TitleSerializer, UserSerializer)
+                          TitleBulkSerializer, TitlePostSerializer,
+                          TitleSerializer, UserSerializer)
+from .signals import bump_on_write
 from .tokens import account_activation_token
 
 CORRECT_CODE = 'Код регистрации аккаунта'
 WRONG_CODE = 'Неверный код активации'
 USERNAME_ALREADY_EXISTS = 'Такой username уже существует'
 EMAIL_ALREADY_EXTST = 'Такой email уже существует'
+WRONG_EXPORT_FORMAT = 'Доступные форматы: ndjson, csv'
+WRONG_SINCE = 'Укажите дату в формате ISO 8601'
+NESTED_CSV = 'Вложенные отзывы выгружаются только в формате ndjson'
+GENRE_SLUG_EXISTS = 'Жанр с таким slug уже существует'
+WRONG_FACETS = 'Доступные фасеты: genre, category, year, rating'
+ONE_LEADERBOARD_SCOPE = 'Укажите только category или только genre'
 
 
 class UserViewSet(viewsets.ModelViewSet):
@@ -92,13 +117,10 @@ class CreateUserViewSet(viewsets.ModelViewSet):
         user.is_active = False
         user.save()
         message = account_activation_token.make_token(user)
-        email = EmailMessage(
-            CORRECT_CODE,
-            message,
-            to=[serializer.validated_data.get('email')]
-        )
-    # мейл-адрес находится в переменной EMAIL_HOST_USER файла settings.py
-        email.send()
+        # Письмо отправит команда send_emails, адрес отправителя
+        # находится в переменной EMAIL_HOST_USER файла settings.py
+        enqueue_email(CORRECT_CODE, message,
+                      serializer.validated_data.get('email'))
         return Response(
             serializer.data,
             status=status.HTTP_200_OK
@@ -138,7 +160,7 @@ class UserValidationViewSet(viewsets.ModelViewSet):
         )
 
 
-class CategoryGenreViewSet(CreateListDeleteViewSet):
+class CategoryGenreViewSet(CatalogCacheMixin, CreateListDeleteViewSet):
     permission_classes = (IsAdminOrReadOnly,)
     filter_backends = (filters.SearchFilter,)
     search_fields = ('name',)
@@ -147,23 +169,122 @@ class CategoryGenreViewSet(CreateListDeleteViewSet):
 
 class CategoryViewSet(CategoryGenreViewSet):
     queryset = Category.objects.all()
+    cache_resources = (CATEGORY,)
     serializer_class = CategorySerializer
 
 
-class GenreViewSet(CategoryGenreViewSet):
+class GenreViewSet(BulkCreateMixin, CategoryGenreViewSet):
     queryset = Genre.objects.all()
+    cache_resources = (GENRE,)
     serializer_class = GenreSerializer
-
-
-class TitlesViewSet(viewsets.ModelViewSet):
-    queryset = Title.objects.all().annotate(rating=Avg('reviews__score'))
-    pagination_class = PageNumberPagination
+    bulk_serializer_class = GenreBulkSerializer
+
+    def validate_bulk(self, serializers, errors):
+        slugs = [None if error else serializer.validated_data['slug']
+                 for serializer, error in zip(serializers, errors)]
+        taken = set(Genre.objects.filter(slug__in=filter(None, slugs))
+                    .values_list('slug', flat=True))
+        for slug, error in zip(slugs, errors):
+            if slug in taken:
+                error['slug'] = [GENRE_SLUG_EXISTS]
+            if slug is not None:
+                taken.add(slug)
+
+    def perform_bulk_create(self, serializers, using):
+        genres = [Genre(**serializer.validated_data)
+                  for serializer in serializers]
+        Genre.objects.using(using).bulk_create(genres)
+        bump_on_write(GENRE, using)
+        return GenreBulkSerializer(genres, many=True).data
+
+
+class TitlesViewSet(CatalogCacheMixin, ConditionalGetMixin, BulkCreateMixin,
+                    FastListMixin, viewsets.ModelViewSet):
+    queryset = Title.objects.select_related('category').prefetch_related(
+        'genre')
+    fast_list = FastList(TitleSerializer,
+                         nested={'category': CategorySerializer},
+                         many={'genre': title_genres})
+    pagination_class = CachedCountPagination
     ordering = ['name']
 
     permission_classes = (IsAdminOrReadOnly,)
-    filter_backends = (DjangoFilterBackend, filters.SearchFilter,
-                       filters.OrderingFilter)
+    filter_backends = (DjangoFilterBackend, filters.OrderingFilter,
+                       TitleSearchFilter)
     filterset_class = TitleFilter
+    cache_resources = (TITLE, GENRE, CATEGORY, REVIEW)
+    bulk_serializer_class = TitleBulkSerializer
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached(super().retrieve, request, *args, **kwargs)
+
+    def get_bulk_context(self, items):
+        context = super().get_bulk_context(items)
+        context['genres'] = Genre.objects.in_bulk(
+            self.bulk_values(items, 'genre'), field_name='slug')
+        context['categories'] = Category.objects.in_bulk(
+            self.bulk_values(items, 'category'), field_name='slug')
+        return context
+
+    def perform_bulk_create(self, serializers, using):
+        titles, genres = [], []
+        for serializer in serializers:
+            data = dict(serializer.validated_data)
+            genres.append(data.pop('genre'))
+            titles.append(Title(**data))
+        self.bulk_insert(titles, using)
+        Title.genre.through.objects.using(using).bulk_create([
+            Title.genre.through(title=title, genre=genre)
+            for title, title_genres in zip(titles, genres)
+            for genre in title_genres
+        ])
+        bump_on_write(TITLE, using)
+        created = self.get_queryset().using(using).in_bulk(
+            [title.pk for title in titles])
+        return TitleSerializer([created[title.pk] for title in titles],
+                               many=True).data
+
+    def get_paginated_response(self, data):
+        # Параметр facets=genre,category,year,rating добавляет к странице
+        # количество произведений по каждому значению для текущих
+        # фильтров.
+        response = super().get_paginated_response(data)
+        if 'facets' not in self.request.query_params:
+            return response
+        names, unknown = facets.parse_facets(
+            self.request.query_params['facets'])
+        if unknown:
+            raise ValidationError({'facets': WRONG_FACETS})
+        queryset = self.filter_queryset(self.get_queryset())
+        response.data['facets'] = (
+            facets.compute_facets(queryset, names)
+            if self.get_filter_params()
+            else facets.cached_facets(queryset, names, self.cache_resources))
+        return response
+
+    def get_filter_params(self):
+        # Непустые параметры фильтров и поиска; страница, сортировка
+        # и фасеты на состав списка не влияют.
+        params = self.request.query_params
+        return {name: params[name]
+                for name in (*self.filterset_class.base_filters,
+                             TitleSearchFilter.search_param)
+                if params.get(name)}
+
+    @action(detail=True, url_path='score-distribution')
+    def score_distribution(self, request, pk=None):
+        # Распределение оценок хранится в самом произведении и
+        # обновляется вместе с рейтингом, поэтому отзывы не читаются.
+        score_counts = get_object_or_404(
+            Title.objects.values_list('reviews_count', *SCORE_COUNT_FIELDS),
+            pk=pk)
+        reviews_count, *scores = score_counts
+        return Response({
+            'id': int(pk),
+            'reviews_count': reviews_count,
+            'scores': [{'score': score, 'count': count}
+                       for score, count in zip(SCORES, scores)],
+        })
 
     def get_serializer_class(self):
         if self.request.method == 'GET':
@@ -171,39 +292,241 @@ class TitlesViewSet(viewsets.ModelViewSet):
         return TitlePostSerializer
 
 
-class ReviewsViewSet(viewsets.ModelViewSet):
+class LeaderboardViewSet(viewsets.GenericViewSet):
+    # Заранее посчитанные рейтинги: страница читается по индексу
+    # (board, rank) без агрегатов и сортировки. Параметр category или
+    # genre (slug) выбирает рейтинг внутри категории или жанра.
+    serializer_class = LeaderboardEntrySerializer
+    pagination_class = RankPagination
+    permission_classes = (IsAdminOrReadOnly,)
+
+    def get_board(self, kind):
+        scopes = [
+            (scope, model, self.request.query_params[scope])
+            for scope, model in ((leaderboards.CATEGORY, Category),
+                                 (leaderboards.GENRE, Genre))
+            if self.request.query_params.get(scope)
+        ]
+        if len(scopes) > 1:
+            raise ValidationError(ONE_LEADERBOARD_SCOPE)
+        if not scopes:
+            return leaderboards.board_key(kind)
+        scope, model, slug = scopes[0]
+        scope_id = get_object_or_404(
+            model.objects.values_list('pk', flat=True), slug=slug)
+        return leaderboards.board_key(kind, scope, scope_id)
+
+    def board(self, kind):
+        entries = LeaderboardEntry.objects.filter(
+            board=self.get_board(kind)).select_related(
+                'title__category').prefetch_related('title__genre')
+        page = self.paginate_queryset(entries)
+        return self.get_paginated_response(
+            self.get_serializer(page, many=True).data)
+
+    @action(detail=False)
+    def top(self, request):
+        return self.board(leaderboards.TOP)
+
+    @action(detail=False)
+    def trending(self, request):
+        return self.board(leaderboards.TRENDING)
+
+
+class ReviewsViewSet(ConditionalGetMixin, NestedParentMixin, FastListMixin,
+                     viewsets.ModelViewSet):
     serializer_class = ReviewSerializer
-    pagination_class = LimitOffsetPagination
+    fast_list = FastList(ReviewSerializer,
+                         sources={'author': 'author__username'})
+    pagination_class = KeysetPagination
     permission_classes = (IsAuthorOrModerOrReadOnly,
                           permissions.IsAuthenticatedOrReadOnly)
+    parent_model = Title
+    parent_lookups = {'pk': 'title_id'}
 
-    def _get_title(self):
-        return get_object_or_404(Title, id=self.kwargs.get('title_id'))
+    def get_parent_queryset(self):
+        titles = super().get_parent_queryset()
+        if not self.request.user.is_authenticated:
+            return titles
+        return titles.annotate(already_reviewed=Exists(
+            Review.objects.filter(title=OuterRef('pk'),
+                                  author=self.request.user)))
 
     def perform_create(self, serializer):
-        title = self._get_title()
-        serializer.save(author=self.request.user, title=title)
+        serializer.save(author=self.request.user, title=self.get_parent())
+
+    def get_list_validator(self, queryset):
+        # Количество отзывов хранится в произведении, а последняя дата
+        # изменения берётся по индексу (title, update_date).
+        last_modified = Review.objects.filter(
+            title=OuterRef('pk')).order_by('-update_date').values(
+                'update_date')[:1]
+        validator = Title.objects.filter(
+            pk=self.kwargs.get('title_id')).annotate(
+                last_modified=Subquery(last_modified)).values_list(
+                    'reviews_count', 'last_modified').first()
+        if validator is None:
+            return None, None
+        return validator, validator[1]
 
     def get_queryset(self):
-        title = self._get_title()
-        return title.reviews.all()
-
-
-class CommentsViewSet(viewsets.ModelViewSet):
-    queryset = Review.objects.all()
+        return Review.objects.filter(
+            title_id=self.kwargs.get('title_id')).select_related('author')
+
+
+class ReviewsBulkViewSet(BulkCreateMixin, viewsets.GenericViewSet):
+    # Отзывы текущего пользователя сразу к нескольким произведениям.
+    permission_classes = (permissions.IsAuthenticated,)
+    bulk_serializer_class = ReviewBulkSerializer
+
+    def get_bulk_context(self, items):
+        context = super().get_bulk_context(items)
+        ids = {int(value) for value in self.bulk_values(items, 'title')
+               if str(value).isdigit()}
+        titles = Title.objects.filter(pk__in=ids).annotate(
+            already_reviewed=Exists(Review.objects.filter(
+                title=OuterRef('pk'), author=self.request.user)))
+        context['titles'] = {title.pk: title for title in titles}
+        return context
+
+    def validate_bulk(self, serializers, errors):
+        seen = set()
+        for serializer, error in zip(serializers, errors):
+            if error:
+                continue
+            title_id = serializer.validated_data['title_id']
+            if title_id in seen:
+                error['title'] = [ALREADY_REVIEWED]
+            seen.add(title_id)
+
+    def perform_bulk_create(self, serializers, using):
+        reviews = [Review(author=self.request.user,
+                          **serializer.validated_data)
+                   for serializer in serializers]
+        if self.bulk_insert(reviews, using):
+            # Отзывы пачки относятся к разным произведениям.
+            for review in reviews:
+                shift_title_rating(review.title_id, [review.score],
+                                   using=using)
+            bump_on_write(REVIEW, using)
+        return ReviewBulkSerializer(reviews, many=True).data
+
+
+class CommentsViewSet(ConditionalGetMixin, NestedParentMixin, FastListMixin,
+                      viewsets.ModelViewSet):
     serializer_class = CommentSerializer
-    pagination_class = LimitOffsetPagination
+    fast_list = FastList(CommentSerializer,
+                         sources={'author': 'author__username'})
+    pagination_class = KeysetPagination
     permission_classes = (
         IsAuthorOrModerOrReadOnly, permissions.IsAuthenticatedOrReadOnly
     )
-
-    def _get_review(self):
-        return get_object_or_404(Review, id=self.kwargs.get('review_id'))
+    parent_model = Review
+    parent_lookups = {'pk': 'review_id', 'title_id': 'title_id'}
 
     def perform_create(self, serializer):
-        review = self._get_review()
-        serializer.save(author=self.request.user, review=review)
+        serializer.save(author=self.request.user, review=self.get_parent())
 
     def get_queryset(self):
-        review = self._get_review()
-        return review.comments.all()
+        return Comment.objects.filter(
+            review_id=self.kwargs.get('review_id'),
+            review__title_id=self.kwargs.get('title_id')
+        ).select_related('author')
+
+
+class ExportViewSet(viewsets.ViewSet):
+    # Потоковая выгрузка каталога для партнёров: ответ формируется
+    # пачками по мере отправки, поэтому память не растёт с размером
+    # таблиц. Параметр since оставляет только изменённые записи,
+    # а заголовок X-Export-Since подсказывает since для следующей
+    # выгрузки.
+    permission_classes = (permissions.IsAuthenticated, IsAdmin)
+
+    def get_output(self):
+        output = self.request.query_params.get('output', export.NDJSON)
+        if output not in export.CONTENT_TYPES:
+            raise ValidationError({'output': WRONG_EXPORT_FORMAT})
+        return output
+
+    def get_since(self):
+        value = self.request.query_params.get('since')
+        if not value:
+            return None
+        try:
+            since = parse_datetime(value)
+            if since is None and parse_date(value) is not None:
+                since = datetime.combine(parse_date(value), time.min)
+        except ValueError:
+            since = None
+        if since is None:
+            raise ValidationError({'since': WRONG_SINCE})
+        if timezone.is_naive(since):
+            return timezone.make_aware(since)
+        return since
+
+    def stream(self, name, records, fields):
+        output = self.get_output()
+        if output == export.CSV:
+            content = export.render_csv(records, fields)
+        else:
+            content = export.render_ndjson(records)
+        response = StreamingHttpResponse(
+            content, content_type=export.CONTENT_TYPES[output])
+        response['Content-Disposition'] = (
+            f'attachment; filename="{name}.{output}"')
+        response['X-Export-Since'] = self.started.isoformat()
+        return response
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.started = timezone.now()
+
+    @action(detail=False)
+    def titles(self, request):
+        reviews = request.query_params.get('include') == 'reviews'
+        if reviews and self.get_output() == export.CSV:
+            raise ValidationError({'include': NESTED_CSV})
+        return self.stream(
+            'titles',
+            export.export_titles(self.get_since(), reviews=reviews),
+            export.TITLE_FIELDS)
+
+    @action(detail=False)
+    def reviews(self, request):
+        return self.stream('reviews', export.export_reviews(self.get_since()),
+                           export.REVIEW_FIELDS)
+
+    @action(detail=False)
+    def comments(self, request):
+        return self.stream('comments',
+                           export.export_comments(self.get_since()),
+                           export.COMMENT_FIELDS)
+
+
+class PrometheusRenderer(renderers.BaseRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Ошибки доступа приходят словарём, а не текстом метрик.
+        if not isinstance(data, str):
+            data = '\n'.join(f'{key}: {value}' for key, value in data.items())
+        return data.encode(self.charset)
+
+
+class MetricsView(APIView):
+    # Метрики всех воркеров в текстовом формате Prometheus. Размер
+    # очереди писем считается при каждом запросе метрик.
+    permission_classes = (permissions.IsAuthenticated, IsAdmin)
+    renderer_classes = (PrometheusRenderer,)
+
+    def get(self, request):
+        unsent = OutgoingEmail.objects.filter(sent_date__isnull=True)
+        gauges = {
+            'yamdb_email_outbox_pending': unsent.filter(
+                attempts__lt=MAX_ATTEMPTS).count(),
+            'yamdb_email_outbox_failed': unsent.filter(
+                attempts__gte=MAX_ATTEMPTS).count(),
+        }
+        return Response(metrics.render(gauges))
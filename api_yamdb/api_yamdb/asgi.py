@@ -1,7 +1,7 @@
 import os
 
-from django.core.asgi import get_asgi_application
+from api.asgi import ASGIHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
 
-application = get_asgi_application()
+application = ASGIHandler()
@@ -1,6 +1,8 @@
 import os
 from datetime import timedelta
 
+from django.core.exceptions import ImproperlyConfigured
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 SECRET_KEY = os.getenv('SECRET_KEY', default=' ')
@@ -20,11 +22,12 @@ INSTALLED_APPS = [
     'rest_framework.authtoken',
     'rest_framework_simplejwt',
     'django_filters',
-    'api',
-    'reviews',
+    'api.apps.AppsConfig',
+    'reviews.apps.ReviewsConfig',
 ]
 
 MIDDLEWARE = [
+    'api.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -32,6 +35,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.ReplicaMiddleware',
 ]
 
 ROOT_URLCONF = 'api_yamdb.urls'
@@ -67,6 +71,31 @@ DATABASES = {
     }
 }
 
+# Поиск и нечёткое совпадение по названию в PostgreSQL используют
+# contrib.postgres; с другими базами он не нужен и требовал бы psycopg2.
+if DATABASES['default']['ENGINE'].startswith(
+        'django.db.backends.postgresql'):
+    INSTALLED_APPS.append('django.contrib.postgres')
+
+# Реплика для чтения: DB_REPLICA_NAME добавляет базу replica с теми же
+# настройками, что и основная, кроме имени, хоста и порта. Для проверки
+# на SQLite достаточно копии файла основной базы.
+if os.getenv('DB_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('DB_REPLICA_NAME'),
+        'HOST': os.getenv('DB_REPLICA_HOST', default=os.getenv('DB_HOST')),
+        'PORT': os.getenv('DB_REPLICA_PORT', default=os.getenv('DB_PORT')),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+REPLICA_DATABASES = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['api.replicas.ReplicaRouter']
+# Сколько секунд после записи клиент читает с основной базы.
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', default=5))
+# Через сколько секунд снова проверять недоступную реплику.
+REPLICA_RETRY_SECONDS = int(os.getenv('REPLICA_RETRY_SECONDS', default=30))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -93,6 +122,108 @@ USE_L10N = True
 USE_TZ = True
 
 
+# Бэкенды кэша, которые не видны другим процессам.
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
+    },
+    # Кэш ответов каталога. При нескольких воркерах gunicorn нужен общий
+    # бэкенд (например, FileBasedCache), иначе смена версии видна только
+    # своему процессу, а остальные отдают старые ответы до TIMEOUT и
+    # отвечают 304 по ETag списка произведений со старыми версиями.
+    'catalog': {
+        'BACKEND': os.getenv(
+            'CATALOG_CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CATALOG_CACHE_LOCATION', default='catalog'),
+        'TIMEOUT': int(os.getenv('CATALOG_CACHE_TIMEOUT', default=60)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(
+                os.getenv('CATALOG_CACHE_MAX_ENTRIES', default=1000)),
+        },
+    },
+}
+
+CATALOG_CACHE_ALIAS = 'catalog'
+
+# Закрепление клиента за основной базой после записи хранится в кэше
+# default: с репликой он должен быть общим для всех воркеров, иначе
+# другой воркер отправит следующее чтение на отстающую реплику.
+if (REPLICA_DATABASES
+        and CACHES['default']['BACKEND'] in LOCAL_CACHE_BACKENDS):
+    raise ImproperlyConfigured(
+        'Реплика требует общего кэша: задайте CACHE_BACKEND '
+        'и CACHE_LOCATION (например, FileBasedCache или Memcached)')
+
+# Потоки ASGI-приложения: для чтения каталога и для остальных запросов.
+# Каждый поток держит своё соединение с базой.
+ASGI_CATALOG_THREADS = int(os.getenv('ASGI_CATALOG_THREADS', default=8))
+ASGI_THREADS = int(os.getenv('ASGI_THREADS', default=4))
+
+# Списки произведений, отзывов и комментариев строятся из строк .values()
+# без ModelSerializer; False возвращает сериализаторы.
+FAST_READ_PATH = (
+    os.getenv('FAST_READ_PATH', default='true').lower() == 'true')
+
+# Сколько секунд хранятся фасеты списка произведений без фильтров.
+FACETS_CACHE_TIMEOUT = int(os.getenv('FACETS_CACHE_TIMEOUT', default=30))
+
+# Сколько секунд хранится количество произведений по набору фильтров и
+# с какого числа строк список без фильтров считается по оценке
+# планировщика PostgreSQL вместо COUNT.
+COUNT_CACHE_TIMEOUT = int(os.getenv('COUNT_CACHE_TIMEOUT', default=300))
+COUNT_ESTIMATE_THRESHOLD = int(
+    os.getenv('COUNT_ESTIMATE_THRESHOLD', default=100000))
+
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', default=1000))
+
+BULK_MAX_ITEMS = int(os.getenv('BULK_MAX_ITEMS', default=100))
+
+# Пользователь из токена кэшируется в памяти процесса. С локальным кэшем
+# каталога другой воркер видит смену роли или удаление только через
+# USER_CACHE_TIMEOUT секунд; запросы на запись проверяют её сразу.
+USER_CACHE_TIMEOUT = int(os.getenv('USER_CACHE_TIMEOUT', default=10))
+USER_CACHE_MAX_SIZE = int(os.getenv('USER_CACHE_MAX_SIZE', default=1000))
+
+# Заголовок Server-Timing и журнал медленных запросов и повторов SQL.
+SERVER_TIMING = os.getenv('SERVER_TIMING', default='true').lower() == 'true'
+SLOW_REQUEST_MS = int(os.getenv('SLOW_REQUEST_MS', default=500))
+REPEATED_QUERY_THRESHOLD = int(
+    os.getenv('REPEATED_QUERY_THRESHOLD', default=5))
+
+# Метрики Prometheus. Каждый процесс сбрасывает свои значения в файл
+# METRICS_DIR не чаще METRICS_FLUSH_INTERVAL секунд, а адрес метрик
+# суммирует файлы всех воркеров gunicorn. Файлы завершившихся воркеров
+# переносит в архив хук из gunicorn.conf.py. Без METRICS_DIR видны
+# только метрики обработавшего запрос процесса.
+METRICS_ENABLED = (
+    os.getenv('METRICS_ENABLED', default='true').lower() == 'true')
+METRICS_DIR = os.getenv('METRICS_DIR', default='')
+METRICS_FLUSH_INTERVAL = float(
+    os.getenv('METRICS_FLUSH_INTERVAL', default=1))
+
+# Рейтинги произведений, которые перестраивает refresh_leaderboards:
+# по LEADERBOARD_SIZE мест в каждом. В лучших - произведения не менее
+# чем с LEADERBOARD_MIN_REVIEWS отзывами, оценка сглаживается к средней
+# с весом LEADERBOARD_PRIOR_WEIGHT отзывов. В популярных - отзывы за
+# TRENDING_WINDOW, вес которых вдвое падает за TRENDING_HALF_LIFE.
+LEADERBOARD_SIZE = int(os.getenv('LEADERBOARD_SIZE', default=100))
+LEADERBOARD_MIN_REVIEWS = int(os.getenv('LEADERBOARD_MIN_REVIEWS', default=3))
+LEADERBOARD_PRIOR_WEIGHT = float(
+    os.getenv('LEADERBOARD_PRIOR_WEIGHT', default=10))
+TRENDING_WINDOW = timedelta(
+    days=float(os.getenv('TRENDING_WINDOW_DAYS', default=30)))
+TRENDING_HALF_LIFE = timedelta(
+    days=float(os.getenv('TRENDING_HALF_LIFE_DAYS', default=7)))
+
 STATIC_URL = '/static/'
 
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
@@ -104,7 +235,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 5
@@ -115,7 +246,9 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_BACKEND = os.getenv(
+    'EMAIL_BACKEND', default='django.core.mail.backends.smtp.EmailBackend')
+EMAIL_TIMEOUT = int(os.getenv('EMAIL_TIMEOUT', default=10))
 EMAIL_USE_TLS = True
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_HOST_USER = 'youremail@gmail.com'
@@ -0,0 +1,19 @@
+import os
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+
+
+def child_exit(server, worker):
+    # Метрики завершившегося воркера переносятся в архив METRICS_DIR.
+    from api import metrics
+
+    metrics.mark_process_dead(worker.pid)
+
+
+def on_starting(server):
+    # Файлы воркеров прошлого запуска: при остановке мастер не всегда
+    # успевает обработать их выход.
+    from api import metrics
+
+    for pid in metrics.written_pids():
+        metrics.mark_process_dead(pid)
@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from .models import Category, Comment, Genre, Review, Title, User
+from .models import (Category, Comment, Genre, LeaderboardEntry, OutgoingEmail,
+                     Review, Title, User)
 
 admin.site.register(Category)
 admin.site.register(Comment)
@@ -8,3 +9,5 @@ admin.site.register(Genre)
 admin.site.register(Review)
 admin.site.register(Title)
 admin.site.register(User)
+admin.site.register(OutgoingEmail)
+admin.site.register(LeaderboardEntry)
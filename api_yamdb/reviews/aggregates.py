@@ -0,0 +1,104 @@
+from functools import reduce
+from operator import or_
+
+from django.db.models import (Avg, Count, ExpressionWrapper, F, FloatField,
+                              IntegerField, OuterRef, Q, Subquery, Sum)
+from django.db.models.functions import Abs, Coalesce
+from django.utils import timezone
+
+from .models import SCORE_COUNT_FIELDS, Comment, Review, Title
+from .signals import aggregates_rebuilt, score_counts
+
+RATING_TOLERANCE = 1e-9
+
+
+def rebuild_titles(using=None):
+    # Агрегаты пересчитываются по отзывам одним UPDATE, но только у
+    # расходящихся произведений: дата изменения остальных не сдвигается.
+    reviews = Review.objects.filter(
+        title=OuterRef('pk')).order_by().values('title')
+
+    def aggregate(expression):
+        return Subquery(reviews.annotate(value=expression).values('value'))
+
+    counts = {
+        'reviews_count': aggregate(Count('pk')),
+        'score_sum': aggregate(Sum('score')),
+        **{name: aggregate(count) for name, count in score_counts().items()},
+    }
+    actual = {name: Coalesce(value, 0, output_field=IntegerField())
+              for name, value in counts.items()}
+    rating = aggregate(Avg('score'))
+    stale = Title.objects.using(using).annotate(
+        actual_rating=rating,
+        rating_error=Abs(ExpressionWrapper(
+            F('rating') - F('actual_rating'), output_field=FloatField())),
+        **{f'actual_{name}': value for name, value in actual.items()},
+    ).filter(
+        reduce(or_, (~Q(**{name: F(f'actual_{name}')}) for name in actual),
+               Q(rating_error__gt=RATING_TOLERANCE))
+        | Q(rating__isnull=True, actual_rating__isnull=False)
+        | Q(rating__isnull=False, actual_rating__isnull=True)
+    ).values('pk')
+    updated = Title.objects.using(using).filter(pk__in=stale).update(
+        rating=rating, update_date=timezone.now(), **actual)
+    if updated:
+        aggregates_rebuilt.send(sender=Title, using=using)
+    return updated
+
+
+def rebuild_comments_count(using=None, touch=True):
+    # Исправляются только расходящиеся счётчики. Счётчик входит в
+    # представление отзыва, поэтому с touch сдвигается и дата изменения.
+    comments = Comment.objects.filter(
+        review=OuterRef('pk')).order_by().values('review')
+    actual = Coalesce(
+        Subquery(comments.annotate(value=Count('pk')).values('value')),
+        0, output_field=IntegerField())
+    stale = Review.objects.using(using).annotate(actual=actual).exclude(
+        comments_count=F('actual')).values('pk')
+    changes = {'update_date': timezone.now()} if touch else {}
+    updated = Review.objects.using(using).filter(pk__in=stale).update(
+        comments_count=actual, **changes)
+    if updated:
+        aggregates_rebuilt.send(sender=Review, using=using)
+    return updated
+
+
+def find_mismatched_titles():
+    # Сверяются количество, сумма и распределение оценок.
+    counted = ('reviews_count', 'score_sum') + SCORE_COUNT_FIELDS
+    actual = {
+        row['title_id']: tuple(row[name] for name in counted)
+        for row in Review.objects.order_by().values('title_id').annotate(
+            reviews_count=Count('pk'), score_sum=Sum('score'),
+            **score_counts())
+    }
+    empty = (0,) * len(counted)
+    mismatched = []
+    stored = Title.objects.order_by('pk').values_list(
+        'pk', 'rating', *counted)
+    for pk, rating, *counts in stored.iterator():
+        expected = actual.get(pk, empty)
+        expected_rating = (expected[1] / expected[0]
+                           if expected[0] else None)
+        if (tuple(counts) != expected
+                or not same_rating(rating, expected_rating)):
+            mismatched.append(pk)
+    return mismatched
+
+
+def find_mismatched_reviews():
+    actual = dict(Comment.objects.filter(
+        review__isnull=False).order_by().values('review_id').annotate(
+            count=Count('pk')).values_list('review_id', 'count'))
+    stored = Review.objects.order_by('pk').values_list(
+        'pk', 'comments_count')
+    return [pk for pk, count in stored.iterator()
+            if count != actual.get(pk, 0)]
+
+
+def same_rating(stored, expected):
+    if stored is None or expected is None:
+        return stored is expected
+    return abs(stored - expected) <= RATING_TOLERANCE
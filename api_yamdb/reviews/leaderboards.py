@@ -0,0 +1,95 @@
+import heapq
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import LeaderboardEntry, Review, Title
+
+TOP = 'top'
+TRENDING = 'trending'
+KINDS = (TOP, TRENDING)
+CATEGORY = 'category'
+GENRE = 'genre'
+
+
+def board_key(kind, scope=None, scope_id=None):
+    if scope is None:
+        return kind
+    return f'{kind}:{scope}:{scope_id}'
+
+
+def bayesian_scores(min_reviews, prior_weight, using=None):
+    # Средняя оценка, сглаженная к средней по всем отзывам: у
+    # произведения с парой отзывов она близка к общей, а с сотнями -
+    # к собственной. Берутся сохранённые агрегаты произведений.
+    totals = Title.objects.using(using).aggregate(
+        count=Sum('reviews_count'), total=Sum('score_sum'))
+    mean = totals['total'] / totals['count'] if totals['count'] else 0
+    titles = Title.objects.using(using).filter(
+        reviews_count__gte=max(min_reviews, 1)).values_list(
+            'pk', 'reviews_count', 'score_sum')
+    return {
+        pk: (prior_weight * mean + score_sum) / (prior_weight + count)
+        for pk, count, score_sum in titles.iterator()
+    }
+
+
+def trending_scores(now, window, half_life, using=None):
+    # Сумма отзывов за окно, каждый весит 0.5 ** (возраст / half_life).
+    scores = defaultdict(float)
+    reviews = Review.objects.using(using).filter(
+        pub_date__gte=now - window).values_list('title_id', 'pub_date')
+    for title_id, pub_date in reviews.iterator():
+        age = max((now - pub_date).total_seconds(), 0)
+        scores[title_id] += 0.5 ** (age / half_life.total_seconds())
+    return scores
+
+
+def build_boards(kind, scores, categories, genres, size):
+    # Лучшие size произведений в общем рейтинге и в каждой категории
+    # и жанре. При равенстве баллов выше произведение с меньшим id.
+    groups = defaultdict(list)
+    for pk, score in scores.items():
+        item = (score, -pk)
+        groups[board_key(kind)].append(item)
+        if categories.get(pk) is not None:
+            groups[board_key(kind, CATEGORY, categories[pk])].append(item)
+        for genre_id in genres.get(pk, ()):
+            groups[board_key(kind, GENRE, genre_id)].append(item)
+    for board, items in groups.items():
+        for rank, (score, pk) in enumerate(
+                heapq.nlargest(size, items), start=1):
+            yield LeaderboardEntry(board=board, rank=rank, title_id=-pk,
+                                   score=score)
+
+
+def refresh_leaderboards(using=None, now=None):
+    # Таблица перестраивается целиком в одной транзакции, поэтому
+    # читатели видят либо старые, либо новые рейтинги.
+    now = now or timezone.now()
+    categories = dict(Title.objects.using(using).values_list(
+        'pk', 'category_id').iterator())
+    genres = defaultdict(list)
+    for title_id, genre_id in Title.genre.through.objects.using(
+            using).values_list('title_id', 'genre_id').iterator():
+        genres[title_id].append(genre_id)
+    boards = {
+        TOP: bayesian_scores(settings.LEADERBOARD_MIN_REVIEWS,
+                             settings.LEADERBOARD_PRIOR_WEIGHT, using),
+        TRENDING: trending_scores(now, settings.TRENDING_WINDOW,
+                                  settings.TRENDING_HALF_LIFE, using),
+    }
+    entries = [
+        entry
+        for kind, scores in boards.items()
+        for entry in build_boards(kind, scores, categories, genres,
+                                  settings.LEADERBOARD_SIZE)
+    ]
+    with transaction.atomic(using=using):
+        LeaderboardEntry.objects.using(using).all().delete()
+        LeaderboardEntry.objects.using(using).bulk_create(
+            entries, batch_size=1000)
+    return len(entries)
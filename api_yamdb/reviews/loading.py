@@ -0,0 +1,232 @@
+import csv
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import CommandError
+from django.core.management.color import no_style
+from django.db import IntegrityError, connections, transaction
+from django.utils import timezone
+
+from . import aggregates
+from .models import (SCORE_COUNT_FIELDS, Category, Comment, Genre, Review,
+                     Title, User)
+
+DEFAULT_BATCH_SIZE = 5000
+
+
+def const(value):
+    return lambda row: value
+
+
+# Таблица: (файл, модель, поля модели -> колонка CSV или функция от строки).
+# Агрегаты отзывов и счётчики комментариев пересчитываются после
+# загрузки, а даты изменения отзывов и комментариев совпадают с датой
+# публикации.
+TABLES = {
+    'users': ('users.csv', User, {
+        'id': 'id', 'username': 'username', 'email': 'email',
+        'role': 'role', 'bio': 'bio', 'first_name': 'first_name',
+        'last_name': 'last_name', 'password': const(make_password(None)),
+    }),
+    'category': ('category.csv', Category, {
+        'id': 'id', 'name': 'name', 'slug': 'slug',
+    }),
+    'genre': ('genre.csv', Genre, {
+        'id': 'id', 'name': 'name', 'slug': 'slug',
+    }),
+    'titles': ('titles.csv', Title, {
+        'id': 'id', 'name': 'name', 'year': 'year', 'category': 'category',
+        'reviews_count': const(0), 'score_sum': const(0),
+        'update_date': lambda row: timezone.now(),
+        **{name: const(0) for name in SCORE_COUNT_FIELDS},
+    }),
+    'genre_title': ('genre_title.csv', Title.genre.through, {
+        'id': 'id', 'title': 'title_id', 'genre': 'genre_id',
+    }),
+    'review': ('review.csv', Review, {
+        'id': 'id', 'title': 'title_id', 'text': 'text',
+        'author': 'author', 'score': 'score', 'pub_date': 'pub_date',
+        'update_date': 'pub_date', 'comments_count': const(0),
+    }),
+    'comments': ('comments.csv', Comment, {
+        'id': 'id', 'review': 'review_id', 'text': 'text',
+        'author': 'author', 'pub_date': 'pub_date',
+        'update_date': 'pub_date',
+    }),
+}
+
+# Таблицы одной группы не ссылаются друг на друга и могут загружаться
+# параллельно; группы идут строго по порядку зависимостей.
+LOAD_ORDER = (
+    ('users', 'category', 'genre'),
+    ('titles',),
+    ('genre_title', 'review'),
+    ('comments',),
+)
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class TableLoader:
+    # Читает CSV построчно и пишет пачками: в PostgreSQL через COPY,
+    # в остальных базах через executemany. При upsert строки с уже
+    # существующим id обновляются, поэтому повторный запуск безопасен.
+
+    def __init__(self, connection, model, fields, upsert=False):
+        self.connection = connection
+        self.model = model
+        self.fields = [
+            (model._meta.get_field(name), source)
+            for name, source in fields.items()
+        ]
+        self.upsert = upsert
+        quote = connection.ops.quote_name
+        self.table = quote(model._meta.db_table)
+        self.columns = ', '.join(quote(field.column)
+                                 for field, _ in self.fields)
+        self.pk = quote(model._meta.pk.column)
+        self.updates = [quote(field.column) for field, _ in self.fields
+                        if not field.primary_key]
+
+    def prepare(self, row):
+        values = []
+        for field, source in self.fields:
+            value = source(row) if callable(source) else row[source]
+            if value == '' and field.null:
+                value = None
+            values.append(field.get_db_prep_save(
+                field.to_python(value), self.connection))
+        return values
+
+    def conflict_clause(self):
+        if not self.upsert:
+            return ''
+        vendor = self.connection.vendor
+        if vendor in ('postgresql', 'sqlite'):
+            return (f' ON CONFLICT ({self.pk}) DO UPDATE SET '
+                    + ', '.join(f'{column} = EXCLUDED.{column}'
+                                for column in self.updates))
+        if vendor == 'mysql':
+            return (' ON DUPLICATE KEY UPDATE '
+                    + ', '.join(f'{column} = VALUES({column})'
+                                for column in self.updates))
+        raise CommandError(
+            f'Повторная загрузка не поддерживается для {vendor}')
+
+    def load(self, rows, batch_size):
+        loaded = 0
+        with transaction.atomic(using=self.connection.alias):
+            with self.connection.cursor() as cursor:
+                if self.connection.vendor == 'postgresql':
+                    write = self.copy_writer(cursor)
+                else:
+                    write = self.insert_writer(cursor)
+                for batch in batches(rows, batch_size):
+                    write([self.prepare(row) for row in batch])
+                    loaded += len(batch)
+                if self.connection.vendor == 'postgresql' and self.upsert:
+                    cursor.execute(f'DROP TABLE {self.staging}')
+        return loaded
+
+    def insert_writer(self, cursor):
+        placeholders = ', '.join(['%s'] * len(self.fields))
+        sql = (f'INSERT INTO {self.table} ({self.columns}) '
+               f'VALUES ({placeholders}){self.conflict_clause()}')
+        return lambda values: cursor.executemany(sql, values)
+
+    def copy_writer(self, cursor):
+        # Для upsert пачка копируется во временную таблицу, откуда
+        # переносится одним INSERT ... ON CONFLICT.
+        target = self.table
+        if self.upsert:
+            self.staging = self.connection.ops.quote_name(
+                f'import_{self.model._meta.db_table}')
+            cursor.execute(f'CREATE TEMP TABLE {self.staging} '
+                           f'(LIKE {self.table} INCLUDING DEFAULTS)')
+            target = self.staging
+        copy = (f'COPY {target} ({self.columns}) '
+                f'FROM STDIN WITH (FORMAT csv)')
+
+        def write(values):
+            buffer = io.StringIO()
+            # Пустые строки берутся в кавычки, а None остаётся пустым
+            # полем, которое COPY читает как NULL.
+            csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC).writerows(
+                values)
+            buffer.seek(0)
+            with self.connection.wrap_database_errors:
+                cursor.copy_expert(copy, buffer)
+            if self.upsert:
+                cursor.execute(
+                    f'INSERT INTO {self.table} ({self.columns}) '
+                    f'SELECT {self.columns} FROM {self.staging}'
+                    f'{self.conflict_clause()}')
+                cursor.execute(f'TRUNCATE {self.staging}')
+        return write
+
+
+def load_tables(sources, using, batch_size=DEFAULT_BATCH_SIZE, jobs=1,
+                upsert=False, report=None):
+    # sources: имя таблицы из TABLES -> функция, возвращающая строки
+    # в формате CSV-файлов. Таблицы загружаются по группам LOAD_ORDER,
+    # затем сбрасываются последовательности и пересчитываются агрегаты
+    # произведений и счётчики комментариев. report(таблица, строк, секунд)
+    # вызывается после каждой таблицы.
+    if connections[using].vendor == 'sqlite':
+        jobs = 1
+    for group in LOAD_ORDER:
+        tasks = [(name, sources[name], using, batch_size, upsert, report)
+                 for name in group if name in sources]
+        if jobs == 1:
+            for task in tasks:
+                load_table(*task)
+            continue
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            for future in [executor.submit(load_table_in_thread, *task)
+                           for task in tasks]:
+                future.result()
+    reset_sequences(using)
+    aggregates.rebuild_comments_count(using=using, touch=False)
+    return aggregates.rebuild_titles(using=using)
+
+
+def load_table(name, rows, using, batch_size, upsert, report):
+    _, model, fields = TABLES[name]
+    loader = TableLoader(connections[using], model, fields, upsert)
+    started = time.monotonic()
+    try:
+        loaded = loader.load(rows(), batch_size)
+    except IntegrityError as error:
+        raise CommandError(
+            f'{model._meta.db_table}: {error}. Для повторной загрузки '
+            f'используйте --upsert.')
+    if report is not None:
+        report(model._meta.db_table, loaded,
+               max(time.monotonic() - started, 1e-6))
+
+
+def load_table_in_thread(name, rows, using, *args):
+    try:
+        load_table(name, rows, using, *args)
+    finally:
+        connections[using].close()
+
+
+def reset_sequences(using):
+    connection = connections[using]
+    statements = connection.ops.sequence_reset_sql(
+        no_style(), [model for _, model, _ in TABLES.values()])
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
@@ -0,0 +1,116 @@
+import csv
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+from reviews.loading import DEFAULT_BATCH_SIZE, TABLES, load_tables
+from reviews.synthetic import SyntheticData, next_ids
+
+# Размеры при --scale 1; отдельные параметры задают их явно.
+SIZES = {
+    'users': 1000, 'categories': 10, 'genres': 30, 'titles': 1000,
+    'reviews': 20000, 'comments': 40000,
+}
+
+
+def write_csv(path, rows):
+    # Строки пишутся по одной, поэтому память не зависит от размера.
+    written = 0
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        writer = None
+        for row in rows:
+            if writer is None:
+                writer = csv.DictWriter(file, fieldnames=list(row))
+                writer.writeheader()
+            writer.writerow({
+                key: value.isoformat() if hasattr(value, 'isoformat')
+                else value for key, value in row.items()
+            })
+            written += 1
+    return written
+
+
+class Command(BaseCommand):
+    help = ('Создаёт синтетические данные заданного размера: сразу в базе '
+            'или CSV-файлами в формате import_csv.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale',
+            type=float,
+            default=1,
+            help='Множитель размеров по умолчанию.'
+        )
+        for name, size in SIZES.items():
+            parser.add_argument(
+                f'--{name}',
+                type=int,
+                help=f'Количество {name}, по умолчанию {size} * scale.'
+            )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Зерно генератора: одинаковое зерно даёт одинаковые данные.'
+        )
+        parser.add_argument(
+            '--output',
+            help='Записать CSV-файлы в этот каталог вместо базы данных.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Количество строк в одной пачке.'
+        )
+        parser.add_argument(
+            '--jobs',
+            type=int,
+            default=1,
+            help='Сколько независимых таблиц загружать параллельно.'
+        )
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help='Псевдоним базы данных.'
+        )
+
+    def handle(self, *args, **options):
+        sizes = [
+            options[name] if options[name] is not None
+            else max(round(size * options['scale']), 1)
+            for name, size in SIZES.items()
+        ]
+        # В базе новые строки дописываются после существующих,
+        # а CSV-файлы нумеруются с единицы.
+        first_ids = None
+        if not options['output']:
+            first_ids = next_ids(options['database'])
+        try:
+            data = SyntheticData(*sizes, seed=options['seed'],
+                                 first_ids=first_ids)
+        except ValueError as error:
+            raise CommandError(error)
+        if options['output']:
+            self.write_files(data, options['output'])
+            return
+        updated = load_tables(
+            data.sources(), options['database'],
+            batch_size=options['batch_size'],
+            jobs=max(options['jobs'], 1), report=self.report)
+        self.stdout.write(f'Пересчитаны агрегаты произведений: {updated}')
+
+    def write_files(self, data, directory):
+        os.makedirs(directory, exist_ok=True)
+        for name, rows in data.sources().items():
+            filename = TABLES[name][0]
+            started = time.monotonic()
+            written = write_csv(os.path.join(directory, filename), rows())
+            self.report(filename, written, time.monotonic() - started)
+
+    def report(self, table, rows, elapsed):
+        elapsed = max(elapsed, 1e-6)
+        self.stdout.write(
+            f'{table}: создано {rows} за {elapsed:.2f} с '
+            f'({rows / elapsed:.0f} строк/с)')
@@ -0,0 +1,67 @@
+import csv
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from reviews.loading import DEFAULT_BATCH_SIZE, TABLES, load_tables
+
+
+def read_csv(path):
+    with open(path, encoding='utf-8', newline='') as file:
+        yield from csv.DictReader(file)
+
+
+class Command(BaseCommand):
+    help = 'Загружает тестовые данные из CSV-файлов в базу данных.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=os.path.join(settings.BASE_DIR, 'static', 'data'),
+            help='Каталог с CSV-файлами.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Количество строк в одной пачке.'
+        )
+        parser.add_argument(
+            '--jobs',
+            type=int,
+            default=1,
+            help='Сколько независимых таблиц загружать параллельно.'
+        )
+        parser.add_argument(
+            '--upsert',
+            action='store_true',
+            help='Обновлять уже загруженные строки вместо ошибки.'
+        )
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help='Псевдоним базы данных.'
+        )
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        if connections[alias].vendor == 'sqlite' and options['jobs'] > 1:
+            self.stderr.write('SQLite не поддерживает параллельную запись, '
+                              'таблицы загружаются по очереди.')
+        sources = {}
+        for name, (filename, _, _) in TABLES.items():
+            path = os.path.join(options['path'], filename)
+            if not os.path.isfile(path):
+                raise CommandError(f'Не найден файл {path}')
+            sources[name] = lambda path=path: read_csv(path)
+        updated = load_tables(
+            sources, alias, batch_size=options['batch_size'],
+            jobs=max(options['jobs'], 1), upsert=options['upsert'],
+            report=self.report)
+        self.stdout.write(f'Пересчитаны агрегаты произведений: {updated}')
+
+    def report(self, table, loaded, elapsed):
+        self.stdout.write(
+            f'{table}: загружено {loaded} за {elapsed:.2f} с '
+            f'({loaded / elapsed:.0f} строк/с)')
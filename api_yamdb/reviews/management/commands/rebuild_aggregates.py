@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from reviews import aggregates
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает хранимые агрегаты по отзывам и комментариям: '
+            'рейтинги, количество отзывов и распределение оценок '
+            'произведений, счётчики комментариев отзывов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только сверить агрегаты с отзывами и комментариями, '
+                 'ничего не меняя.'
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            errors = [
+                message + ', '.join(str(pk) for pk in mismatched)
+                for message, mismatched in (
+                    ('Рассинхронизированы агрегаты произведений: ',
+                     aggregates.find_mismatched_titles()),
+                    ('Рассинхронизированы счётчики комментариев отзывов: ',
+                     aggregates.find_mismatched_reviews()),
+                ) if mismatched
+            ]
+            if errors:
+                raise CommandError('\n'.join(errors))
+            self.stdout.write('Агрегаты произведений и отзывов корректны.')
+            return
+        updated = aggregates.rebuild_titles()
+        self.stdout.write(f'Пересчитаны агрегаты произведений: {updated}')
+        updated = aggregates.rebuild_comments_count()
+        self.stdout.write(f'Пересчитаны счётчики комментариев: {updated}')
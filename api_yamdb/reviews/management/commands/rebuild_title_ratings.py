@@ -0,0 +1,2 @@
+# Прежнее имя команды rebuild_aggregates.
+from .rebuild_aggregates import Command  # noqa: F401
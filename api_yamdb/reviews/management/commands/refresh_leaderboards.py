@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+from reviews.leaderboards import refresh_leaderboards
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает рейтинги лучших и популярных произведений.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Не завершаться, а перестраивать рейтинги периодически.'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=300,
+            help='Пауза в секундах между перестроениями.'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            entries = refresh_leaderboards()
+            self.stdout.write(f'Перестроены рейтинги, мест: {entries}')
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
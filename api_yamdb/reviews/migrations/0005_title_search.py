@@ -0,0 +1,120 @@
+from django.db import DatabaseError, migrations, models, transaction
+
+try:
+    from django.contrib.postgres.search import SearchVectorField
+except ImportError:
+    SearchVectorField = models.TextField
+
+# SQL поискового индекса на момент этой миграции. reviews.search может
+# меняться дальше, а миграция должна ставить одно и то же.
+POSTGRES_SEARCH_SQL = '''
+CREATE OR REPLACE FUNCTION reviews_title_search_vector_update()
+RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('russian', coalesce(NEW.name, '')), 'A')
+        || setweight(to_tsvector('russian',
+                                 coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS reviews_title_search_vector_trigger ON reviews_title;
+CREATE TRIGGER reviews_title_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, description ON reviews_title
+    FOR EACH ROW EXECUTE PROCEDURE reviews_title_search_vector_update();
+
+UPDATE reviews_title SET name = name;
+
+CREATE INDEX IF NOT EXISTS reviews_title_search_vector_idx
+    ON reviews_title USING gin (search_vector);
+'''
+
+POSTGRES_TRIGRAM_SQL = '''
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS reviews_title_name_trgm_idx
+    ON reviews_title USING gin (name gin_trgm_ops);
+'''
+
+POSTGRES_DROP_SQL = '''
+DROP TRIGGER IF EXISTS reviews_title_search_vector_trigger ON reviews_title;
+DROP FUNCTION IF EXISTS reviews_title_search_vector_update();
+DROP INDEX IF EXISTS reviews_title_search_vector_idx;
+DROP INDEX IF EXISTS reviews_title_name_trgm_idx;
+'''
+
+SQLITE_SEARCH_SQL = (
+    '''CREATE VIRTUAL TABLE IF NOT EXISTS reviews_title_fts USING fts5(
+        name, description,
+        content='reviews_title', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )''',
+    '''CREATE TRIGGER IF NOT EXISTS reviews_title_fts_insert
+    AFTER INSERT ON reviews_title BEGIN
+        INSERT INTO reviews_title_fts (rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS reviews_title_fts_delete
+    AFTER DELETE ON reviews_title BEGIN
+        INSERT INTO reviews_title_fts (reviews_title_fts, rowid, name,
+                                       description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS reviews_title_fts_update
+    AFTER UPDATE OF name, description ON reviews_title BEGIN
+        INSERT INTO reviews_title_fts (reviews_title_fts, rowid, name,
+                                       description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO reviews_title_fts (rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END''',
+    "INSERT INTO reviews_title_fts (reviews_title_fts) VALUES ('rebuild')",
+)
+
+SQLITE_DROP_SQL = (
+    'DROP TRIGGER IF EXISTS reviews_title_fts_insert',
+    'DROP TRIGGER IF EXISTS reviews_title_fts_delete',
+    'DROP TRIGGER IF EXISTS reviews_title_fts_update',
+    'DROP TABLE IF EXISTS reviews_title_fts',
+)
+
+
+def install(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(POSTGRES_SEARCH_SQL)
+        try:
+            with transaction.atomic(using=schema_editor.connection.alias):
+                schema_editor.execute(POSTGRES_TRIGRAM_SQL)
+        except DatabaseError:
+            # Без contrib-модуля pg_trgm поиск работает без нечёткого
+            # совпадения по названию.
+            pass
+    elif vendor == 'sqlite':
+        for statement in SQLITE_SEARCH_SQL:
+            schema_editor.execute(statement)
+
+
+def uninstall(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(POSTGRES_DROP_SQL)
+    elif vendor == 'sqlite':
+        for statement in SQLITE_DROP_SQL:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0004_review_comment_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='search_vector',
+            field=SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(install, uninstall),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations, models
+
+# PostgreSQL не меняет тип колонки, от которой зависит триггер
+# поискового вектора из 0005_title_search, поэтому на время изменения
+# триггер снимается.
+DROP_TRIGGER_SQL = '''
+DROP TRIGGER IF EXISTS reviews_title_search_vector_trigger ON reviews_title
+'''
+
+CREATE_TRIGGER_SQL = '''
+CREATE TRIGGER reviews_title_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, description ON reviews_title
+    FOR EACH ROW EXECUTE PROCEDURE reviews_title_search_vector_update()
+'''
+
+
+def drop_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_TRIGGER_SQL)
+
+
+def create_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_TRIGGER_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_update_date'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_trigger, create_trigger),
+        migrations.AlterField(
+            model_name='title',
+            name='name',
+            field=models.CharField(max_length=256, verbose_name='Произведение'),
+        ),
+        migrations.RunPython(create_trigger, drop_trigger),
+    ]
@@ -0,0 +1,56 @@
+from django.db import migrations, models
+
+# Миграции базовой версии расходились с моделью User: 0001_initial
+# создала таблицу по AbstractUser, а модель наследует AbstractBaseUser.
+# Флаги is_staff, is_superuser и is_active модель вычисляет по роли,
+# а date_joined, группы и права не использует, поэтому их колонки и
+# таблицы удаляются вместе с данными. Колонка password добавляется
+# пустой. Перед применением на рабочей базе сделайте резервную копию.
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0013_comment_review_index'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='user',
+            options={},
+        ),
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+            ],
+        ),
+        migrations.RemoveField(
+            model_name='user',
+            name='date_joined',
+        ),
+        migrations.RemoveField(
+            model_name='user',
+            name='groups',
+        ),
+        migrations.RemoveField(
+            model_name='user',
+            name='is_active',
+        ),
+        migrations.RemoveField(
+            model_name='user',
+            name='is_staff',
+        ),
+        migrations.RemoveField(
+            model_name='user',
+            name='is_superuser',
+        ),
+        migrations.RemoveField(
+            model_name='user',
+            name='user_permissions',
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='password',
+            field=models.CharField(default='', max_length=530, verbose_name='Пароль'),
+        ),
+    ]
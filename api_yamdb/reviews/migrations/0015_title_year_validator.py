@@ -0,0 +1,17 @@
+import reviews.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0014_user_fields'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='title',
+            name='year',
+            field=models.IntegerField(validators=[reviews.models.validate_year], verbose_name='Дата выхода'),
+        ),
+    ]
@@ -1,9 +1,17 @@
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager
+from django.core.exceptions import ValidationError
 from django.core.validators import (MaxValueValidator, MinValueValidator,
                                     RegexValidator)
-from django.db import models
+from django.db import models, router, transaction
 from django.utils import timezone
 
+try:
+    from django.contrib.postgres.search import SearchVectorField
+except ImportError:
+    # Сборка Django без contrib.postgres: колонка остаётся, а заполняет
+    # и читает её только поиск в PostgreSQL.
+    SearchVectorField = models.TextField
+
 USER = 'user'
 MODERATOR = 'moderator'
 ADMIN = 'admin'
@@ -14,6 +22,15 @@ ROLES = [
     (ADMIN, 'admin'),
 ]
 
+SCORES = range(1, 11)
+# Количество отзывов с каждой оценкой хранится в отдельном поле
+# произведения: score_1_count ... score_10_count.
+SCORE_COUNT_FIELDS = tuple(f'score_{score}_count' for score in SCORES)
+REVIEW_AGGREGATE_FIELDS = (
+    ('reviews_count', 'score_sum', 'rating') + SCORE_COUNT_FIELDS)
+# Поля произведения, которые обновляют только UPDATE и триггеры базы.
+TITLE_MAINTAINED_FIELDS = REVIEW_AGGREGATE_FIELDS + ('search_vector',)
+
 
 class UserManager(BaseUserManager):
     def create_user(self, email,
@@ -103,7 +120,10 @@ class User(AbstractBaseUser):
 
     @property
     def is_admin(self):
-        return self.role == ADMIN or self.is_staff
+        # Модератор, как и раньше через is_staff, проходит проверки
+        # администратора; роль проверяется напрямую, без рекурсии через
+        # is_staff для обычного пользователя.
+        return self.role in (ADMIN, MODERATOR)
 
     @property
     def is_moderator_or_admin(self):
@@ -163,16 +183,29 @@ class Genre(models.Model):
         return self.name
 
 
+def score_count_field(score):
+    return models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name=f'Отзывов с оценкой {score}'
+    )
+
+
+def validate_year(value):
+    # Текущий год проверяется при вызове, а не при загрузке модуля:
+    # иначе валидатор попадал бы в миграции с годом их создания.
+    if value > timezone.now().year:
+        raise ValidationError('Год не может быть больше текущего!')
+
+
 class Title(models.Model):
     name = models.CharField(
-        max_length=50,
+        max_length=256,
         verbose_name='Произведение',
     )
     year = models.IntegerField(
         verbose_name='Дата выхода',
-        validators=(MaxValueValidator(
-            timezone.now().year,
-            message='Год не может быть больше текущего!'),)
+        validators=(validate_year,)
     )
     description = models.TextField(
         blank=True,
@@ -191,15 +224,74 @@ class Title(models.Model):
         related_name='titles',
         verbose_name='Категория'
     )
+    reviews_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество отзывов'
+    )
+    score_sum = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Сумма оценок'
+    )
+    rating = models.FloatField(
+        blank=True,
+        null=True,
+        editable=False,
+        verbose_name='Рейтинг'
+    )
+    score_1_count = score_count_field(1)
+    score_2_count = score_count_field(2)
+    score_3_count = score_count_field(3)
+    score_4_count = score_count_field(4)
+    score_5_count = score_count_field(5)
+    score_6_count = score_count_field(6)
+    score_7_count = score_count_field(7)
+    score_8_count = score_count_field(8)
+    score_9_count = score_count_field(9)
+    score_10_count = score_count_field(10)
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name='Поисковый вектор'
+    )
+    update_date = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True,
+        db_index=True
+    )
 
     class Meta:
         ordering = ['name']
+        # Список произведений сортируется по названию и фильтруется по
+        # году и категории.
+        indexes = [
+            models.Index(fields=('name',), name='title_name_idx'),
+            models.Index(fields=('year', 'name'), name='title_year_name_idx'),
+            models.Index(
+                fields=('category', 'name'),
+                name='title_category_name_idx'
+            ),
+        ]
         verbose_name = 'Произведение'
         verbose_name_plural = 'Произведения'
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        # Агрегаты отзывов меняются только атомарными UPDATE из
+        # reviews.signals, а поисковый вектор - триггером базы, иначе
+        # сохранение устаревшего экземпляра (например, при PATCH
+        # произведения) затёрло бы их.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in TITLE_MAINTAINED_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
 
 class Review(models.Model):
     text = models.TextField(
@@ -223,6 +315,10 @@ class Review(models.Model):
         auto_now_add=True,
         db_index=True
     )
+    update_date = models.DateTimeField(
+        verbose_name='Дата изменения отзыва',
+        auto_now=True
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -236,6 +332,11 @@ class Review(models.Model):
         related_name='reviews',
         verbose_name='Произведение'
     )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество комментариев'
+    )
 
     class Meta:
         ordering = ['-pub_date']
@@ -245,21 +346,50 @@ class Review(models.Model):
                 name='one_review_per_title'
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=('title', '-pub_date', '-id'),
+                name='review_title_pub_date_idx'
+            ),
+            models.Index(
+                fields=('title', 'update_date'),
+                name='review_title_update_date_idx'
+            ),
+        ]
         verbose_name = 'Отзыв'
         verbose_name_plural = 'Отзывы'
 
     def __str__(self):
         return self.text[:10]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_title_id = instance.__dict__.get('title_id')
+        instance._loaded_score = instance.__dict__.get('score')
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Агрегаты произведения пересчитываются в post_save,
+        # поэтому сохранение и пересчёт идут в одной транзакции.
+        using = kwargs.get('using') or router.db_for_write(
+            type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
+    # Отдельный индекс по review_id не нужен: с него начинаются оба
+    # составных индекса, а более узкий лишний индекс перехватывал
+    # у планировщика запрос валидатора ETag.
     review = models.ForeignKey(
         Review,
         on_delete=models.CASCADE,
         blank=True,
         null=True,
         related_name='comments',
-        verbose_name='Отзыв'
+        verbose_name='Отзыв',
+        db_index=False
     )
     author = models.ForeignKey(
         User,
@@ -273,14 +403,128 @@ class Comment(models.Model):
         auto_now_add=True,
         db_index=True
     )
+    update_date = models.DateTimeField(
+        verbose_name='Дата изменения комментария',
+        auto_now=True
+    )
     text = models.TextField(
         verbose_name='Текст комментария',
     )
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=('review', '-pub_date', '-id'),
+                name='comment_review_pub_date_idx'
+            ),
+            models.Index(
+                fields=('review', 'update_date'),
+                name='comment_review_update_idx'
+            ),
+        ]
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
 
     def __str__(self):
         return self.text[:10]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_review_id = instance.__dict__.get('review_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Счётчик комментариев отзыва обновляется в post_save.
+        using = kwargs.get('using') or router.db_for_write(
+            type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+
+
+class OutgoingEmail(models.Model):
+    subject = models.CharField(
+        verbose_name='Тема',
+        max_length=255
+    )
+    body = models.TextField(
+        verbose_name='Текст письма'
+    )
+    to = models.EmailField(
+        verbose_name='Получатель',
+        max_length=254
+    )
+    created = models.DateTimeField(
+        verbose_name='Дата создания',
+        auto_now_add=True
+    )
+    send_after = models.DateTimeField(
+        verbose_name='Отправить не раньше',
+        default=timezone.now
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Попыток отправки',
+        default=0
+    )
+    last_error = models.TextField(
+        verbose_name='Последняя ошибка',
+        blank=True
+    )
+    sent_date = models.DateTimeField(
+        verbose_name='Дата отправки',
+        null=True,
+        blank=True
+    )
+
+    class Meta:
+        ordering = ['send_after']
+        indexes = [
+            models.Index(
+                fields=('send_after',),
+                name='outgoing_email_pending_idx',
+                condition=models.Q(sent_date__isnull=True)
+            ),
+        ]
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+
+    def __str__(self):
+        return f'{self.to}: {self.subject}'
+
+
+class LeaderboardEntry(models.Model):
+    # Строка заранее посчитанного рейтинга произведений. board - имя
+    # рейтинга, например top, top:category:3 или trending:genre:5;
+    # таблицу целиком перестраивает команда refresh_leaderboards.
+    board = models.CharField(
+        verbose_name='Рейтинг',
+        max_length=64
+    )
+    rank = models.PositiveIntegerField(
+        verbose_name='Место'
+    )
+    title = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name='leaderboard_entries',
+        verbose_name='Произведение'
+    )
+    score = models.FloatField(
+        verbose_name='Балл'
+    )
+
+    class Meta:
+        ordering = ['board', 'rank']
+        # Индекс ограничения обслуживает постраничный вывод по месту.
+        constraints = [
+            models.UniqueConstraint(
+                fields=('board', 'rank'),
+                name='leaderboard_board_rank'
+            ),
+        ]
+        verbose_name = 'Место в рейтинге'
+        verbose_name_plural = 'Места в рейтингах'
+
+    def __str__(self):
+        return f'{self.board} #{self.rank}'
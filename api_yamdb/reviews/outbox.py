@@ -0,0 +1,64 @@
+from datetime import timedelta
+from smtplib import SMTPException
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+BATCH_SIZE = 100
+MAX_ATTEMPTS = 5
+RETRY_DELAY = timedelta(minutes=1)
+MAX_RETRY_DELAY = timedelta(hours=1)
+
+
+def enqueue_email(subject, body, to):
+    # Письмо только записывается в базу, отправляет его команда
+    # send_emails, поэтому запрос не ждёт SMTP-сервер.
+    return OutgoingEmail.objects.create(subject=subject, body=body, to=to)
+
+
+def retry_delay(attempts):
+    return min(RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+
+
+def send_pending(batch_size=BATCH_SIZE, max_attempts=MAX_ATTEMPTS,
+                 connection=None):
+    # Отправляет одну пачку писем через одно соединение с почтовым
+    # сервером и возвращает количество отправленных и неудачных.
+    # Строки пачки блокируются с SKIP LOCKED, поэтому параллельные
+    # обработчики не отправят одно письмо дважды.
+    now = timezone.now()
+    sent = failed = 0
+    with transaction.atomic():
+        emails = list(OutgoingEmail.objects.select_for_update(
+            skip_locked=True).filter(
+                sent_date__isnull=True,
+                attempts__lt=max_attempts,
+                send_after__lte=now)[:batch_size])
+        if not emails:
+            return sent, failed
+        connection = connection or get_connection()
+        try:
+            for email in emails:
+                email.attempts += 1
+                message = EmailMessage(email.subject, email.body,
+                                       to=[email.to], connection=connection)
+                try:
+                    # После ошибки соединение закрыто и открывается заново.
+                    connection.open()
+                    message.send()
+                except (SMTPException, OSError) as error:
+                    connection.close()
+                    email.last_error = str(error)
+                    email.send_after = now + retry_delay(email.attempts)
+                    failed += 1
+                else:
+                    email.sent_date = timezone.now()
+                    sent += 1
+        finally:
+            connection.close()
+        OutgoingEmail.objects.bulk_update(
+            emails, ('attempts', 'last_error', 'send_after', 'sent_date'))
+    return sent, failed
@@ -0,0 +1,186 @@
+from django.db import DatabaseError, connections, transaction
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+try:
+    from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                                TrigramSimilarity)
+except ImportError:
+    # Нужны только для поиска в PostgreSQL.
+    SearchQuery = SearchRank = TrigramSimilarity = None
+
+SEARCH_CONFIG = 'russian'
+TITLE_FTS_TABLE = 'reviews_title_fts'
+
+POSTGRES_SEARCH_SQL = f'''
+CREATE OR REPLACE FUNCTION reviews_title_search_vector_update()
+RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('{SEARCH_CONFIG}',
+                              coalesce(NEW.name, '')), 'A')
+        || setweight(to_tsvector('{SEARCH_CONFIG}',
+                                 coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS reviews_title_search_vector_trigger ON reviews_title;
+CREATE TRIGGER reviews_title_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, description ON reviews_title
+    FOR EACH ROW EXECUTE PROCEDURE reviews_title_search_vector_update();
+
+UPDATE reviews_title SET name = name;
+
+CREATE INDEX IF NOT EXISTS reviews_title_search_vector_idx
+    ON reviews_title USING gin (search_vector);
+'''
+
+POSTGRES_TRIGRAM_SQL = '''
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS reviews_title_name_trgm_idx
+    ON reviews_title USING gin (name gin_trgm_ops);
+'''
+
+SQLITE_SEARCH_SQL = (
+    f'''CREATE VIRTUAL TABLE IF NOT EXISTS {TITLE_FTS_TABLE} USING fts5(
+        name, description,
+        content='reviews_title', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )''',
+    f'''CREATE TRIGGER IF NOT EXISTS {TITLE_FTS_TABLE}_insert
+    AFTER INSERT ON reviews_title BEGIN
+        INSERT INTO {TITLE_FTS_TABLE} (rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS {TITLE_FTS_TABLE}_delete
+    AFTER DELETE ON reviews_title BEGIN
+        INSERT INTO {TITLE_FTS_TABLE} ({TITLE_FTS_TABLE}, rowid, name,
+                                       description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS {TITLE_FTS_TABLE}_update
+    AFTER UPDATE OF name, description ON reviews_title BEGIN
+        INSERT INTO {TITLE_FTS_TABLE} ({TITLE_FTS_TABLE}, rowid, name,
+                                       description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO {TITLE_FTS_TABLE} (rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END''',
+    f"INSERT INTO {TITLE_FTS_TABLE} ({TITLE_FTS_TABLE}) VALUES ('rebuild')",
+)
+
+SQLITE_DROP_SQL = (
+    f'DROP TRIGGER IF EXISTS {TITLE_FTS_TABLE}_insert',
+    f'DROP TRIGGER IF EXISTS {TITLE_FTS_TABLE}_delete',
+    f'DROP TRIGGER IF EXISTS {TITLE_FTS_TABLE}_update',
+    f'DROP TABLE IF EXISTS {TITLE_FTS_TABLE}',
+)
+
+POSTGRES_DROP_SQL = '''
+DROP TRIGGER IF EXISTS reviews_title_search_vector_trigger ON reviews_title;
+DROP FUNCTION IF EXISTS reviews_title_search_vector_update();
+DROP INDEX IF EXISTS reviews_title_search_vector_idx;
+DROP INDEX IF EXISTS reviews_title_name_trgm_idx;
+'''
+
+# Веса bm25 для колонок name и description таблицы FTS5.
+FTS_WEIGHTS = (10.0, 1.0)
+
+_trigram_available = {}
+
+
+def install_title_search(connection):
+    # Поисковый индекс произведений поддерживается триггерами базы,
+    # поэтому он не отстаёт и при массовой загрузке данных.
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(POSTGRES_SEARCH_SQL)
+            try:
+                with transaction.atomic(using=connection.alias):
+                    cursor.execute(POSTGRES_TRIGRAM_SQL)
+            except DatabaseError:
+                # Без contrib-модуля pg_trgm поиск работает без нечёткого
+                # совпадения по названию.
+                pass
+            _trigram_available.pop(connection.alias, None)
+        elif connection.vendor == 'sqlite':
+            for statement in SQLITE_SEARCH_SQL:
+                cursor.execute(statement)
+
+
+def restore_title_search(connection):
+    # SQLite меняет схему, пересоздавая таблицу, и триггеры FTS5 пропадают
+    # вместе со старой таблицей. После миграций они ставятся заново, а
+    # индекс перестраивается; пока поиска нет (до 0005), ничего не делается.
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name LIKE %s",
+            [f'{TITLE_FTS_TABLE}%'])
+        names = {name for name, in cursor.fetchall()}
+    triggers = {f'{TITLE_FTS_TABLE}_{event}'
+                for event in ('insert', 'delete', 'update')}
+    if TITLE_FTS_TABLE in names and not triggers <= names:
+        install_title_search(connection)
+
+
+def uninstall_title_search(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(POSTGRES_DROP_SQL)
+        elif connection.vendor == 'sqlite':
+            for statement in SQLITE_DROP_SQL:
+                cursor.execute(statement)
+
+
+def has_trigram(connection):
+    if connection.alias not in _trigram_available:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            _trigram_available[connection.alias] = (
+                cursor.fetchone() is not None)
+    return _trigram_available[connection.alias]
+
+
+def fts_query(term):
+    # Каждое слово ищется как префикс, слова объединяются через AND.
+    words = term.split()
+    return ' '.join('"{}"*'.format(word.replace('"', '""'))
+                    for word in words)
+
+
+def search_titles(queryset, term):
+    # Оставляет подходящие под запрос произведения и аннотирует их
+    # релевантностью rank: чем больше, тем выше в выдаче.
+    term = term.strip()
+    if not term:
+        return queryset
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        query = SearchQuery(term, config=SEARCH_CONFIG)
+        rank = SearchRank(F('search_vector'), query)
+        condition = Q(search_vector=query)
+        if has_trigram(connection):
+            rank = rank + TrigramSimilarity('name', term)
+            condition |= Q(name__trigram_similar=term)
+        return queryset.annotate(rank=rank).filter(condition)
+    if connection.vendor == 'sqlite':
+        match = fts_query(term)
+        weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+        # RawSQL в id__in SQLite читает как скалярный подзапрос,
+        # поэтому условие по индексу FTS5 передаётся через extra().
+        return queryset.extra(
+            where=[f'reviews_title.id IN (SELECT rowid FROM {TITLE_FTS_TABLE} '
+                   f'WHERE {TITLE_FTS_TABLE} MATCH %s)'],
+            params=[match],
+        ).annotate(rank=RawSQL(
+            f'SELECT -bm25({TITLE_FTS_TABLE}, {weights}) '
+            f'FROM {TITLE_FTS_TABLE} WHERE {TITLE_FTS_TABLE} MATCH %s '
+            f'AND rowid = reviews_title.id', (match,),
+            output_field=FloatField()))
+    return queryset.filter(
+        Q(name__icontains=term) | Q(description__icontains=term)
+    ).annotate(rank=Value(0.0, output_field=FloatField()))
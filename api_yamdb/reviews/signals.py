@@ -0,0 +1,157 @@
+from collections import Counter
+
+from django.db.models import Count, F, FloatField, Q, Sum
+from django.db.models.functions import Cast, Coalesce, NullIf
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from .models import (SCORE_COUNT_FIELDS, SCORES, Category, Comment, Genre,
+                     Review, Title)
+
+# Агрегаты пересчитаны массовым UPDATE, минуя post_save: sender - модель
+# (Title или Review), строки которой изменились.
+aggregates_rebuilt = Signal(providing_args=['using'])
+
+
+def _rating(reviews_count, score_sum):
+    return (Cast(score_sum, FloatField())
+            / Cast(NullIf(reviews_count, 0), FloatField()))
+
+
+def score_count_name(score):
+    return SCORE_COUNT_FIELDS[score - 1]
+
+
+def shift_title_rating(title_id, added=(), removed=(), using=None):
+    # Один UPDATE через F(): параллельные отзывы к одному произведению
+    # не теряют изменений друг друга. added и removed - оценки
+    # добавленных и удалённых отзывов. Дата изменения берётся из Python,
+    # как у auto_now: Now() в SQLite - CURRENT_TIMESTAMP с точностью до
+    # секунды, и такая дата оказалась бы раньше дат auto_now.
+    reviews_count = F('reviews_count') + len(added) - len(removed)
+    score_sum = F('score_sum') + sum(added) - sum(removed)
+    counts = Counter(added)
+    counts.subtract(removed)
+    Title.objects.using(using).filter(pk=title_id).update(
+        reviews_count=reviews_count,
+        score_sum=score_sum,
+        rating=_rating(reviews_count, score_sum),
+        update_date=timezone.now(),
+        **{score_count_name(score): F(score_count_name(score)) + count
+           for score, count in counts.items() if count}
+    )
+
+
+def score_counts():
+    # Агрегаты распределения оценок для aggregate() и annotate().
+    return {score_count_name(score): Count('pk', filter=Q(score=score))
+            for score in SCORES}
+
+
+def recount_title_rating(title_id, using=None):
+    totals = Review.objects.using(using).filter(
+        title_id=title_id).aggregate(
+            reviews_count=Count('pk'),
+            score_sum=Coalesce(Sum('score'), 0),
+            **score_counts())
+    rating = None
+    if totals['reviews_count']:
+        rating = totals['score_sum'] / totals['reviews_count']
+    Title.objects.using(using).filter(pk=title_id).update(
+        rating=rating, update_date=timezone.now(), **totals)
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_review_save(sender, instance, created, using,
+                                 raw=False, **kwargs):
+    if raw:
+        return
+    old_title_id = getattr(instance, '_loaded_title_id', None)
+    old_score = getattr(instance, '_loaded_score', None)
+    if created:
+        shift_title_rating(instance.title_id, [instance.score], using=using)
+    elif old_title_id is None or old_score is None:
+        # Экземпляр не загружался из базы: прежняя оценка неизвестна.
+        recount_title_rating(instance.title_id, using)
+    elif old_title_id != instance.title_id:
+        shift_title_rating(old_title_id, removed=[old_score], using=using)
+        shift_title_rating(instance.title_id, [instance.score], using=using)
+    elif old_score != instance.score:
+        shift_title_rating(instance.title_id, [instance.score], [old_score],
+                           using)
+    instance._loaded_title_id = instance.title_id
+    instance._loaded_score = instance.score
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_on_review_delete(sender, instance, using, **kwargs):
+    shift_title_rating(instance.title_id, removed=[instance.score],
+                       using=using)
+
+
+def shift_comments_count(review_id, delta, using=None):
+    # Счётчик входит в представление отзыва, поэтому вместе с ним
+    # сдвигается и дата изменения отзыва.
+    if review_id is not None and delta:
+        Review.objects.using(using).filter(pk=review_id).update(
+            comments_count=F('comments_count') + delta,
+            update_date=timezone.now())
+
+
+@receiver(post_save, sender=Comment)
+def update_comments_count_on_save(sender, instance, created, using,
+                                  raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        shift_comments_count(instance.review_id, 1, using)
+    elif not hasattr(instance, '_loaded_review_id'):
+        # Экземпляр не загружался из базы: прежний отзыв неизвестен.
+        Review.objects.using(using).filter(pk=instance.review_id).update(
+            comments_count=Comment.objects.using(using).filter(
+                review_id=instance.review_id).count(),
+            update_date=timezone.now())
+    elif instance._loaded_review_id != instance.review_id:
+        shift_comments_count(instance._loaded_review_id, -1, using)
+        shift_comments_count(instance.review_id, 1, using)
+    instance._loaded_review_id = instance.review_id
+
+
+@receiver(post_delete, sender=Comment)
+def update_comments_count_on_delete(sender, instance, using, **kwargs):
+    shift_comments_count(instance.review_id, -1, using)
+
+
+def touch_titles(using=None, **lookup):
+    # Дата изменения произведения отражает любые изменения его
+    # представления в API, в том числе жанров и категории.
+    Title.objects.using(using).filter(**lookup).update(
+        update_date=timezone.now())
+
+
+@receiver(post_save, sender=Genre)
+@receiver(pre_delete, sender=Genre)
+def touch_titles_of_genre(sender, instance, using, raw=False, **kwargs):
+    if not raw:
+        touch_titles(using, genre=instance)
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def touch_titles_of_category(sender, instance, using, raw=False, **kwargs):
+    if not raw:
+        touch_titles(using, category=instance)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def touch_titles_on_genres_change(sender, instance, action, reverse, pk_set,
+                                  using, **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            touch_titles(using, pk=instance.pk)
+    elif action in ('post_add', 'post_remove'):
+        touch_titles(using, pk__in=pk_set)
+    elif action == 'pre_clear':
+        touch_titles(using, genre=instance)
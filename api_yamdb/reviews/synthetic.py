@@ -0,0 +1,153 @@
+import random
+from datetime import datetime, timedelta
+
+from django.db.models import Max
+from django.utils import timezone
+
+from .loading import TABLES
+
+WORDS = (
+    'тень', 'город', 'ветер', 'письмо', 'море', 'дорога', 'ночь', 'сад',
+    'зеркало', 'огонь', 'песня', 'остров', 'сердце', 'поезд', 'зима',
+    'лето', 'звезда', 'память', 'берег', 'дом', 'река', 'свет', 'тайна',
+    'небо', 'голос', 'лес', 'окно', 'мост', 'сон', 'время',
+)
+FIRST_NAMES = ('Анна', 'Иван', 'Мария', 'Пётр', 'Ольга', 'Сергей', 'Елена',
+               'Дмитрий', 'Наталья', 'Алексей')
+LAST_NAMES = ('Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Соколов',
+              'Лебедев', 'Козлов', 'Новиков', 'Морозов', 'Волков')
+ROLES = ('user', 'moderator', 'admin')
+ROLE_WEIGHTS = (94, 5, 1)
+SCORE_WEIGHTS = (2, 2, 3, 4, 6, 9, 14, 20, 22, 18)
+FIRST_DATE = timezone.make_aware(datetime(2015, 1, 1), timezone.utc)
+PERIOD = timedelta(days=7 * 365)
+
+
+def spread(total, parts):
+    # Делит total на parts почти равных частей.
+    base, extra = divmod(total, parts) if parts else (0, 0)
+    for index in range(parts):
+        yield base + (index < extra)
+
+
+class SyntheticData:
+    # Детерминированный генератор строк в формате CSV-файлов импорта
+    # (тот же порядок колонок): одинаковые размеры и seed дают
+    # одинаковые данные. Каждая таблица
+    # генерируется своим потоком случайных чисел, поэтому таблицы можно
+    # строить независимо и параллельно, не держа их в памяти.
+
+    def __init__(self, users, categories, genres, titles, reviews,
+                 comments, seed=0, first_ids=None):
+        if reviews > titles * users:
+            raise ValueError('Отзывов больше, чем пар автор-произведение')
+        if comments and not (reviews and users):
+            raise ValueError('Комментариям нужны отзывы и пользователи')
+        if titles and not (categories and genres):
+            raise ValueError('Произведениям нужны категории и жанры')
+        self.counts = {
+            'users': users, 'category': categories, 'genre': genres,
+            'titles': titles, 'review': reviews, 'comments': comments,
+        }
+        self.seed = seed
+        self.first_ids = {name: 1 for name in TABLES}
+        self.first_ids.update(first_ids or {})
+
+    def random(self, name):
+        return random.Random(f'{self.seed}:{name}')
+
+    def ids(self, name):
+        first = self.first_ids[name]
+        return range(first, first + self.counts[name])
+
+    def sources(self):
+        return {name: getattr(self, name) for name in TABLES}
+
+    def text(self, rng, words):
+        return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+    def date(self, rng):
+        return FIRST_DATE + PERIOD * rng.random()
+
+    def users(self):
+        rng = self.random('users')
+        for pk in self.ids('users'):
+            yield {
+                'id': pk, 'username': f'synthetic{pk}',
+                'email': f'synthetic{pk}@yamdb.fake',
+                'role': rng.choices(ROLES, ROLE_WEIGHTS)[0], 'bio': '',
+                'first_name': rng.choice(FIRST_NAMES),
+                'last_name': rng.choice(LAST_NAMES),
+            }
+
+    def category(self):
+        for pk in self.ids('category'):
+            yield {'id': pk, 'name': f'Категория {pk}',
+                   'slug': f'category-{pk}'}
+
+    def genre(self):
+        for pk in self.ids('genre'):
+            yield {'id': pk, 'name': f'Жанр {pk}', 'slug': f'genre-{pk}'}
+
+    def titles(self):
+        rng = self.random('titles')
+        categories = self.ids('category')
+        for pk in self.ids('titles'):
+            yield {
+                'id': pk, 'name': self.text(rng, rng.randint(1, 4)),
+                'year': rng.randint(1900, 2021),
+                'category': rng.choice(categories),
+            }
+
+    def genre_title(self):
+        rng = self.random('genre_title')
+        genres = self.ids('genre')
+        pk = self.first_ids['genre_title']
+        for title in self.ids('titles'):
+            for genre in rng.sample(genres, min(rng.randint(1, 3),
+                                                len(genres))):
+                yield {'id': pk, 'title_id': title, 'genre_id': genre}
+                pk += 1
+
+    def review(self):
+        # У каждого произведения свои, не повторяющиеся авторы.
+        rng = self.random('review')
+        users = self.ids('users')
+        pk = self.first_ids['review']
+        for title, count in zip(self.ids('titles'),
+                                spread(self.counts['review'],
+                                       self.counts['titles'])):
+            for author in rng.sample(users, count):
+                yield {
+                    'id': pk, 'title_id': title,
+                    'text': self.text(rng, rng.randint(5, 40)),
+                    'author': author,
+                    'score': rng.choices(range(1, 11), SCORE_WEIGHTS)[0],
+                    'pub_date': self.date(rng),
+                }
+                pk += 1
+
+    def comments(self):
+        rng = self.random('comments')
+        users = self.ids('users')
+        pk = self.first_ids['comments']
+        for review, count in zip(self.ids('review'),
+                                 spread(self.counts['comments'],
+                                        self.counts['review'])):
+            for _ in range(count):
+                yield {
+                    'id': pk, 'review_id': review,
+                    'text': self.text(rng, rng.randint(3, 20)),
+                    'author': rng.choice(users),
+                    'pub_date': self.date(rng),
+                }
+                pk += 1
+
+
+def next_ids(using):
+    # Первые свободные id таблиц, чтобы дописать данные к существующим.
+    return {
+        name: (model.objects.using(using).aggregate(
+            last=Max('pk'))['last'] or 0) + 1
+        for name, (_, model, _) in TABLES.items()
+    }
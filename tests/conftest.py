@@ -1,9 +1,25 @@
 import sys
 from os.path import abspath, dirname, join
 
+import pytest
+
 root_dir = dirname(dirname(abspath(__file__)))
 sys.path.append(root_dir)
 infra_dir_path = join(root_dir, 'infra')
 
 pytest_plugins = [
+    'tests.fixtures.fixture_user',
+    'tests.fixtures.fixture_data',
 ]
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    from api import metrics
+    from api.authentication import clear_user_cache
+    from django.core.cache import caches
+
+    for cache in caches.all():
+        cache.clear()
+    clear_user_cache()
+    metrics.reset()
@@ -0,0 +1,38 @@
+import pytest
+
+
+@pytest.fixture
+def category():
+    from reviews.models import Category
+    return Category.objects.create(name='Фильм', slug='movie')
+
+
+@pytest.fixture
+def genres():
+    from reviews.models import Genre
+    return [
+        Genre.objects.create(name='Драма', slug='drama'),
+        Genre.objects.create(name='Комедия', slug='comedy'),
+    ]
+
+
+@pytest.fixture
+def title(category, genres):
+    from reviews.models import Title
+    title = Title.objects.create(
+        name='Побег из Шоушенка', year=1994, category=category)
+    title.genre.set(genres)
+    return title
+
+
+@pytest.fixture
+def make_users(django_user_model):
+    def make(count, prefix='reviewer'):
+        return [
+            django_user_model.objects.create_user(
+                email=f'{prefix}{i}@yamdb.fake', username=f'{prefix}{i}',
+                password='1234567'
+            )
+            for i in range(count)
+        ]
+    return make
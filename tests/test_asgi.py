@@ -0,0 +1,200 @@
+import asyncio
+import json
+import threading
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+import pytest
+from django.core.signals import request_started
+
+
+def _scope(path, method='GET', query=b'', headers=()):
+    return {
+        'type': 'http', 'method': method, 'path': path,
+        'query_string': query, 'http_version': '1.1',
+        'server': ('testserver', 80), 'client': ('127.0.0.1', 5000),
+        'headers': [(b'host', b'testserver'), *headers],
+    }
+
+
+async def _call(application, scope, body=b'', receive=None):
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    async def receive_body():
+        return {'type': 'http.request', 'body': body}
+
+    await application(scope, receive or receive_body, send)
+    status = messages[0]['status']
+    headers = dict(messages[0]['headers'])
+    content = b''.join(message.get('body', b'') for message in messages[1:])
+    return status, headers, content, messages
+
+
+def _authorization(user):
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    return (b'authorization',
+            f'Bearer {RefreshToken.for_user(user).access_token}'.encode())
+
+
+def _run(coroutine):
+    return asyncio.get_event_loop().run_until_complete(coroutine)
+
+
+@pytest.fixture
+def application(transactional_db, settings):
+    # Представления выполняются в потоках пулов со своими соединениями
+    # с базой, поэтому данные теста должны быть зафиксированы.
+    from api.asgi import ASGIHandler
+
+    settings.ASGI_CATALOG_THREADS = 1
+    settings.ASGI_THREADS = 1
+    handler = ASGIHandler()
+    yield handler
+    handler.close()
+
+
+@pytest.fixture
+def threads():
+    names = []
+
+    def record(**kwargs):
+        names.append(threading.current_thread().name)
+
+    request_started.connect(record)
+    yield names
+    request_started.disconnect(record)
+
+
+class TestASGIHandler:
+
+    def test_catalog_read(self, application, client, title, threads):
+        status, headers, content, _ = _run(
+            _call(application, _scope('/api/v1/titles/')))
+        assert status == 200
+        assert headers[b'content-type'] == b'application/json'
+        assert json.loads(content) == client.get('/api/v1/titles/').json(), (
+            'Проверьте, что ASGI-приложение отвечает так же, как WSGI'
+        )
+        assert threads[0].startswith('asgi-catalog'), (
+            'Проверьте, что чтение каталога идёт в пуле каталога'
+        )
+
+    def test_write(self, application, user, title, threads):
+        status, _, content, _ = _run(_call(
+            application,
+            _scope(f'/api/v1/titles/{title.id}/reviews/', method='POST',
+                   headers=[_authorization(user),
+                            (b'content-type', b'application/json')]),
+            body=json.dumps({'text': 'Отзыв', 'score': 9}).encode()))
+        assert status == 201, content
+        assert json.loads(content)['author'] == user.username
+        assert not threads[0].startswith('asgi-catalog'), (
+            'Проверьте, что запись идёт в общий пул'
+        )
+
+    def test_slow_client_does_not_hold_thread(self, application, title):
+        # Клиент, который не досылает тело запроса, не занимает
+        # единственный поток, и остальные запросы обслуживаются.
+        async def scenario():
+            finished = asyncio.Event()
+
+            async def never_finished():
+                await finished.wait()
+                return {'type': 'http.disconnect'}
+
+            slow = asyncio.ensure_future(application(
+                _scope('/api/v1/titles/'), never_finished, None))
+            status, *_ = await asyncio.wait_for(
+                _call(application, _scope('/api/v1/titles/')), 10)
+            finished.set()
+            await slow
+            return status
+
+        assert _run(scenario()) == 200
+
+    def test_streaming_export(self, application, admin, title):
+        status, headers, content, messages = _run(_call(
+            application,
+            _scope('/api/v1/export/titles/',
+                   headers=[_authorization(admin)])))
+        assert status == 200
+        assert headers[b'content-type'].startswith(b'application/x-ndjson')
+        assert json.loads(content.splitlines()[0])['id'] == title.id
+        assert messages[-1] == {'type': 'http.response.body', 'body': b''}
+
+    def test_query_string_and_not_found(self, application, title):
+        status, _, content, _ = _run(_call(
+            application, _scope('/api/v1/titles/', query=b'year=1994')))
+        assert json.loads(content)['count'] == 1
+        status, *_ = _run(_call(application, _scope('/api/v1/missing/')))
+        assert status == 404
+
+    def test_repeated_headers(self):
+        from api.asgi import build_environ
+
+        environ = build_environ(_scope('/', headers=[
+            (b'cookie', b'a=1'), (b'cookie', b'b=2'),
+            (b'accept', b'text/html'), (b'accept', b'application/json'),
+        ]), None)
+        assert environ['HTTP_COOKIE'] == 'a=1; b=2', (
+            'Проверьте, что заголовки Cookie склеиваются через "; "'
+        )
+        assert environ['HTTP_ACCEPT'] == 'text/html,application/json'
+
+    def test_lifespan(self, application):
+        async def scenario():
+            messages = []
+            incoming = iter([{'type': 'lifespan.startup'},
+                             {'type': 'lifespan.shutdown'}])
+
+            async def receive():
+                return next(incoming)
+
+            async def send(message):
+                messages.append(message['type'])
+
+            await application({'type': 'lifespan'}, receive, send)
+            return messages
+
+        assert _run(scenario()) == [
+            'lifespan.startup.complete', 'lifespan.shutdown.complete'
+        ], 'Проверьте, что ASGI-приложение поддерживает протокол lifespan'
+
+
+class QuietHandler(WSGIRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+
+class TestServerBenchmark:
+
+    def test_against_sync_server(self):
+        # Однопоточный WSGI-сервер, как синхронный воркер, занят
+        # медленным клиентом, и остальные запросы не успевают.
+        from api.benchmark import ServerBenchmark
+
+        def app(environ, start_response):
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            return [b'ok']
+
+        server = make_server('127.0.0.1', 0, app, handler_class=QuietHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        url = f'http://127.0.0.1:{server.server_port}'
+        try:
+            fast = ServerBenchmark(url, slow_clients=0, concurrency=2,
+                                   timeout=5).run('/', 10)
+            assert fast['requests'] == 10 and fast['errors'] == 0
+            slowed = ServerBenchmark(url, slow_clients=1, slow_interval=0.2,
+                                     concurrency=1, timeout=0.3).run('/', 2)
+            assert slowed['errors'] == 2 and slowed['slow_clients'] == 1, (
+                'Проверьте, что медленные клиенты задерживают ответы '
+                'синхронного сервера'
+            )
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,82 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+
+SIZES = {'users': 5, 'categories': 2, 'genres': 3, 'titles': 12,
+         'reviews': 30, 'comments': 40}
+
+
+def _benchmark(**options):
+    stdout = StringIO()
+    call_command('benchmark_api', stdout=stdout, requests=3, warmup=1,
+                 **options)
+    return stdout.getvalue()
+
+
+@pytest.mark.django_db
+class TestSyntheticData:
+
+    def test_deterministic(self):
+        from reviews.synthetic import SyntheticData
+
+        first = SyntheticData(*SIZES.values(), seed=7)
+        second = SyntheticData(*SIZES.values(), seed=7)
+        for name, rows in first.sources().items():
+            assert list(rows()) == list(second.sources()[name]()), (
+                f'Проверьте, что таблица {name} не зависит от запуска'
+            )
+        reviews = list(first.review())
+        assert len(reviews) == SIZES['reviews']
+        pairs = {(row['title_id'], row['author']) for row in reviews}
+        assert len(pairs) == len(reviews), (
+            'Проверьте, что автор пишет один отзыв к произведению'
+        )
+        assert len(list(first.comments())) == SIZES['comments']
+
+    def test_too_many_reviews(self):
+        from reviews.synthetic import SyntheticData
+
+        with pytest.raises(ValueError):
+            SyntheticData(2, 1, 1, 3, 7, 0)
+
+
+@pytest.mark.django_db
+class TestBenchmarkApi:
+
+    def test_seed_and_report(self, tmpdir):
+        from reviews.models import Comment, Review, Title
+
+        output = tmpdir.join('result.json')
+        stdout = _benchmark(seed_data=True, output=str(output), **SIZES)
+        assert Title.objects.count() >= SIZES['titles']
+        assert Review.objects.count() >= SIZES['reviews']
+        assert Comment.objects.count() >= SIZES['comments']
+        report = json.loads(output.read())
+        assert report['meta']['sizes'] == SIZES
+        results = report['results']
+        assert 'titles_list' in results and 'review_create' in results
+        for name in ('titles_list', 'titles_filter', 'title_detail',
+                     'reviews_list', 'comments_list', 'token',
+                     'review_create', 'comment_create', 'title_create'):
+            assert results[name]['errors'] == 0, (
+                f'Проверьте, что сценарий {name} выполняется без ошибок'
+            )
+        for key in ('p50_ms', 'p95_ms', 'p99_ms', 'rps', 'queries_mean',
+                    'queries_max'):
+            assert results['titles_list'][key] is not None
+        assert 'titles_list: p50' in stdout
+
+        compared = _benchmark(scenario=['titles_list'],
+                              compare=str(output))
+        assert 'Сравнение с' in compared
+        assert 'titles_list: p50_ms' in compared
+
+    def test_requires_data(self):
+        with pytest.raises(CommandError):
+            _benchmark()
+
+    def test_unknown_scenario(self, tmpdir):
+        with pytest.raises(CommandError):
+            _benchmark(seed_data=True, scenario=['missing'], **SIZES)
@@ -0,0 +1,147 @@
+from contextlib import nullcontext
+
+import pytest
+from django.db import connection
+from rest_framework.test import APIClient
+
+
+def _titles(count, **extra):
+    return [
+        {'name': f'Фильм {index}', 'year': 2000, 'genre': ['drama'],
+         'category': 'movie', **extra}
+        for index in range(count)
+    ]
+
+
+@pytest.mark.django_db
+class TestBulkCreate:
+
+    def test_titles(self, admin_client, category, genres,
+                    django_assert_max_num_queries):
+        from reviews.models import Title
+
+        payload = _titles(10)
+        payload[0]['genre'] = ['drama', 'comedy', 'drama']
+        # Аутентификация, жанры, категории, транзакция с вставками
+        # и выборка созданных произведений для ответа. Без RETURNING
+        # в bulk_create произведения сохраняются по одному.
+        budget = nullcontext()
+        if connection.features.can_return_ids_from_bulk_insert:
+            budget = django_assert_max_num_queries(9)
+        with budget:
+            response = admin_client.post('/api/v1/titles/bulk/', payload,
+                                         format='json')
+        assert response.status_code == 201, response.data
+        assert [item['name'] for item in response.data] == [
+            item['name'] for item in payload]
+        assert response.data[0]['genre'] == [
+            {'name': 'Драма', 'slug': 'drama'},
+            {'name': 'Комедия', 'slug': 'comedy'}]
+        assert response.data[1]['category']['slug'] == 'movie'
+        assert Title.objects.count() == 10
+        assert Title.genre.through.objects.count() == 11
+
+    def test_titles_all_or_nothing(self, admin_client, category, genres):
+        from reviews.models import Title
+
+        payload = _titles(3)
+        payload[1]['genre'] = ['jazz']
+        payload[2]['year'] = 3000
+        response = admin_client.post('/api/v1/titles/bulk/', payload,
+                                     format='json')
+        assert response.status_code == 400
+        assert response.data[0] == {}
+        assert 'genre' in response.data[1]
+        assert 'year' in response.data[2]
+        assert not Title.objects.exists(), (
+            'Проверьте, что при ошибке в одном объекте ничего не создаётся'
+        )
+
+    @pytest.mark.parametrize('payload', [{'name': 'Фильм'}, [], 'фильм'])
+    def test_not_list(self, admin_client, payload):
+        response = admin_client.post('/api/v1/titles/bulk/', payload,
+                                     format='json')
+        assert response.status_code == 400
+
+    def test_max_items(self, admin_client, category, genres, settings):
+        settings.BULK_MAX_ITEMS = 2
+        response = admin_client.post('/api/v1/titles/bulk/', _titles(3),
+                                     format='json')
+        assert response.status_code == 400
+
+    def test_permissions(self, user_client, category, genres):
+        assert APIClient().post('/api/v1/titles/bulk/', _titles(1),
+                           format='json').status_code == 401
+        assert user_client.post('/api/v1/titles/bulk/', _titles(1),
+                                format='json').status_code == 403
+        assert user_client.post(
+            '/api/v1/genres/bulk/', [{'name': 'Джаз', 'slug': 'jazz'}],
+            format='json').status_code == 403
+
+    def test_genres(self, admin_client, genres):
+        from reviews.models import Genre
+
+        response = admin_client.post('/api/v1/genres/bulk/', [
+            {'name': 'Джаз', 'slug': 'jazz'},
+            {'name': 'Драма', 'slug': 'drama'},
+            {'name': 'Джаз', 'slug': 'jazz'},
+        ], format='json')
+        assert response.status_code == 400
+        assert response.data[0] == {}
+        assert 'slug' in response.data[1] and 'slug' in response.data[2]
+        response = admin_client.post('/api/v1/genres/bulk/', [
+            {'name': 'Джаз', 'slug': 'jazz'},
+            {'name': 'Рок', 'slug': 'rock'},
+        ], format='json')
+        assert response.status_code == 201
+        assert response.data == [{'name': 'Джаз', 'slug': 'jazz'},
+                                 {'name': 'Рок', 'slug': 'rock'}]
+        assert Genre.objects.count() == 4
+
+    def test_reviews(self, user_client, user, title, category):
+        from reviews.models import Review, Title
+
+        other = Title.objects.create(name='Другой', year=2000,
+                                     category=category)
+        response = user_client.post('/api/v1/reviews/bulk/', [
+            {'title': title.id, 'text': 'Текст', 'score': 8},
+            {'title': other.id, 'text': 'Текст', 'score': 4},
+        ], format='json')
+        assert response.status_code == 201, response.data
+        assert response.data[0]['author'] == user.username
+        assert response.data[1]['title'] == other.id
+        assert response.data[0]['id'] is not None
+        title.refresh_from_db()
+        other.refresh_from_db()
+        assert (title.reviews_count, title.rating) == (1, 8)
+        assert (other.reviews_count, other.rating) == (1, 4)
+
+        response = user_client.post('/api/v1/reviews/bulk/', [
+            {'title': title.id, 'text': 'Ещё', 'score': 5},
+            {'title': 0, 'text': 'Текст', 'score': 5},
+            {'title': other.id, 'text': 'Текст', 'score': 11},
+        ], format='json')
+        assert response.status_code == 400
+        assert 'title' in response.data[0]
+        assert 'title' in response.data[1]
+        assert 'score' in response.data[2]
+        assert Review.objects.count() == 2
+
+    def test_reviews_duplicate_title(self, user_client, title):
+        response = user_client.post('/api/v1/reviews/bulk/', [
+            {'title': title.id, 'text': 'Текст', 'score': 8},
+            {'title': title.id, 'text': 'Текст', 'score': 4},
+        ], format='json')
+        assert response.status_code == 400
+        assert response.data[0] == {} and 'title' in response.data[1]
+
+    def test_mixin_must_be_configured(self):
+        from api.mixins import BulkCreateMixin
+        from api.serializers import GenreBulkSerializer
+        from django.core.exceptions import ImproperlyConfigured
+
+        with pytest.raises(ImproperlyConfigured):
+            type('BulkViewSet', (BulkCreateMixin,), {})
+        with pytest.raises(ImproperlyConfigured):
+            type('BulkViewSet', (BulkCreateMixin,),
+                 {'bulk_serializer_class': GenreBulkSerializer})
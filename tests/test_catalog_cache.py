@@ -0,0 +1,96 @@
+import pytest
+
+
+def _get(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    return response
+
+
+@pytest.mark.django_db
+class TestCatalogCache:
+
+    def test_hit_and_miss(self, client, title, django_assert_num_queries):
+        from api.cache import get_stats
+
+        assert _get(client, '/api/v1/titles/?year=1994&name=Побег')[
+            'X-Cache'] == 'MISS'
+        with django_assert_num_queries(0):
+            response = _get(client, '/api/v1/titles/?name=Побег&year=1994')
+        assert response['X-Cache'] == 'HIT', (
+            'Проверьте, что порядок параметров не влияет на ключ кэша'
+        )
+        assert response.json()['results'][0]['name'] == title.name
+        assert get_stats() == {'hits': 1, 'misses': 1}
+
+    def test_authenticated_bypass(self, user_client, title):
+        _get(user_client, '/api/v1/titles/')
+        assert 'X-Cache' not in _get(user_client, '/api/v1/titles/')
+
+    @pytest.mark.parametrize('url', [
+        '/api/v1/titles/', '/api/v1/genres/', '/api/v1/categories/'
+    ])
+    def test_invalidation(self, client, title, url):
+        from reviews.models import Category, Genre
+
+        _get(client, url)
+        assert _get(client, url)['X-Cache'] == 'HIT'
+        Genre.objects.filter(slug='drama').get().delete()
+        Category.objects.create(name='Книга', slug='book')
+        response = _get(client, url)
+        assert response['X-Cache'] == 'MISS', (
+            'Проверьте, что запись в каталог сбрасывает кэш'
+        )
+
+    def test_title_changes(self, client, title, user):
+        from reviews.models import Review, Title
+
+        url = f'/api/v1/titles/{title.id}/'
+        _get(client, url)
+        Review.objects.create(title=title, author=user, text='Текст', score=8)
+        assert _get(client, url).json()['rating'] == 8, (
+            'Проверьте, что новый отзыв сбрасывает кэш произведений'
+        )
+        title.genre.clear()
+        assert _get(client, url).json()['genre'] == []
+        Title.objects.get(pk=title.pk).delete()
+        assert client.get(url).status_code == 404
+
+    def test_untouched_resources_stay_cached(self, client, title):
+        from reviews.models import Category
+
+        _get(client, '/api/v1/genres/')
+        Category.objects.create(name='Книга', slug='book')
+        assert _get(client, '/api/v1/genres/')['X-Cache'] == 'HIT'
+
+
+@pytest.mark.django_db(transaction=True)
+class TestCatalogCacheBackends:
+
+    @pytest.mark.parametrize('backend', ['locmem', 'filebased'])
+    def test_backend(self, client, settings, tmp_path, backend, category):
+        from reviews.models import Genre
+
+        settings.CACHES = {
+            **settings.CACHES,
+            'catalog': {
+                'BACKEND': f'django.core.cache.backends.{backend}.'
+                           + ('LocMemCache' if backend == 'locmem'
+                              else 'FileBasedCache'),
+                'LOCATION': str(tmp_path),
+                'OPTIONS': {'MAX_ENTRIES': 3},
+            },
+        }
+        _get(client, '/api/v1/categories/')
+        assert _get(client, '/api/v1/categories/')['X-Cache'] == 'HIT'
+        for i in range(5):
+            _get(client, f'/api/v1/genres/?search=x{i}')
+        if backend == 'filebased':
+            assert len(list(tmp_path.iterdir())) <= 3, (
+                'Проверьте, что кэш не превышает MAX_ENTRIES'
+            )
+        Genre.objects.create(name='Драма', slug='drama')
+        assert _get(client, '/api/v1/genres/').json()['results'][0][
+            'slug'] == 'drama', (
+            'Проверьте, что версия меняется после коммита записи'
+        )
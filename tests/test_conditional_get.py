@@ -0,0 +1,90 @@
+import pytest
+
+
+@pytest.fixture
+def review(title, user):
+    from reviews.models import Comment, Review
+
+    review = Review.objects.create(
+        title=title, author=user, text='Текст', score=5)
+    Comment.objects.create(review=review, author=user, text='Текст')
+    return review
+
+
+def _revalidate(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    etag = response['ETag']
+    return client.get(url, HTTP_IF_NONE_MATCH=etag), etag
+
+
+@pytest.mark.django_db
+class TestConditionalGet:
+
+    @pytest.mark.parametrize('url, queries', [
+        ('/api/v1/titles/', 1),
+        ('/api/v1/titles/{title}/', 1),
+        ('/api/v1/titles/{title}/reviews/', 1),
+        ('/api/v1/titles/{title}/reviews/{review}/', 1),
+        ('/api/v1/titles/{title}/reviews/{review}/comments/', 1),
+    ])
+    def test_not_modified(self, admin_client, title, review, url, queries,
+                          django_assert_num_queries):
+        url = url.format(title=title.id, review=review.id)
+        response = admin_client.get(url)
+        assert response.has_header('Last-Modified')
+        # Только валидатор: пользователь уже в кэше, страница
+        # не выбирается.
+        with django_assert_num_queries(queries):
+            not_modified = admin_client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag'])
+        assert not_modified.status_code == 304, (
+            'Проверьте, что при совпадении ETag возвращается 304'
+        )
+        not_modified = admin_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        assert not_modified.status_code == 304
+
+    def test_anonymous_cached_not_modified(self, client, title,
+                                           django_assert_num_queries):
+        response, etag = _revalidate(client, '/api/v1/titles/')
+        assert response.status_code == 304
+        with django_assert_num_queries(0):
+            response = client.get('/api/v1/titles/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+
+    def test_review_edit_changes_etag(self, user_client, title, review):
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        _, etag = _revalidate(user_client, url)
+        user_client.patch(f'{url}{review.id}/', data={'text': 'Новый'})
+        response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что изменение отзыва меняет ETag списка'
+        )
+        _, etag = _revalidate(user_client, '/api/v1/titles/')
+        user_client.delete(f'{url}{review.id}/')
+        response = user_client.get('/api/v1/titles/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что изменение рейтинга меняет ETag произведений'
+        )
+
+    def test_genre_rename_changes_title_etag(self, admin_client, title):
+        from reviews.models import Genre
+
+        url = f'/api/v1/titles/{title.id}/'
+        _, etag = _revalidate(admin_client, url)
+        genre = Genre.objects.get(slug='drama')
+        genre.name = 'Трагедия'
+        genre.save()
+        assert admin_client.get(
+            url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+        _, etag = _revalidate(admin_client, url)
+        title.genre.remove(genre)
+        assert admin_client.get(
+            url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    def test_filters_have_own_etag(self, admin_client, title):
+        _, etag = _revalidate(admin_client, '/api/v1/titles/')
+        response = admin_client.get(
+            '/api/v1/titles/?year=1994', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
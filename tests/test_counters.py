@@ -0,0 +1,143 @@
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import connection
+
+
+@pytest.fixture
+def review(title, user):
+    from reviews.models import Review
+
+    return Review.objects.create(title=title, author=user, text='Текст',
+                                 score=5)
+
+
+def _comments_count(review):
+    review.refresh_from_db()
+    return review.comments_count
+
+
+@pytest.mark.django_db
+class TestCommentsCount:
+
+    def test_follows_comment_changes(self, title, review, make_users):
+        from reviews.models import Comment, Review
+
+        first, second = make_users(2)
+        other = Review.objects.create(title=title, author=first,
+                                      text='Текст', score=3)
+        comment = Comment.objects.create(review=review, author=first,
+                                         text='Текст')
+        Comment.objects.create(review=review, author=second, text='Текст')
+        assert _comments_count(review) == 2, (
+            'Проверьте, что счётчик растёт при создании комментария'
+        )
+        comment = Comment.objects.get(pk=comment.pk)
+        comment.review = other
+        comment.save()
+        assert (_comments_count(review), _comments_count(other)) == (1, 1), (
+            'Проверьте, что перенос комментария меняет оба счётчика'
+        )
+        comment.delete()
+        assert _comments_count(other) == 0, (
+            'Проверьте, что счётчик уменьшается при удалении комментария'
+        )
+        remaining = Comment.objects.get()
+        Comment(pk=remaining.pk, review=review, author=second, text='Текст',
+                pub_date=remaining.pub_date).save()
+        assert _comments_count(review) == 1, (
+            'Проверьте пересчёт счётчика для комментария не из базы'
+        )
+
+    def test_api_returns_counters(self, client, user_client, title, review):
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        response = user_client.post(f'{url}{review.id}/comments/',
+                                    data={'text': 'Текст'})
+        assert response.status_code == 201
+        assert client.get(f'{url}{review.id}/').json()[
+            'comments_count'] == 1
+        assert client.get(url).json()['results'][0]['comments_count'] == 1, (
+            'Проверьте, что список отзывов отдаёт количество комментариев'
+        )
+        assert client.get('/api/v1/titles/').json()['results'][0][
+            'reviews_count'] == 1, (
+            'Проверьте, что список произведений отдаёт количество отзывов'
+        )
+
+    def test_comment_changes_reviews_etag(self, user_client, title, review):
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        etag = user_client.get(url)['ETag']
+        user_client.post(f'{url}{review.id}/comments/', data={'text': 'Текст'})
+        response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что новый комментарий меняет ETag списка отзывов'
+        )
+
+    def test_rebuild_command(self, review, user):
+        from reviews.models import Comment, Review
+
+        Comment.objects.create(review=review, author=user, text='Текст')
+        Review.objects.filter(pk=review.pk).update(comments_count=5)
+        with pytest.raises(CommandError):
+            call_command('rebuild_aggregates', '--check')
+        call_command('rebuild_aggregates', stdout=StringIO())
+        assert _comments_count(review) == 1
+        call_command('rebuild_title_ratings', '--check', stdout=StringIO())
+
+    def test_rebuild_touches_only_stale_titles(self, title, category,
+                                               review):
+        from reviews.models import Title
+
+        other = Title.objects.create(name='Другое', year=2000,
+                                     category=category)
+        Title.objects.filter(pk=title.pk).update(reviews_count=0)
+        dates = dict(Title.objects.values_list('pk', 'update_date'))
+        call_command('rebuild_aggregates', stdout=StringIO())
+        other.refresh_from_db()
+        title.refresh_from_db()
+        assert other.update_date == dates[other.pk], (
+            'Проверьте, что пересчёт не трогает корректные произведения'
+        )
+        assert title.reviews_count == 1
+        assert title.update_date > dates[title.pk]
+
+    def test_rebuild_changes_cached_responses(self, client, title, review):
+        from reviews.models import Review, Title
+
+        Review.objects.filter(pk=review.pk).update(comments_count=3)
+        Title.objects.filter(pk=title.pk).update(reviews_count=5)
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        assert client.get(url).json()['results'][0]['comments_count'] == 3
+        assert client.get('/api/v1/titles/').json()['results'][0][
+            'reviews_count'] == 5
+        call_command('rebuild_aggregates', stdout=StringIO())
+        assert client.get(url).json()['results'][0]['comments_count'] == 0
+        assert client.get('/api/v1/titles/').json()['results'][0][
+            'reviews_count'] == 1, (
+            'Проверьте, что пересчёт сдвигает версии кэша каталога'
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_comments(review, make_users):
+    # Комментарии создаются одновременно из разных соединений:
+    # UPDATE через F() не теряет приращений.
+    from django.db import connections
+    from reviews.models import Comment
+
+    if connection.vendor == 'sqlite':
+        pytest.skip('SQLite не поддерживает параллельную запись')
+    users = make_users(8)
+
+    def comment(author):
+        try:
+            Comment.objects.create(review=review, author=author,
+                                   text='Текст')
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(comment, users * 2))
+    assert _comments_count(review) == 16
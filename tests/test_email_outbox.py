@@ -0,0 +1,90 @@
+from datetime import timedelta
+from io import StringIO
+from smtplib import SMTPException
+
+import pytest
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.utils import timezone
+
+
+class FlakyBackend(EmailBackend):
+    # Не принимает письма на адреса из домена fail.
+    opened = 0
+
+    def open(self):
+        FlakyBackend.opened += 1
+
+    def send_messages(self, messages):
+        if any(message.to[0].endswith('@fail.fake') for message in messages):
+            raise SMTPException('Сервер недоступен')
+        return super().send_messages(messages)
+
+
+def _send_emails(**options):
+    stdout = StringIO()
+    call_command('send_emails', stdout=stdout, **options)
+    return stdout.getvalue()
+
+
+@pytest.mark.django_db
+class TestEmailOutbox:
+
+    def test_enqueue_does_not_send(self):
+        from reviews.models import OutgoingEmail
+        from reviews.outbox import enqueue_email
+
+        enqueue_email('Тема', 'Текст', 'user@yamdb.fake')
+        assert mail.outbox == [], (
+            'Проверьте, что письмо не отправляется во время запроса'
+        )
+        assert OutgoingEmail.objects.filter(sent_date__isnull=True).count() == 1
+
+    def test_send_batches(self):
+        from reviews.models import OutgoingEmail
+        from reviews.outbox import enqueue_email
+
+        for index in range(5):
+            enqueue_email('Тема', f'Код {index}', f'user{index}@yamdb.fake')
+        output = _send_emails(batch_size=2)
+        assert [message.body for message in mail.outbox] == [
+            f'Код {index}' for index in range(5)]
+        assert mail.outbox[0].to == ['user0@yamdb.fake']
+        assert 'Отправлено писем: 2' in output
+        assert not OutgoingEmail.objects.filter(
+            sent_date__isnull=True).exists()
+        _send_emails()
+        assert len(mail.outbox) == 5, 'Проверьте, что письма не уходят дважды'
+
+    def test_retry_with_backoff(self, settings):
+        from reviews.models import OutgoingEmail
+        from reviews.outbox import enqueue_email, send_pending
+
+        settings.EMAIL_BACKEND = 'tests.test_email_outbox.FlakyBackend'
+        FlakyBackend.opened = 0
+        enqueue_email('Тема', 'Текст', 'user@fail.fake')
+        enqueue_email('Тема', 'Текст', 'user@yamdb.fake')
+        assert send_pending() == (1, 1)
+        assert [message.to for message in mail.outbox] == [
+            ['user@yamdb.fake']]
+        # Соединение открывается заново только после ошибки.
+        assert FlakyBackend.opened == 2
+        failed = OutgoingEmail.objects.get(to='user@fail.fake')
+        assert failed.attempts == 1
+        assert failed.last_error == 'Сервер недоступен'
+        assert failed.send_after > timezone.now()
+        assert send_pending() == (0, 0), (
+            'Проверьте, что повторная попытка откладывается'
+        )
+
+        OutgoingEmail.objects.update(
+            send_after=timezone.now() - timedelta(seconds=1))
+        assert send_pending(max_attempts=2) == (0, 1)
+        failed.refresh_from_db()
+        assert failed.attempts == 2
+        OutgoingEmail.objects.update(
+            send_after=timezone.now() - timedelta(seconds=1))
+        assert send_pending(max_attempts=2) == (0, 0), (
+            'Проверьте, что после max_attempts письмо больше не отправляется'
+        )
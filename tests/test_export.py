@@ -0,0 +1,137 @@
+import csv
+import io
+import json
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+
+def _content(response):
+    assert response.status_code == 200, (
+        'Проверьте, что выгрузка доступна администратору'
+    )
+    assert response.streaming, 'Проверьте, что выгрузка отдаётся потоком'
+    return b''.join(response.streaming_content).decode()
+
+
+def _ndjson(response):
+    return [json.loads(line) for line in _content(response).splitlines()]
+
+
+@pytest.fixture
+def catalog(title, category, make_users):
+    from reviews.models import Comment, Review, Title
+
+    users = make_users(3)
+    for index, user in enumerate(users):
+        review = Review.objects.create(
+            title=title, author=user, text='Текст', score=index + 5)
+        Comment.objects.create(review=review, author=user, text='Ответ')
+    for index in range(4):
+        Title.objects.create(name=f'Фильм {index}', year=2000,
+                             category=category)
+    return title
+
+
+@pytest.mark.django_db
+class TestExport:
+
+    @pytest.mark.parametrize('url', [
+        '/api/v1/export/titles/', '/api/v1/export/reviews/',
+        '/api/v1/export/comments/',
+    ])
+    def test_admin_only(self, client, user_client, url):
+        assert client.get(url).status_code == 401
+        assert user_client.get(url).status_code == 403, (
+            'Проверьте, что выгрузка недоступна обычному пользователю'
+        )
+
+    def test_titles_ndjson(self, admin_client, catalog, settings,
+                           django_assert_num_queries):
+        settings.EXPORT_CHUNK_SIZE = 2
+        response = admin_client.get('/api/v1/export/titles/')
+        assert response['Content-Type'].startswith('application/x-ndjson')
+        # Три пачки по два произведения: выборка и жанры на каждую.
+        with django_assert_num_queries(6):
+            records = _ndjson(response)
+        assert [record['id'] for record in records] == sorted(
+            record['id'] for record in records)
+        assert len(records) == 5
+        record = records[0]
+        assert record['category'] == 'movie'
+        assert record['genre'] == ['drama', 'comedy']
+        assert record['rating'] == 6
+        assert record['reviews_count'] == 3
+        assert 'reviews' not in record
+
+    def test_titles_with_reviews(self, admin_client, catalog):
+        records = _ndjson(admin_client.get(
+            '/api/v1/export/titles/?include=reviews'))
+        reviews = records[0]['reviews']
+        assert [review['score'] for review in reviews] == [5, 6, 7]
+        assert reviews[0]['author'] == 'reviewer0'
+        assert reviews[0]['comments'][0]['text'] == 'Ответ'
+        assert all(record['reviews'] == [] for record in records[1:])
+
+    def test_titles_csv(self, admin_client, catalog):
+        response = admin_client.get('/api/v1/export/titles/?output=csv')
+        assert response['Content-Type'].startswith('text/csv')
+        assert 'titles.csv' in response['Content-Disposition']
+        rows = list(csv.DictReader(io.StringIO(_content(response))))
+        assert len(rows) == 5
+        assert rows[0]['genre'] == 'drama,comedy'
+        assert rows[0]['name'] == 'Побег из Шоушенка'
+        assert rows[1]['rating'] == ''
+
+    def test_reviews_and_comments(self, admin_client, catalog):
+        reviews = _ndjson(admin_client.get('/api/v1/export/reviews/'))
+        assert len(reviews) == 3
+        assert reviews[0]['title'] == catalog.id
+        comments = list(csv.DictReader(io.StringIO(_content(
+            admin_client.get('/api/v1/export/comments/?output=csv')))))
+        assert [int(row['review']) for row in comments] == [
+            review['id'] for review in reviews]
+
+    def test_since(self, admin_client, catalog):
+        from reviews.models import Comment, Review, Title
+
+        response = admin_client.get('/api/v1/export/titles/')
+        since = response['X-Export-Since']
+        assert _ndjson(admin_client.get(
+            '/api/v1/export/titles/', {'since': since})) == []
+
+        Title.objects.filter(name='Фильм 0').update(name='Фильм')
+        Title.objects.filter(name='Фильм 1').update(
+            update_date=timezone.now() + timedelta(seconds=1))
+        comment = Comment.objects.first()
+        comment.text = 'Исправлено'
+        comment.save()
+        records = _ndjson(admin_client.get(
+            '/api/v1/export/titles/', {'since': since}))
+        assert [record['name'] for record in records] == ['Фильм 1'], (
+            'Проверьте, что since оставляет только изменённые произведения'
+        )
+        records = _ndjson(admin_client.get(
+            '/api/v1/export/titles/',
+            {'since': since, 'include': 'reviews'}))
+        assert {record['id'] for record in records} == {
+            catalog.id, Title.objects.get(name='Фильм 1').id}
+        assert _ndjson(admin_client.get(
+            '/api/v1/export/reviews/', {'since': since})) == []
+        assert [record['text'] for record in _ndjson(admin_client.get(
+            '/api/v1/export/comments/', {'since': since}))] == ['Исправлено']
+        assert Review.objects.count() == 3
+
+    @pytest.mark.parametrize('query', [
+        'output=xml', 'since=вчера', 'since=2022-13-01',
+        'output=csv&include=reviews',
+    ])
+    def test_bad_params(self, admin_client, query):
+        response = admin_client.get(f'/api/v1/export/titles/?{query}')
+        assert response.status_code == 400
+
+    def test_since_date(self, admin_client, catalog):
+        records = _ndjson(admin_client.get(
+            '/api/v1/export/titles/', {'since': '2000-01-01'}))
+        assert len(records) == 5
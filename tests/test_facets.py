@@ -0,0 +1,88 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+URL = '/api/v1/titles/'
+
+
+@pytest.fixture
+def catalog(title, category, genres, make_users):
+    from reviews.models import Category, Review, Title
+
+    book = Category.objects.create(name='Книга', slug='book')
+    novel = Title.objects.create(name='Роман', year=1994, category=book)
+    novel.genre.set(genres[:1])
+    Title.objects.create(name='Без жанра', year=2001)
+    first, second = make_users(2)
+    Review.objects.create(title=title, author=first, text='Текст', score=9)
+    Review.objects.create(title=title, author=second, text='Текст', score=8)
+    Review.objects.create(title=novel, author=first, text='Текст', score=4)
+    return title, novel
+
+
+@pytest.mark.django_db
+class TestFacets:
+
+    def test_unfiltered(self, client, catalog):
+        response = client.get(f'{URL}?facets=genre,category,year,rating')
+        assert response.status_code == 200
+        facets = response.json()['facets']
+        assert facets['genre'] == [
+            {'slug': 'comedy', 'name': 'Комедия', 'count': 1},
+            {'slug': 'drama', 'name': 'Драма', 'count': 2},
+        ]
+        assert facets['category'] == [
+            {'slug': 'book', 'name': 'Книга', 'count': 1},
+            {'slug': 'movie', 'name': 'Фильм', 'count': 1},
+        ]
+        assert facets['year'] == [{'year': 1994, 'count': 2},
+                                  {'year': 2001, 'count': 1}]
+        assert facets['rating'] == [{'rating': 4, 'count': 1},
+                                    {'rating': 8, 'count': 1},
+                                    {'rating': None, 'count': 1}]
+        assert 'facets' not in client.get(URL).json(), (
+            'Проверьте, что фасеты считаются только по запросу'
+        )
+
+    def test_filtered(self, user_client, catalog,
+                      django_assert_num_queries):
+        url = f'{URL}?genre=drama&year=1994'
+        user_client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            user_client.get(url)
+        with django_assert_num_queries(len(context) + 2):
+            response = user_client.get(f'{url}&facets=genre,category')
+        assert response.status_code == 200
+        assert response.json()['facets'] == {
+            'genre': [{'slug': 'comedy', 'name': 'Комедия', 'count': 1},
+                      {'slug': 'drama', 'name': 'Драма', 'count': 2}],
+            'category': [{'slug': 'book', 'name': 'Книга', 'count': 1},
+                         {'slug': 'movie', 'name': 'Фильм', 'count': 1}],
+        }, 'Проверьте, что фасеты считаются по отфильтрованным произведениям'
+
+    def test_unknown_facet(self, client, catalog):
+        response = client.get(f'{URL}?facets=genre,author')
+        assert response.status_code == 400
+        assert 'facets' in response.json()
+
+    def test_unfiltered_cached(self, user_client, admin_client, catalog,
+                               django_assert_num_queries):
+        url = f'{URL}?facets=year'
+        from api.facets import cached_facets
+        from api.views import TitlesViewSet
+        from reviews.models import Title
+
+        first = user_client.get(url).json()['facets']
+        with django_assert_num_queries(0):
+            assert cached_facets(Title.objects.all(), ['year'],
+                                 TitlesViewSet.cache_resources) == first, (
+                'Проверьте, что фасеты без фильтров берутся из кэша'
+            )
+        response = admin_client.post(URL, {
+            'name': 'Новое', 'year': 2001, 'genre': ['drama'],
+            'category': 'book'})
+        assert response.status_code == 201
+        assert user_client.get(url).json()['facets'] == {'year': [
+            {'year': 1994, 'count': 2}, {'year': 2001, 'count': 2}]}, (
+            'Проверьте, что кэш фасетов сбрасывается при изменении каталога'
+        )
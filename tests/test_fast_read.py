@@ -0,0 +1,127 @@
+from datetime import datetime, timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+
+@pytest.fixture
+def corpus(category, genres, make_users):
+    from reviews.models import Category, Comment, Genre, Review, Title
+
+    book = Category.objects.create(name='Книга', slug='book')
+    extra = Genre.objects.create(name='Аниме', slug='anime')
+    titles = [
+        Title.objects.create(name='Без категории', year=1990),
+        Title.objects.create(
+            name='Строки', year=2001, category=book,
+            description='Перевод\u2028строки\u2029и "кавычки" \\ </script>'),
+        Title.objects.create(name='Emoji 🎬', year=2001, category=category,
+                             description=''),
+    ]
+    for number in range(6):
+        titles.append(Title.objects.create(
+            name=f'Произведение {number}', year=2000 + number % 3,
+            category=category if number % 2 else book))
+    titles[1].genre.set(genres)
+    titles[2].genre.set([extra, *genres])
+    for title in titles[3:]:
+        title.genre.set(genres[title.pk % 2:])
+    users = make_users(4)
+    started = timezone.make_aware(datetime(2021, 3, 1, 12, 30, 15, 123456))
+    for number, user in enumerate(users):
+        for title in titles[1:4]:
+            review = Review.objects.create(
+                title=title, author=user, score=number * 3 % 10 + 1,
+                text=f'Отзыв {number}\n«цитата»')
+            Review.objects.filter(pk=review.pk).update(
+                pub_date=started + timedelta(minutes=number))
+    review = Review.objects.filter(title=titles[1]).first()
+    for number, user in enumerate(users * 2):
+        comment = Comment.objects.create(review=review, author=user,
+                                         text=f'Комментарий {number}')
+        Comment.objects.filter(pk=comment.pk).update(
+            pub_date=started + timedelta(seconds=number // 2))
+    return titles, review
+
+
+def _urls(titles, review):
+    reviews = f'/api/v1/titles/{titles[1].id}/reviews/'
+    comments = f'{reviews}{review.id}/comments/'
+    return [
+        '/api/v1/titles/',
+        '/api/v1/titles/?page=2',
+        '/api/v1/titles/?genre=comedy',
+        '/api/v1/titles/?category=book&year=2001',
+        '/api/v1/titles/?name=Произв&ordering=-year',
+        '/api/v1/titles/?search=строки',
+        '/api/v1/titles/?facets=genre,year',
+        '/api/v1/titles/?page=99',
+        '/api/v1/titles/?count=false&page=2',
+        reviews,
+        f'{reviews}?limit=2&offset=1',
+        f'{reviews}?cursor=&limit=2',
+        f'/api/v1/titles/{titles[0].id}/reviews/',
+        comments,
+        f'{comments}?cursor=&limit=3',
+    ]
+
+
+def _get(client, url, settings, fast):
+    from django.core.cache import caches
+
+    settings.FAST_READ_PATH = fast
+    for cache in caches.all():
+        cache.clear()
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    return response, len(context)
+
+
+@pytest.mark.django_db
+class TestFastRead:
+
+    def test_byte_identical(self, user_client, client, corpus, settings):
+        for api_client in (user_client, client):
+            for url in _urls(*corpus):
+                expected, slow_queries = _get(api_client, url, settings,
+                                              False)
+                response, fast_queries = _get(api_client, url, settings,
+                                              True)
+                assert response.status_code == expected.status_code, url
+                assert response.content == expected.content, (
+                    f'Проверьте, что быстрый список {url} совпадает '
+                    f'с ответом сериализатора'
+                )
+                assert fast_queries <= slow_queries, url
+
+    def test_cursor_pages(self, client, corpus, settings):
+        titles, review = corpus
+        pages = []
+        for fast in (False, True):
+            settings.FAST_READ_PATH = fast
+            url = f'/api/v1/titles/{titles[1].id}/reviews/?cursor=&limit=1'
+            contents = []
+            while url:
+                response = client.get(url)
+                contents.append(response.content)
+                url = response.json()['next']
+            pages.append(contents)
+        assert pages[0] == pages[1] and len(pages[0]) == 4, (
+            'Проверьте, что курсоры быстрого списка совпадают'
+        )
+
+    def test_renderer(self):
+        from api.fast_read import FastJSONRenderer
+        from rest_framework.renderers import JSONRenderer
+
+        data = {
+            'text': 'строка\u2028и\u2029', 'items': [1, None, True, 'ж'],
+            'date': timezone.make_aware(datetime(2021, 3, 1, 12, 0, 0,
+                                                 123456)),
+            'nested': {'a': [{'b': '"</script>"'}]},
+        }
+        assert (FastJSONRenderer().render(data)
+                == JSONRenderer().render(data))
+        assert FastJSONRenderer().render(None) == b''
@@ -0,0 +1,62 @@
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+
+SIZES = {'users': 8, 'categories': 2, 'genres': 4, 'titles': 10,
+         'reviews': 50, 'comments': 60}
+
+
+def _generate(**options):
+    stdout = StringIO()
+    call_command('generate_data', stdout=stdout, **options)
+    return stdout.getvalue()
+
+
+@pytest.mark.django_db
+class TestGenerateData:
+
+    def test_generate_to_database(self):
+        from reviews.models import Comment, Review, Title, User
+
+        output = _generate(**SIZES)
+        assert 'reviews_review: создано 50 ' in output
+        assert 'строк/с' in output
+        _generate(seed=1, **SIZES)
+        assert User.objects.count() == 2 * SIZES['users'], (
+            'Проверьте, что повторный запуск дописывает данные'
+        )
+        assert Title.objects.count() == 2 * SIZES['titles']
+        assert Review.objects.count() == 2 * SIZES['reviews']
+        assert Comment.objects.count() == 2 * SIZES['comments']
+        title = Title.objects.order_by('pk').last()
+        assert title.reviews_count == title.reviews.count()
+        call_command('rebuild_aggregates', '--check', stdout=StringIO())
+
+    def test_generate_csv(self, tmpdir):
+        from reviews.models import Review, Title
+
+        first, second = tmpdir.mkdir('first'), tmpdir.mkdir('second')
+        output = _generate(output=str(first), **SIZES)
+        assert 'review.csv: создано 50 ' in output
+        _generate(output=str(second), **SIZES)
+        for path in first.listdir():
+            assert path.read() == second.join(path.basename).read(), (
+                'Проверьте, что одинаковый seed даёт одинаковые файлы'
+            )
+        assert first.join('review.csv').readlines()[0] == (
+            'id,title_id,text,author,score,pub_date\n'
+        )
+        call_command('import_csv', path=str(first), stdout=StringIO())
+        assert Title.objects.count() == SIZES['titles']
+        assert Review.objects.count() == SIZES['reviews']
+
+    def test_scale(self, tmpdir):
+        _generate(output=str(tmpdir), scale=0.01, reviews=10, comments=0)
+        assert len(tmpdir.join('titles.csv').readlines()) == 11
+        assert len(tmpdir.join('review.csv').readlines()) == 11
+        assert tmpdir.join('comments.csv').read() == ''
+
+    def test_too_many_reviews(self):
+        with pytest.raises(CommandError):
+            _generate(users=2, titles=3, reviews=7)
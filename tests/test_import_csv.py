@@ -0,0 +1,83 @@
+import csv
+import os
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from .conftest import root_dir
+
+DATA_DIR = os.path.join(root_dir, 'api_yamdb', 'static', 'data')
+
+
+def _rows(filename):
+    with open(os.path.join(DATA_DIR, filename), encoding='utf-8') as file:
+        return sum(1 for _ in csv.DictReader(file))
+
+
+def _import(**options):
+    stdout = StringIO()
+    call_command('import_csv', stdout=stdout, **options)
+    return stdout.getvalue()
+
+
+def _assert_loaded():
+    from reviews.models import Comment, Review, Title, User
+
+    assert User.objects.count() == _rows('users.csv')
+    assert Title.objects.count() == _rows('titles.csv')
+    assert Title.genre.through.objects.count() == _rows('genre_title.csv')
+    assert Review.objects.count() == _rows('review.csv')
+    assert Comment.objects.count() == _rows('comments.csv')
+    review = Review.objects.get(pk=1)
+    assert review.update_date == review.pub_date
+    title = Title.objects.get(pk=1)
+    assert title.reviews_count == Review.objects.filter(title=title).count()
+    assert title.rating is not None, (
+        'Проверьте, что после загрузки пересчитываются рейтинги'
+    )
+    call_command('rebuild_aggregates', '--check', stdout=StringIO())
+
+
+@pytest.mark.django_db
+class TestImportCsv:
+
+    def test_import(self):
+        from reviews.models import Category, User
+
+        output = _import(batch_size=7)
+        _assert_loaded()
+        assert f'reviews_review: загружено {_rows("review.csv")} ' in output
+        assert 'строк/с' in output
+        user = User.objects.get(username='bingobongo')
+        assert not user.has_usable_password()
+        category = Category.objects.create(name='Музыка', slug='songs')
+        assert category.pk > 3, (
+            'Проверьте, что после загрузки сбрасываются последовательности'
+        )
+
+    def test_rerun_requires_upsert(self):
+        _import()
+        with pytest.raises(CommandError, match='--upsert'):
+            _import()
+
+    def test_upsert(self):
+        from reviews.models import Review, Title
+
+        _import()
+        Review.objects.filter(pk=1).update(text='Изменено')
+        Title.objects.filter(pk=1).update(name='Изменено')
+        _import(upsert=True, batch_size=50)
+        _assert_loaded()
+        assert Review.objects.get(pk=1).text.startswith('Ставлю')
+        assert Title.objects.get(pk=1).name == 'Побег из Шоушенка'
+
+    def test_missing_file(self, tmp_path):
+        with pytest.raises(CommandError, match='users.csv'):
+            _import(path=str(tmp_path))
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parallel_import():
+    _import(jobs=3, batch_size=20)
+    _assert_loaded()
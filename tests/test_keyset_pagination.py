@@ -0,0 +1,94 @@
+import pytest
+
+
+@pytest.fixture
+def reviews(title, make_users):
+    from django.utils import timezone
+    from reviews.models import Review
+
+    reviews = [
+        Review.objects.create(title=title, author=author, text='Текст',
+                              score=5)
+        for author in make_users(12)
+    ]
+    # Несколько отзывов с одинаковой датой проверяют сортировку по id.
+    Review.objects.filter(pk__in=[r.pk for r in reviews[3:7]]).update(
+        pub_date=timezone.now())
+    return list(Review.objects.order_by('-pub_date', '-id'))
+
+
+def _walk(client, url, key='next'):
+    ids = []
+    while url:
+        data = client.get(url).json()
+        assert 'count' not in data, (
+            'Проверьте, что в режиме курсора количество не считается'
+        )
+        ids.extend(item['id'] for item in data['results'])
+        url = data[key]
+    return ids
+
+
+@pytest.mark.django_db
+class TestKeysetPagination:
+
+    def test_forward_and_backward(self, client, title, reviews):
+        url = f'/api/v1/titles/{title.id}/reviews/?cursor=&limit=5'
+        expected = [review.id for review in reviews]
+        assert _walk(client, url) == expected, (
+            'Проверьте, что курсор обходит отзывы по (-pub_date, -id)'
+        )
+        last_page = client.get(url).json()
+        while last_page['next']:
+            last_page = client.get(last_page['next']).json()
+        pages = [[item['id'] for item in last_page['results']]]
+        url = last_page['previous']
+        while url:
+            data = client.get(url).json()
+            pages.insert(0, [item['id'] for item in data['results']])
+            url = data['previous']
+        assert sum(pages, []) == expected, (
+            'Проверьте, что ссылка previous возвращает предыдущие страницы'
+        )
+
+    def test_stable_under_inserts(self, client, title, reviews, user):
+        from reviews.models import Review
+
+        first = client.get(
+            f'/api/v1/titles/{title.id}/reviews/?cursor=&limit=5').json()
+        Review.objects.create(title=title, author=user, text='Текст', score=1)
+        rest = _walk(client, first['next'])
+        assert [item['id'] for item in first['results']] + rest == [
+            review.id for review in reviews
+        ], 'Проверьте, что новые отзывы не сдвигают следующие страницы'
+
+    def test_no_count_query(self, client, title, reviews,
+                            django_assert_num_queries):
+        # Валидатор ETag и сама страница.
+        with django_assert_num_queries(2) as captured:
+            client.get(f'/api/v1/titles/{title.id}/reviews/?cursor=')
+        assert not any('COUNT(' in query['sql']
+                       for query in captured.captured_queries)
+
+    def test_comments(self, client, title, reviews, make_users):
+        from reviews.models import Comment
+
+        review = reviews[0]
+        for author in make_users(7, prefix='commentator'):
+            Comment.objects.create(review=review, author=author, text='Текст')
+        url = (f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/'
+               '?cursor=&limit=3')
+        assert _walk(client, url) == list(
+            review.comments.order_by('-pub_date', '-id').values_list(
+                'id', flat=True))
+
+    def test_limit_offset_still_works(self, client, title, reviews):
+        data = client.get(
+            f'/api/v1/titles/{title.id}/reviews/?limit=5&offset=5').json()
+        assert data['count'] == len(reviews)
+        assert len(data['results']) == 5
+
+    def test_invalid_cursor(self, client, title, reviews):
+        response = client.get(
+            f'/api/v1/titles/{title.id}/reviews/?cursor=garbage')
+        assert response.status_code == 404
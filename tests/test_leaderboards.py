@@ -0,0 +1,130 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+URL = '/api/v1/leaderboards/'
+
+
+def _review_all(title, users, scores):
+    from reviews.models import Review
+
+    for user, score in zip(users, scores):
+        Review.objects.create(title=title, author=user, text='Текст',
+                              score=score)
+
+
+def _ids(response):
+    assert response.status_code == 200
+    return [entry['title']['id'] for entry in response.json()['results']]
+
+
+@pytest.fixture
+def titles(category, genres):
+    from reviews.models import Category, Title
+
+    other = Category.objects.create(name='Книга', slug='book')
+    popular = Title.objects.create(name='Популярное', year=2000,
+                                   category=category)
+    niche = Title.objects.create(name='Нишевое', year=2001, category=other)
+    rare = Title.objects.create(name='Редкое', year=2002, category=category)
+    popular.genre.set(genres)
+    niche.genre.set(genres[:1])
+    return popular, niche, rare
+
+
+@pytest.mark.django_db
+class TestLeaderboards:
+
+    def test_top_bayesian_order(self, client, titles, make_users, settings):
+        popular, niche, rare = titles
+        settings.LEADERBOARD_MIN_REVIEWS = 2
+        users = make_users(10)
+        _review_all(popular, users, [9] * 10)
+        _review_all(niche, users, [10, 10, 3])
+        _review_all(rare, users, [10])
+        call_command('refresh_leaderboards')
+        assert _ids(client.get(f'{URL}top/')) == [popular.id, niche.id], (
+            'Проверьте, что средняя оценка сглаживается числом отзывов, '
+            'а произведения с малым числом отзывов не попадают в рейтинг'
+        )
+
+    def test_scoped_boards(self, client, titles, make_users, settings):
+        popular, niche, rare = titles
+        settings.LEADERBOARD_MIN_REVIEWS = 1
+        users = make_users(2)
+        for title in titles:
+            _review_all(title, users, [8, 8])
+        call_command('refresh_leaderboards')
+        assert _ids(client.get(f'{URL}top/?category=book')) == [niche.id]
+        assert _ids(client.get(f'{URL}top/?genre=comedy')) == [popular.id]
+        assert client.get(f'{URL}top/?genre=unknown').status_code == 404
+        assert client.get(
+            f'{URL}top/?genre=drama&category=book').status_code == 400
+
+    def test_trending_decay(self, client, titles, make_users):
+        from reviews.models import Review
+
+        popular, niche, rare = titles
+        users = make_users(3)
+        _review_all(popular, users, [5, 5, 5])
+        _review_all(niche, users[:2], [5, 5])
+        _review_all(rare, users[:1], [5])
+        Review.objects.filter(title=popular).update(
+            pub_date=timezone.now() - timedelta(days=21))
+        Review.objects.filter(title=rare).update(
+            pub_date=timezone.now() - timedelta(days=90))
+        call_command('refresh_leaderboards')
+        response = client.get(f'{URL}trending/')
+        assert _ids(response) == [niche.id, popular.id], (
+            'Проверьте, что старые отзывы весят меньше, '
+            'а отзывы вне окна не учитываются'
+        )
+        scores = [entry['score'] for entry in response.json()['results']]
+        assert scores[0] == pytest.approx(2, rel=1e-3)
+        assert scores[1] == pytest.approx(3 / 8, rel=1e-3)
+
+    def test_keyset_pages(self, client, category, make_users, settings,
+                          django_assert_max_num_queries):
+        from reviews.models import Title
+
+        settings.LEADERBOARD_MIN_REVIEWS = 1
+        users = make_users(1)
+        for score in range(1, 6):
+            title = Title.objects.create(name=f'Произведение {score}',
+                                         year=2000, category=category)
+            _review_all(title, users, [score])
+        call_command('refresh_leaderboards')
+        ranks = []
+        url = f'{URL}top/?limit=2'
+        while url:
+            with django_assert_max_num_queries(2):
+                data = client.get(url).json()
+            ranks += [entry['rank'] for entry in data['results']]
+            assert 'count' not in data
+            url = data['next']
+        assert ranks == [1, 2, 3, 4, 5], (
+            'Проверьте, что рейтинг выдаётся страницами по месту'
+        )
+
+    def test_refresh_replaces_entries(self, title, make_users, capsys,
+                                      settings):
+        from reviews.models import LeaderboardEntry
+
+        settings.LEADERBOARD_MIN_REVIEWS = 1
+        _review_all(title, make_users(1), [7])
+        call_command('refresh_leaderboards')
+        call_command('refresh_leaderboards')
+        assert capsys.readouterr().out.count(
+            'Перестроены рейтинги, мест: 8') == 2
+        scopes = [f'category:{title.category_id}'] + [
+            f'genre:{genre.pk}' for genre in title.genre.all()]
+        expected = sorted(
+            board
+            for kind in ('top', 'trending')
+            for board in [kind] + [f'{kind}:{scope}' for scope in scopes])
+        assert sorted(LeaderboardEntry.objects.values_list(
+            'board', flat=True)) == expected, (
+            'Проверьте, что рейтинги перестраиваются целиком, без дублей'
+        )
@@ -0,0 +1,123 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+@pytest.fixture
+def make_titles(category, genres):
+    from reviews.models import Title
+
+    def make(count, year=2000):
+        titles = []
+        for number in range(count):
+            title = Title.objects.create(
+                name=f'Произведение {number}', year=year, category=category)
+            title.genre.set(genres)
+            titles.append(title)
+        return titles
+    return make
+
+
+def _get(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200, response.content
+    return response.json(), [query['sql'] for query in
+                             context.captured_queries]
+
+
+def _counts(queries):
+    return [sql for sql in queries if 'COUNT(' in sql]
+
+
+@pytest.mark.django_db
+class TestListCount:
+
+    def test_count_is_cached(self, user_client, make_titles, genres):
+        make_titles(7)
+        slug = genres[0].slug
+        data, queries = _get(user_client,
+                             f'/api/v1/titles/?year=2000&genre={slug}')
+        assert data['count'] == 7 and len(_counts(queries)) == 1
+        data, queries = _get(
+            user_client, f'/api/v1/titles/?genre={slug}&page=2&year=2000')
+        assert data['count'] == 7 and len(data['results']) == 2
+        assert data['next'] is None
+        assert len(queries) == 3 and not _counts(queries), (
+            'Проверьте, что количество для тех же фильтров берётся из кэша'
+        )
+        data, queries = _get(user_client, '/api/v1/titles/?year=1999')
+        assert data['count'] == 0 and len(_counts(queries)) == 1, (
+            'Проверьте, что другие фильтры считаются отдельно'
+        )
+
+    def test_write_changes_count(self, user_client, make_titles):
+        titles = make_titles(3)
+        assert _get(user_client, '/api/v1/titles/')[0]['count'] == 3
+        titles[0].delete()
+        assert _get(user_client, '/api/v1/titles/')[0]['count'] == 2, (
+            'Проверьте, что удаление произведения меняет количество'
+        )
+
+    def test_without_count(self, client, user_client, make_titles):
+        make_titles(11)
+        user_client.get('/api/v1/users/me/')
+        data, queries = _get(user_client, '/api/v1/titles/?count=false')
+        assert 'count' not in data, (
+            'Проверьте, что count=false убирает количество из ответа'
+        )
+        assert len(queries) == 3 and not _counts(queries), (
+            'Проверьте, что с count=false количество не считается'
+        )
+        assert data['previous'] is None
+        assert data['next'].endswith('?count=false&page=2')
+        data, _ = _get(user_client, '/api/v1/titles/?count=false&page=3')
+        assert len(data['results']) == 1 and data['next'] is None
+        assert data['previous'].endswith('?count=false&page=2')
+        assert client.get(
+            '/api/v1/titles/?count=false&page=4').status_code == 404
+        assert client.get(
+            '/api/v1/titles/?count=false&page=0').status_code == 404
+
+    def test_facets_without_count(self, client, make_titles):
+        make_titles(2)
+        data = client.get('/api/v1/titles/?count=false&facets=year').json()
+        assert 'count' not in data
+        assert data['facets']['year'] == [{'year': 2000, 'count': 2}]
+
+
+@pytest.mark.django_db
+class TestPlannerEstimate:
+
+    @pytest.fixture(autouse=True)
+    def postgres_only(self):
+        if connection.vendor != 'postgresql':
+            pytest.skip('Оценка планировщика есть только в PostgreSQL')
+
+    def test_unfiltered_list_uses_estimate(self, user_client, make_titles,
+                                           settings):
+        from api.counts import planner_estimate
+        from reviews.models import Title
+
+        settings.COUNT_ESTIMATE_THRESHOLD = 0
+        make_titles(6)
+        user_client.get('/api/v1/users/me/')
+        data, queries = _get(user_client, '/api/v1/titles/')
+        assert not _counts(queries), (
+            'Проверьте, что большой список без фильтров не считается COUNT'
+        )
+        assert len(queries) == 4
+        assert len([sql for sql in queries if sql.startswith('EXPLAIN')]) == 1
+        assert data['count'] == planner_estimate(Title.objects.all())
+        assert len(data['results']) == 5 and data['next'], (
+            'Проверьте, что с оценкой страницы определяются по лишней строке'
+        )
+        data, queries = _get(user_client, '/api/v1/titles/?year=2000')
+        assert data['count'] == 6 and len(_counts(queries)) == 1, (
+            'Проверьте, что отфильтрованный список считается точно'
+        )
+
+    def test_small_list_is_counted(self, user_client, make_titles):
+        make_titles(2)
+        data, queries = _get(user_client, '/api/v1/titles/')
+        assert data['count'] == 2 and len(_counts(queries)) == 1
@@ -0,0 +1,117 @@
+import multiprocessing
+import re
+
+import pytest
+
+URL = '/api/v1/metrics/'
+
+
+def _value(text, line):
+    match = re.search(rf'^{re.escape(line)} (\S+)$', text, re.M)
+    assert match, f'Проверьте, что метрики содержат строку {line}'
+    return float(match.group(1))
+
+
+def _worker(directory):
+    from api import metrics
+    from django.conf import settings
+
+    settings.METRICS_DIR = directory
+    metrics.reset()
+    metrics.inc('yamdb_cache_requests_total', 5, cache='catalog',
+                result='hit')
+    metrics.observe('yamdb_http_request_duration_seconds', 0.2,
+                    view='TitlesViewSet', action='list', status=200)
+    metrics.flush(force=True)
+
+
+@pytest.mark.django_db
+class TestMetrics:
+
+    def test_access(self, client, user_client, admin_client):
+        assert client.get(URL).status_code == 401
+        assert user_client.get(URL).status_code == 403
+        response = admin_client.get(URL)
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain')
+
+    def test_requests_and_caches(self, client, admin_client, title):
+        for _ in range(2):
+            assert client.get('/api/v1/titles/').status_code == 200
+        admin_client.get(f'/api/v1/titles/{title.id}/')
+        text = admin_client.get(URL).content.decode()
+        labels = '{action="list",status="200",view="TitlesViewSet"}'
+        assert _value(
+            text, f'yamdb_http_request_duration_seconds_count{labels}') == 2
+        assert _value(text, 'yamdb_http_request_queries_bucket'
+                            '{action="list",status="200",'
+                            'view="TitlesViewSet",le="+Inf"}') == 2
+        assert _value(
+            text, 'yamdb_http_request_duration_seconds_count'
+                  '{action="retrieve",status="200",view="TitlesViewSet"}'
+        ) == 1
+        assert _value(text, 'yamdb_cache_requests_total'
+                            '{cache="catalog",result="hit"}') == 1
+        assert _value(text, 'yamdb_cache_requests_total'
+                            '{cache="user",result="miss"}') >= 1
+        assert '# TYPE yamdb_http_request_duration_seconds histogram' in text
+
+    def test_outbox_depth(self, admin_client):
+        from reviews.outbox import MAX_ATTEMPTS, enqueue_email
+
+        enqueue_email('Тема', 'Текст', 'a@yamdb.fake')
+        failed = enqueue_email('Тема', 'Текст', 'b@yamdb.fake')
+        failed.attempts = MAX_ATTEMPTS
+        failed.save()
+        text = admin_client.get(URL).content.decode()
+        assert _value(text, 'yamdb_email_outbox_pending') == 1
+        assert _value(text, 'yamdb_email_outbox_failed') == 1
+
+    def _run_workers(self, tmpdir):
+        pids = []
+        for _ in range(2):
+            process = multiprocessing.get_context('fork').Process(
+                target=_worker, args=(str(tmpdir),))
+            process.start()
+            process.join()
+            assert process.exitcode == 0
+            pids.append(process.pid)
+        return pids
+
+    def test_workers_aggregated(self, admin_client, settings, tmpdir):
+        settings.METRICS_DIR = str(tmpdir)
+        self._run_workers(tmpdir)
+        assert len(tmpdir.listdir()) == 2, (
+            'Проверьте, что каждый процесс пишет свой файл метрик'
+        )
+        text = admin_client.get(URL).content.decode()
+        assert _value(text, 'yamdb_cache_requests_total'
+                            '{cache="catalog",result="hit"}') == 10
+        assert _value(
+            text, 'yamdb_http_request_duration_seconds_bucket'
+                  '{action="list",status="200",view="TitlesViewSet",'
+                  'le="0.25"}') == 2
+
+    def test_dead_workers_archived(self, admin_client, settings, tmpdir):
+        from api import metrics
+
+        settings.METRICS_DIR = str(tmpdir)
+        first, second = self._run_workers(tmpdir)
+        metrics.mark_process_dead(first)
+        names = {path.basename for path in tmpdir.listdir()}
+        assert names == {'metrics_archive.json', f'metrics_{second}.json'}, (
+            'Проверьте, что файл завершившегося воркера удаляется'
+        )
+        text = admin_client.get(URL).content.decode()
+        assert _value(text, 'yamdb_cache_requests_total'
+                            '{cache="catalog",result="hit"}') == 10, (
+            'Проверьте, что метрики завершившегося воркера сохраняются'
+        )
+        metrics.mark_process_dead(second)
+        assert [path.basename for path in tmpdir.listdir()] == [
+            'metrics_archive.json']
+        text = admin_client.get(URL).content.decode()
+        assert _value(
+            text, 'yamdb_http_request_duration_seconds_bucket'
+                  '{action="list",status="200",view="TitlesViewSet",'
+                  'le="0.25"}') == 2
@@ -0,0 +1,15 @@
+import pytest
+from django.core.management import call_command
+
+
+@pytest.mark.django_db
+class TestMigrations:
+
+    def test_models_match_migrations(self):
+        try:
+            call_command('makemigrations', '--check', '--dry-run',
+                         verbosity=0)
+        except SystemExit:
+            assert False, (
+                'Проверьте, что для всех изменений моделей есть миграции'
+            )
@@ -0,0 +1,199 @@
+import re
+from contextlib import contextmanager
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# Первым идёт запрос валидатора для ETag/Last-Modified, затем количество,
+# пока его нет в кэше: без фильтров в PostgreSQL сначала оценка
+# планировщика, а для небольшой таблицы ещё и COUNT.
+TITLES_LIST_QUERIES = 5
+TITLE_DETAIL_QUERIES = 3
+
+
+@pytest.fixture
+def make_titles(category, genres):
+    from reviews.models import Title
+
+    def make(count):
+        titles = []
+        for i in range(count):
+            title = Title.objects.create(
+                name=f'Произведение {i}', year=2000, category=category)
+            title.genre.set(genres)
+            titles.append(title)
+        return titles
+    return make
+
+
+@pytest.mark.django_db
+class TestTitlesQueryCount:
+
+    @pytest.mark.parametrize('titles_count', [1, 3, 5, 20])
+    @pytest.mark.parametrize('query', [
+        '', '?genre=drama', '?category=movie', '?year=2000', '?ordering=-rating'
+    ])
+    def test_titles_list(self, client, make_titles,
+                         django_assert_max_num_queries, titles_count, query):
+        make_titles(titles_count)
+        with django_assert_max_num_queries(TITLES_LIST_QUERIES):
+            response = client.get(f'/api/v1/titles/{query}')
+        assert response.status_code == 200
+        assert response.json()['results'], (
+            'Проверьте, что список произведений не пуст'
+        )
+
+    @pytest.mark.parametrize('titles_count', [1, 20])
+    def test_titles_list_pages(self, client, make_titles,
+                               django_assert_max_num_queries, titles_count):
+        make_titles(titles_count)
+        with django_assert_max_num_queries(TITLES_LIST_QUERIES):
+            response = client.get('/api/v1/titles/?page=2')
+        assert response.status_code == (200 if titles_count > 5 else 404)
+
+    def test_title_detail(self, client, make_titles,
+                          django_assert_max_num_queries):
+        title, = make_titles(1)
+        with django_assert_max_num_queries(TITLE_DETAIL_QUERIES):
+            response = client.get(f'/api/v1/titles/{title.id}/')
+        assert response.status_code == 200
+        assert len(response.json()['genre']) == 2
+
+
+REVIEWS_LIST_QUERIES = 3
+COMMENTS_LIST_QUERIES = 3
+# Аутентификация, произведение вместе с проверкой повторного отзыва,
+# вставка отзыва и обновление рейтинга.
+REVIEW_CREATE_QUERIES = 4
+# Начало транзакции и точки сохранения не считаются: SQLite записывает
+# BEGIN в журнал запросов, а PostgreSQL нет.
+TRANSACTION_CONTROL = re.compile(
+    r'\s*(BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE)\b', re.IGNORECASE)
+# Аутентификация, отзыв с проверкой произведения, вставка комментария
+# и обновление счётчика комментариев отзыва.
+COMMENT_CREATE_QUERIES = 4
+
+
+@contextmanager
+def assert_max_statements(budget):
+    with CaptureQueriesContext(connection) as context:
+        yield context
+    statements = [query['sql'] for query in context.captured_queries
+                  if not TRANSACTION_CONTROL.match(query['sql'])]
+    assert len(statements) <= budget, (
+        f'Ожидалось не больше {budget} запросов, выполнено '
+        f'{len(statements)}:\n' + '\n'.join(statements)
+    )
+
+
+@pytest.fixture
+def make_reviews(title, make_users):
+    from reviews.models import Comment, Review
+
+    def make(count):
+        reviews = []
+        for author in make_users(count):
+            review = Review.objects.create(
+                title=title, author=author, text='Текст', score=5)
+            Comment.objects.create(review=review, author=author, text='Текст')
+            reviews.append(review)
+        return reviews
+    return make
+
+
+@pytest.mark.django_db
+class TestReviewsQueryCount:
+
+    @pytest.mark.parametrize('reviews_count', [1, 5, 20])
+    def test_reviews_list(self, client, title, make_reviews,
+                          django_assert_max_num_queries, reviews_count):
+        make_reviews(reviews_count)
+        with django_assert_max_num_queries(REVIEWS_LIST_QUERIES):
+            response = client.get(f'/api/v1/titles/{title.id}/reviews/')
+        assert response.status_code == 200
+        assert response.json()['count'] == reviews_count
+
+    @pytest.mark.parametrize('comments_count', [1, 5, 20])
+    def test_comments_list(self, client, title, make_reviews, make_users,
+                           django_assert_max_num_queries, comments_count):
+        from reviews.models import Comment
+
+        review, = make_reviews(1)
+        for author in make_users(comments_count - 1, prefix='commentator'):
+            Comment.objects.create(review=review, author=author, text='Текст')
+        with django_assert_max_num_queries(COMMENTS_LIST_QUERIES):
+            response = client.get(
+                f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/')
+        assert response.status_code == 200
+        assert response.json()['count'] == comments_count
+
+    @pytest.mark.django_db(transaction=True)
+    def test_review_create(self, title, user_client):
+        with assert_max_statements(REVIEW_CREATE_QUERIES):
+            response = user_client.post(
+                f'/api/v1/titles/{title.id}/reviews/',
+                data={'text': 'Текст', 'score': 7})
+        assert response.status_code == 201
+        assert response.json()['author'] == 'TestUser'
+        response = user_client.post(
+            f'/api/v1/titles/{title.id}/reviews/',
+            data={'text': 'Текст', 'score': 7})
+        assert response.status_code == 400, (
+            'Проверьте, что нельзя оставить второй отзыв на произведение'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_comment_create(self, title, make_reviews, user_client):
+        review, = make_reviews(1)
+        with assert_max_statements(COMMENT_CREATE_QUERIES):
+            response = user_client.post(
+                f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/',
+                data={'text': 'Текст'})
+        assert response.status_code == 201
+
+
+@pytest.mark.django_db
+class TestNestedRoutes:
+
+    def test_unknown_parent(self, client, title, make_reviews):
+        review, = make_reviews(1)
+        assert client.get(
+            f'/api/v1/titles/{title.id + 1}/reviews/').status_code == 404
+        assert client.get(
+            f'/api/v1/titles/{title.id}/reviews/{review.id + 1}/comments/'
+        ).status_code == 404
+
+    def test_comments_of_review_from_other_title(self, client, user_client,
+                                                 title, make_reviews):
+        from reviews.models import Title
+
+        review, = make_reviews(1)
+        other = Title.objects.create(name='Другое', year=2000)
+        url = f'/api/v1/titles/{other.id}/reviews/{review.id}/comments/'
+        assert client.get(url).status_code == 404, (
+            'Проверьте, что комментарии доступны только по произведению '
+            'своего отзыва'
+        )
+        assert user_client.post(
+            url, data={'text': 'Текст'}).status_code == 404
+        comment = review.comments.get()
+        assert client.get(f'{url}{comment.id}/').status_code == 404
+
+    def test_empty_lists(self, client, title, make_reviews):
+        from reviews.models import Comment
+
+        assert client.get(
+            f'/api/v1/titles/{title.id}/reviews/').json()['count'] == 0
+        review, = make_reviews(1)
+        Comment.objects.all().delete()
+        assert client.get(
+            f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/'
+        ).json()['count'] == 0
+
+    def test_parent_must_be_configured(self):
+        from api.mixins import NestedParentMixin
+        from django.core.exceptions import ImproperlyConfigured
+
+        with pytest.raises(ImproperlyConfigured):
+            type('ChildViewSet', (NestedParentMixin,), {})
@@ -0,0 +1,94 @@
+import re
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def _explain(sql):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # На маленьких тестовых таблицах планировщик выбрал бы полное
+            # чтение и сортировку; проверяется, что индекс применим и для
+            # фильтра, и для порядка строк.
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('SET LOCAL enable_sort = off')
+            cursor.execute(f'EXPLAIN {sql}')
+        else:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return '\n'.join(' '.join(map(str, row)) for row in cursor.fetchall())
+
+
+def _plan(client, url, table, marker='ORDER BY'):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    queries = [query['sql'] for query in context.captured_queries
+               if re.search(rf'FROM "?{table}"?\s', query['sql'])
+               and marker in query['sql']]
+    assert queries, f'Не найден запрос к {table} для {url}'
+    return _explain(queries[-1])
+
+
+def _full_scan(plan, table):
+    if connection.vendor == 'postgresql':
+        return f'Seq Scan on {table}' in plan
+    return re.search(rf'SCAN (TABLE )?{table}(?! USING)', plan) is not None
+
+
+@pytest.fixture
+def catalog(title, category, make_users):
+    from reviews.models import Comment, Review, Title
+
+    for index in range(3):
+        Title.objects.create(name=f'Фильм {index}', year=2000 + index,
+                             category=category)
+    for user in make_users(3):
+        review = Review.objects.create(title=title, author=user,
+                                       text='Текст', score=5)
+        Comment.objects.create(review=review, author=user, text='Текст')
+    return title
+
+
+@pytest.mark.django_db
+class TestQueryPlans:
+
+    @pytest.mark.parametrize('url, table, index', [
+        ('/api/v1/titles/', 'reviews_title', 'title_name_idx'),
+        ('/api/v1/titles/?year=2001', 'reviews_title',
+         'title_year_name_idx'),
+        ('/api/v1/titles/?category=movie', 'reviews_title', None),
+        ('/api/v1/titles/{title}/reviews/', 'reviews_review',
+         'review_title_pub_date_idx'),
+        ('/api/v1/titles/{title}/reviews/?cursor=', 'reviews_review',
+         'review_title_pub_date_idx'),
+        ('/api/v1/titles/{title}/reviews/{review}/comments/',
+         'reviews_comment', 'comment_review_pub_date_idx'),
+    ])
+    def test_list_uses_index(self, admin_client, catalog, url, table, index):
+        review = catalog.reviews.first()
+        plan = _plan(admin_client,
+                     url.format(title=catalog.id, review=review.id), table)
+        assert not _full_scan(plan, table), (
+            f'Проверьте, что запрос к {table} не читает всю таблицу:\n{plan}'
+        )
+        if index:
+            assert index in plan, (
+                f'Проверьте, что запрос использует индекс {index}:\n{plan}'
+            )
+
+    @pytest.mark.parametrize('url, table, marker, index', [
+        ('/api/v1/titles/{title}/reviews/', 'reviews_review',
+         '"update_date" DESC', 'review_title_update_date_idx'),
+        ('/api/v1/titles/{title}/reviews/{review}/comments/',
+         'reviews_comment', 'MAX(', 'comment_review_update_idx'),
+    ])
+    def test_validator_uses_index(self, admin_client, catalog, url, table,
+                                  marker, index):
+        review = catalog.reviews.first()
+        plan = _plan(admin_client,
+                     url.format(title=catalog.id, review=review.id), table,
+                     marker=marker)
+        assert index in plan, (
+            f'Проверьте, что ETag считается по индексу {index}:\n{plan}'
+        )
@@ -0,0 +1,147 @@
+import logging
+import runpy
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.db import OperationalError, connections
+from django.test.utils import CaptureQueriesContext
+
+ALIAS = 'replica'
+
+
+def _add_replica(settings_dict):
+    connections.databases[ALIAS] = settings_dict
+    return ALIAS
+
+
+def _remove_replica():
+    connections[ALIAS].close()
+    del connections.databases[ALIAS]
+    delattr(connections._connections, ALIAS)
+
+
+@pytest.fixture
+def replica(transactional_db, settings):
+    # Вторая база - зеркало тестовой, как при TEST MIRROR: отдельное
+    # соединение к той же базе, поэтому данные видны обоим.
+    from api.replicas import reset_health
+
+    settings.REPLICA_DATABASES = [
+        _add_replica(dict(connections['default'].settings_dict))]
+    reset_health()
+    yield connections[ALIAS]
+    _remove_replica()
+    reset_health()
+
+
+@pytest.fixture
+def broken_replica(transactional_db, settings, tmpdir):
+    from api.replicas import reset_health
+
+    settings_dict = dict(connections['default'].settings_dict)
+    if connections['default'].vendor == 'sqlite':
+        settings_dict['NAME'] = str(tmpdir.join('missing', 'replica.db'))
+    else:
+        settings_dict['PORT'] = '1'
+    settings.REPLICA_DATABASES = [_add_replica(settings_dict)]
+    reset_health()
+    yield connections[ALIAS]
+    _remove_replica()
+    reset_health()
+
+
+def _queries(client_method, url, **kwargs):
+    with CaptureQueriesContext(connections['default']) as primary:
+        with CaptureQueriesContext(connections[ALIAS]) as secondary:
+            response = client_method(url, **kwargs)
+    return response, len(primary), len(secondary)
+
+
+class TestReplicaRouting:
+
+    def test_reads_go_to_replica(self, client, replica, title):
+        response, primary, secondary = _queries(client.get, '/api/v1/titles/')
+        assert response.status_code == 200
+        assert secondary and not primary, (
+            'Проверьте, что безопасные запросы читают с реплики'
+        )
+
+    def test_read_your_writes(self, user_client, client, replica, title):
+        response, primary, secondary = _queries(
+            user_client.post, f'/api/v1/titles/{title.id}/reviews/',
+            data={'text': 'Отзыв', 'score': 7})
+        assert response.status_code == 201
+        assert primary and not secondary, (
+            'Проверьте, что запись идёт в основную базу'
+        )
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        response, primary, secondary = _queries(user_client.get, url)
+        assert response.json()['count'] == 1
+        assert primary and not secondary, (
+            'Проверьте, что после записи клиент читает с основной базы'
+        )
+        _, primary, secondary = _queries(client.get, url,
+                                         REMOTE_ADDR='10.0.0.2')
+        assert secondary and not primary, (
+            'Проверьте, что закрепление действует только на автора записи'
+        )
+
+    def test_pin_expires(self, user_client, replica, title, settings):
+        settings.REPLICA_PIN_SECONDS = 0
+        user_client.post(f'/api/v1/titles/{title.id}/reviews/',
+                         data={'text': 'Отзыв', 'score': 7})
+        _, primary, secondary = _queries(user_client.get, '/api/v1/titles/')
+        assert secondary and not primary
+
+    def test_unhealthy_replica(self, client, broken_replica, title, caplog):
+        with caplog.at_level(logging.WARNING, logger='api.replicas'):
+            response = client.get('/api/v1/titles/')
+            assert response.status_code == 200
+            assert client.get('/api/v1/titles/').status_code == 200
+        assert len([record for record in caplog.records
+                    if 'Реплика replica недоступна' in record.getMessage()
+                    ]) == 1, (
+            'Проверьте, что недоступная реплика пропускается '
+            'до следующей проверки'
+        )
+
+    def test_failed_read_retried_on_primary(self, client, replica, title,
+                                            caplog):
+        def fail(execute, sql, params, many, context):
+            raise OperationalError('server closed the connection')
+
+        with caplog.at_level(logging.WARNING, logger='api.replicas'):
+            with CaptureQueriesContext(connections['default']) as primary:
+                with replica.execute_wrapper(fail):
+                    response = client.get('/api/v1/titles/')
+        assert response.status_code == 200
+        assert response.json()['count'] == 1 and len(primary), (
+            'Проверьте, что запрос, упавший на реплике, выполняется '
+            'на основной базе'
+        )
+        assert 'Реплика replica недоступна' in caplog.text
+        _, primary, secondary = _queries(
+            client.get, f'/api/v1/titles/{title.id}/reviews/')
+        assert primary and not secondary, (
+            'Проверьте, что отказавшая реплика пропускается '
+            'до следующей проверки'
+        )
+
+    def test_outside_requests_use_primary(self, replica, title):
+        from reviews.models import Title
+
+        assert Title.objects.all()._db is None
+        assert Title.objects.get(pk=title.pk)._state.db == 'default'
+
+
+def test_replica_requires_shared_cache(monkeypatch):
+    from api_yamdb import settings
+
+    monkeypatch.setenv('DB_REPLICA_NAME', 'replica')
+    monkeypatch.delenv('CACHE_BACKEND', raising=False)
+    with pytest.raises(ImproperlyConfigured):
+        runpy.run_path(settings.__file__)
+    monkeypatch.setenv('CACHE_BACKEND',
+                       'django.core.cache.backends.filebased.FileBasedCache')
+    assert runpy.run_path(settings.__file__)['REPLICA_DATABASES'] == [
+        'replica']
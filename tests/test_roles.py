@@ -0,0 +1,21 @@
+import pytest
+
+
+@pytest.mark.django_db
+class TestRoles:
+
+    @pytest.mark.parametrize('method, url, data, status', [
+        ('get', '/api/v1/users/', None, 200),
+        ('post', '/api/v1/categories/', {'name': 'Книга', 'slug': 'book'},
+         201),
+        ('post', '/api/v1/genres/', {'name': 'Роман', 'slug': 'novel'}, 201),
+        ('get', '/api/v1/export/titles/', None, 200),
+    ])
+    def test_admin_only(self, user_client, moderator_client, method, url,
+                        data, status):
+        assert getattr(user_client, method)(url, data=data).status_code == (
+            403), 'Проверьте, что обычному пользователю адрес недоступен'
+        assert getattr(moderator_client, method)(
+            url, data=data).status_code == status, (
+            'Проверьте, что модератор проходит проверки администратора'
+        )
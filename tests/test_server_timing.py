@@ -0,0 +1,77 @@
+import logging
+import re
+
+import pytest
+
+LOGGER = 'api.middleware'
+
+
+def _timings(response):
+    assert 'Server-Timing' in response, (
+        'Проверьте, что ответ содержит заголовок Server-Timing'
+    )
+    return {
+        name: (float(duration), description)
+        for name, duration, description in re.findall(
+            r'(\w+);dur=([\d.]+)(?:;desc="([^"]*)")?',
+            response['Server-Timing'])
+    }
+
+
+@pytest.mark.django_db
+class TestServerTiming:
+
+    def test_header(self, client, title, django_assert_max_num_queries):
+        # Валидатор, количество, страница и жанры; точное число запросов
+        # зависит от базы, поэтому описание сверяется с фактически
+        # выполненными.
+        with django_assert_max_num_queries(5) as context:
+            response = client.get('/api/v1/titles/')
+        assert response.status_code == 200
+        timings = _timings(response)
+        assert set(timings) == {'db', 'serializer', 'view', 'total'}
+        assert timings['db'][1] == f'{len(context.captured_queries)} queries'
+        assert timings['serializer'][0] > 0, (
+            'Проверьте, что время сериализации учитывается'
+        )
+        assert timings['total'][0] >= timings['db'][0]
+
+    def test_disabled(self, client, title, settings):
+        settings.SERVER_TIMING = False
+        response = client.get('/api/v1/titles/')
+        assert 'Server-Timing' not in response
+
+    def test_slow_request_logged(self, client, title, settings, caplog):
+        settings.SLOW_REQUEST_MS = 0
+        with caplog.at_level(logging.WARNING, logger=LOGGER):
+            client.get('/api/v1/titles/')
+        messages = [record.getMessage() for record in caplog.records]
+        assert any('Медленный запрос GET /api/v1/titles/ (title-list'
+                   in message and 'SELECT' in message
+                   for message in messages), (
+            'Проверьте, что медленный запрос пишется в журнал '
+            'с самым долгим SQL'
+        )
+
+    def test_repeated_queries_logged(self, client, title, settings, caplog):
+        settings.REPEATED_QUERY_THRESHOLD = 1
+        with caplog.at_level(logging.WARNING, logger=LOGGER):
+            client.get('/api/v1/titles/')
+        assert any('Повторяющийся SQL в title-list' in record.getMessage()
+                   for record in caplog.records)
+
+    def test_titles_list_without_repeats(self, client, make_users, title,
+                                         caplog):
+        from reviews.models import Review
+
+        for user in make_users(5):
+            Review.objects.create(title=title, author=user, text='Текст',
+                                  score=5)
+        with caplog.at_level(logging.WARNING, logger=LOGGER):
+            for url in ('/api/v1/titles/',
+                        f'/api/v1/titles/{title.id}/reviews/'):
+                client.get(url)
+        assert not any('Повторяющийся SQL' in record.getMessage()
+                       for record in caplog.records), (
+            'Проверьте, что списки не делают запрос на каждый объект'
+        )
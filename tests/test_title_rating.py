@@ -0,0 +1,153 @@
+import pytest
+from django.core.management import CommandError, call_command
+
+
+def _refresh(title):
+    title.refresh_from_db()
+    return title.reviews_count, title.score_sum, title.rating
+
+
+@pytest.mark.django_db
+class TestTitleRating:
+
+    def test_rating_follows_review_changes(self, title, make_users):
+        from reviews.models import Review
+
+        first, second = make_users(2)
+        assert _refresh(title) == (0, 0, None), (
+            'Проверьте, что у произведения без отзывов нет рейтинга'
+        )
+        review = Review.objects.create(
+            title=title, author=first, text='Текст', score=10)
+        Review.objects.create(title=title, author=second, text='Текст', score=5)
+        assert _refresh(title) == (2, 15, 7.5), (
+            'Проверьте, что рейтинг пересчитывается при создании отзыва'
+        )
+
+        review = Review.objects.get(pk=review.pk)
+        review.score = 1
+        review.save()
+        assert _refresh(title) == (2, 6, 3.0), (
+            'Проверьте, что рейтинг пересчитывается при изменении оценки'
+        )
+
+        review.delete()
+        assert _refresh(title) == (1, 5, 5.0), (
+            'Проверьте, что рейтинг пересчитывается при удалении отзыва'
+        )
+
+    def test_cascade_delete_of_author(self, title, make_users):
+        from reviews.models import Review
+
+        first, second = make_users(2)
+        Review.objects.create(title=title, author=first, text='Текст', score=2)
+        Review.objects.create(title=title, author=second, text='Текст', score=8)
+        first.delete()
+        assert _refresh(title) == (1, 8, 8.0), (
+            'Проверьте, что рейтинг пересчитывается при удалении автора отзыва'
+        )
+        second.delete()
+        assert _refresh(title) == (0, 0, None)
+
+    def test_title_save_keeps_aggregates(self, title, user):
+        from reviews.models import Review, Title
+
+        stale = Title.objects.get(pk=title.pk)
+        Review.objects.create(title=title, author=user, text='Текст', score=9)
+        stale.name = 'Новое название'
+        stale.save()
+        assert _refresh(title) == (1, 9, 9.0), (
+            'Проверьте, что сохранение произведения не затирает его рейтинг'
+        )
+
+    def test_api_returns_stored_rating(self, client, title, user_client):
+        response = user_client.post(
+            f'/api/v1/titles/{title.id}/reviews/',
+            data={'text': 'Текст', 'score': 7}
+        )
+        assert response.status_code == 201
+        response = client.get(f'/api/v1/titles/{title.id}/')
+        assert response.json()['rating'] == 7
+
+    def test_rebuild_command(self, title, user):
+        from reviews.models import Review, Title
+
+        Review.objects.create(title=title, author=user, text='Текст', score=4)
+        Title.objects.filter(pk=title.pk).update(
+            reviews_count=0, score_sum=0, rating=None)
+        with pytest.raises(CommandError):
+            call_command('rebuild_aggregates', '--check')
+        call_command('rebuild_aggregates')
+        assert _refresh(title) == (1, 4, 4.0)
+        call_command('rebuild_aggregates', '--check')
+
+
+def _distribution(title):
+    from reviews.models import SCORE_COUNT_FIELDS
+
+    title.refresh_from_db()
+    return {score: getattr(title, name)
+            for score, name in enumerate(SCORE_COUNT_FIELDS, start=1)
+            if getattr(title, name)}
+
+
+@pytest.mark.django_db
+class TestScoreDistribution:
+
+    def test_counters_follow_review_changes(self, title, make_users):
+        from reviews.models import Review
+
+        first, second, third = make_users(3)
+        review = Review.objects.create(
+            title=title, author=first, text='Текст', score=10)
+        Review.objects.create(title=title, author=second, text='Текст',
+                              score=10)
+        Review.objects.create(title=title, author=third, text='Текст', score=3)
+        assert _distribution(title) == {10: 2, 3: 1}, (
+            'Проверьте, что распределение оценок растёт при создании отзыва'
+        )
+        review = Review.objects.get(pk=review.pk)
+        review.score = 3
+        review.save()
+        assert _distribution(title) == {10: 1, 3: 2}, (
+            'Проверьте, что распределение меняется при изменении оценки'
+        )
+        review.delete()
+        assert _distribution(title) == {10: 1, 3: 1}
+        Review.objects.filter(author=third).get().save()
+        assert _distribution(title) == {10: 1, 3: 1}, (
+            'Проверьте пересчёт распределения для отзыва не из базы'
+        )
+
+    def test_endpoint(self, client, title, make_users,
+                      django_assert_num_queries):
+        from reviews.models import Review
+
+        for score, user in zip((7, 7, 9), make_users(3)):
+            Review.objects.create(title=title, author=user, text='Текст',
+                                  score=score)
+        with django_assert_num_queries(1):
+            response = client.get(
+                f'/api/v1/titles/{title.id}/score-distribution/')
+        assert response.status_code == 200
+        data = response.json()
+        assert data['id'] == title.id
+        assert data['reviews_count'] == 3
+        assert [item['score'] for item in data['scores']] == list(
+            range(1, 11))
+        assert {item['score']: item['count'] for item in data['scores']
+                if item['count']} == {7: 2, 9: 1}
+        response = client.get('/api/v1/titles/0/score-distribution/')
+        assert response.status_code == 404
+
+    def test_rebuild_command(self, title, user):
+        from reviews.models import Review, Title
+
+        Review.objects.create(title=title, author=user, text='Текст', score=4)
+        Title.objects.filter(pk=title.pk).update(score_4_count=0,
+                                                 score_5_count=1)
+        with pytest.raises(CommandError):
+            call_command('rebuild_aggregates', '--check')
+        call_command('rebuild_aggregates')
+        assert _distribution(title) == {4: 1}
+        call_command('rebuild_aggregates', '--check')
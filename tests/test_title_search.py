@@ -0,0 +1,85 @@
+import pytest
+
+
+@pytest.fixture
+def catalog(category, genres):
+    from reviews.models import Title
+
+    drama, comedy = genres
+    titles = {
+        'shawshank': Title.objects.create(
+            name='Побег из Шоушенка', year=1994, category=category,
+            description='Банкир попадает в тюрьму'),
+        'godfather': Title.objects.create(
+            name='Крестный отец', year=1972, category=category,
+            description='Семья и тюрьма'),
+        'prison': Title.objects.create(
+            name='Тюрьма', year=2000, category=category),
+        'matrix': Title.objects.create(
+            name='The Matrix', year=1999,
+            description='Neo and the simulation'),
+    }
+    for title in titles.values():
+        title.genre.set(genres)
+    return titles
+
+
+def _search(client, query):
+    response = client.get(f'/api/v1/titles/?{query}')
+    assert response.status_code == 200
+    return [item['name'] for item in response.json()['results']]
+
+
+@pytest.mark.django_db
+class TestTitleSearch:
+
+    def test_relevance_order(self, client, catalog):
+        names = _search(client, 'search=тюрьм')
+        assert names[0] == 'Тюрьма', (
+            'Проверьте, что совпадение в названии выше совпадения в описании'
+        )
+        assert set(names) >= {'Тюрьма', 'Побег из Шоушенка',
+                              'Крестный отец'}
+        assert 'The Matrix' not in names
+
+    def test_description_and_latin(self, client, catalog):
+        assert _search(client, 'search=simulation') == ['The Matrix']
+
+    def test_index_follows_updates(self, client, catalog):
+        matrix = catalog['matrix']
+        matrix.name = 'Матрица'
+        matrix.save()
+        assert _search(client, 'search=матрица') == ['Матрица']
+        matrix.delete()
+        assert _search(client, 'search=матрица') == []
+
+    def test_explicit_ordering(self, client, catalog):
+        assert _search(client, 'search=тюрьм&ordering=year') == [
+            'Крестный отец', 'Побег из Шоушенка', 'Тюрьма'
+        ]
+
+    def test_filters_do_not_duplicate(self, client, catalog):
+        response = client.get('/api/v1/titles/?genre=drama')
+        assert response.json()['count'] == len(catalog), (
+            'Проверьте, что фильтр по жанру не дублирует произведения'
+        )
+
+
+@pytest.mark.django_db
+def test_sqlite_triggers_restored(client, category):
+    # Изменение схемы в SQLite пересоздаёт таблицу без триггеров FTS5.
+    from django.db import connection
+    from reviews.models import Title
+    from reviews.search import TITLE_FTS_TABLE, restore_title_search
+
+    if connection.vendor != 'sqlite':
+        pytest.skip('Триггеры FTS5 есть только в SQLite')
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TRIGGER {TITLE_FTS_TABLE}_insert')
+    Title.objects.create(name='Солярис', year=1972, category=category)
+    restore_title_search(connection)
+    Title.objects.create(name='Сталкер', year=1979, category=category)
+    assert set(_search(client, 'search=с')) == {'Солярис', 'Сталкер'}, (
+        'Проверьте, что после миграций триггеры и индекс FTS5 '
+        'восстанавливаются'
+    )
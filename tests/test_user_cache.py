@@ -0,0 +1,77 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .fixtures.fixture_user import _client_for
+
+
+def _queries(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    return response, len(context.captured_queries)
+
+
+@pytest.mark.django_db
+class TestUserCache:
+    url = '/api/v1/users/me/'
+
+    def test_user_is_cached(self, user_client):
+        response, first = _queries(user_client, self.url)
+        assert response.status_code == 200
+        response, second = _queries(user_client, self.url)
+        assert response.status_code == 200
+        assert second == first - 1, (
+            'Проверьте, что пользователь из токена берётся из кэша'
+        )
+
+    def test_role_change_invalidates(self, admin_client, user, user_client):
+        assert user_client.get('/api/v1/users/').status_code == 403
+        response = admin_client.patch(f'/api/v1/users/{user.username}/',
+                                      data={'role': 'admin'})
+        assert response.status_code == 200
+        assert user_client.get('/api/v1/users/').status_code == 200, (
+            'Проверьте, что изменение роли сбрасывает кэш пользователя'
+        )
+
+    def test_deleted_user(self, user, user_client):
+        assert user_client.get(self.url).status_code == 200
+        user.delete()
+        assert user_client.get(self.url).status_code == 401
+
+    def test_timeout(self, user_client, settings):
+        settings.USER_CACHE_TIMEOUT = 0
+        _, first = _queries(user_client, self.url)
+        _, second = _queries(user_client, self.url)
+        assert second == first
+
+    def test_max_size(self, user, moderator, settings):
+        settings.USER_CACHE_MAX_SIZE = 1
+        user_client, moderator_client = _client_for(user), _client_for(
+            moderator)
+        _, first = _queries(user_client, self.url)
+        _queries(moderator_client, self.url)
+        _, again = _queries(user_client, self.url)
+        assert again == first, (
+            'Проверьте, что кэш пользователей ограничен по размеру'
+        )
+
+    def test_writes_recheck_user(self, user, user_client):
+        # Изменение в обход сигналов, как в другом процессе с локальным
+        # кэшем каталога.
+        from django.contrib.auth import get_user_model
+
+        assert user_client.get(self.url).status_code == 200
+        users = get_user_model().objects.filter(pk=user.pk)
+        users.update(role='admin')
+        assert user_client.get('/api/v1/users/').status_code == 403
+        response = user_client.post('/api/v1/categories/',
+                                    data={'name': 'Фильм', 'slug': 'film'})
+        assert response.status_code == 201, (
+            'Проверьте, что запрос на запись видит новую роль сразу'
+        )
+        users.update(role='user')
+        response = user_client.post('/api/v1/categories/',
+                                    data={'name': 'Книга', 'slug': 'book'})
+        assert response.status_code == 403, (
+            'Проверьте, что запрос на запись видит снятую роль сразу'
+        )